@@ -0,0 +1,44 @@
+"""ベンチマーク共通の計測・表示ヘルパー。"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Sequence
+
+
+def timed(fn: Callable[[], Any], repeat: int = 3) -> tuple[float, Any]:
+    """`fn`を`repeat`回実行し、最速の経過秒と最後の戻り値を返す。"""
+    best = float("inf")
+    result: Any = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def print_table(rows: Sequence[dict[str, Any]]) -> None:
+    """辞書の列を幅揃えした表として標準出力に出す。"""
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    cells = [[_format(row.get(header, "")) for header in headers] for row in rows]
+    widths = [max(len(header), *(len(row[i]) for row in cells)) for i, header in enumerate(headers)]
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    for row in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+
+def peak_rss_mb() -> float:
+    """このプロセスの最大常駐メモリ（MiB）。Linuxでは`ru_maxrss`はKiB単位。"""
+    import resource
+    import sys
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
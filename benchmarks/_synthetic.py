@@ -0,0 +1,193 @@
+"""ベンチマーク用の合成データ（レイアウトJSON・メタデータ・論文フォルダ）を生成する。"""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+_SENTENCES = [
+    "本研究では，エンタテインメントシステムの体験を評価するための手法を提案する．",
+    "実験の結果，提案手法は既存手法に比べて高い没入感を示した[1]．",
+    "参加者は 12 名であり，それぞれ 20 分間のセッションに参加した．",
+    "この結果は，インタラクションの設計において重要な示唆を与える[2], [3]．",
+    "今後の課題として，長期的な利用における効果の検証が挙げられる．",
+]
+
+
+def _span(text: str, bold: bool = False) -> dict[str, Any]:
+    return {
+        "size": 9.0,
+        "flags": 16 if bold else 0,
+        "bidi": 0,
+        "char_flags": 16,
+        "font": "Ryumin-Medium" if bold else "Ryumin-Light",
+        "color": 0,
+        "alpha": 255,
+        "ascender": 0.88,
+        "descender": -0.12,
+        "text": text,
+        "origin": [50.0, 100.0],
+        "bbox": [50.0, 90.0, 300.0, 100.0],
+    }
+
+
+def _box(boxclass: str, lines: list[str], x0s: list[float] | None = None, bold: bool = False) -> dict[str, Any]:
+    x0s = x0s or [50.0 for _ in lines]
+    return {
+        "x0": 50.0,
+        "y0": 90.0,
+        "x1": 300.0,
+        "y1": 100.0 + 10 * len(lines),
+        "boxclass": boxclass,
+        "image": None,
+        "table": None,
+        "textlines": [
+            {"bbox": [x0, 90.0, 300.0, 100.0], "spans": [_span(line, bold)]}
+            for line, x0 in zip(lines, x0s)
+        ],
+    }
+
+
+def _table_box(number: int, rows: int) -> dict[str, Any]:
+    extract = [[f"r{r}c{c}" for c in range(3)] for r in range(rows)]
+    markdown = "\n".join("|" + "|".join(cell for cell in row) + "|" for row in extract)
+    return {
+        "x0": 50.0, "y0": 90.0, "x1": 300.0, "y1": 200.0,
+        "boxclass": "table", "image": None, "textlines": None,
+        "table": {"extract": extract, "markdown": markdown},
+    }
+
+
+def _page(number: int, boxes: list[dict[str, Any]], words: int) -> dict[str, Any]:
+    fulltext = [
+        {
+            "type": 0, "number": 0, "flags": 0, "bbox": [0.0, 0.0, 1.0, 1.0],
+            "lines": [
+                {"spans": [_span(box["textlines"][0]["spans"][0]["text"])], "wmode": 0, "dir": [1.0, 0.0], "bbox": [0.0, 0.0, 1.0, 1.0]}
+            ],
+        }
+        for box in boxes
+        if box["textlines"]
+    ]
+    return {
+        "page_number": number,
+        "width": 595.0,
+        "height": 842.0,
+        "boxes": boxes,
+        "full_ocred": False,
+        "text_ocred": False,
+        "fulltext": fulltext,
+        "words": [[50.0, 90.0, 60.0, 100.0, "語", 0, 0, i] for i in range(words)],
+        "links": [],
+    }
+
+
+def synthetic_layout(pages: int = 6, seed: int = 0, paragraphs_per_page: int = 6, words_per_page: int = 200) -> dict[str, Any]:
+    """`PdfDocument`として検証でき、`parse_paper`が最後まで通る合成レイアウトJSONを作る。"""
+    rng = random.Random(seed)
+    page_list: list[dict[str, Any]] = []
+    figure_number = 1
+    table_number = 1
+    for page_number in range(1, pages + 1):
+        boxes: list[dict[str, Any]] = [
+            _box("page-header", ["「エンタテインメントコンピューティングシンポジウム（EC2025）」2025年 8月"])
+        ]
+        if page_number == 1:
+            boxes += [
+                _box("title", [f"合成論文 {seed}：体験を拡張するインタラクションの設計"]),
+                _box("text", ["著者一 著者二 著者三"]),
+                _box("text", ["概要：" + "".join(rng.choice(_SENTENCES) for _ in range(3))]),
+                _box("text", ["キーワード：インタラクション，エンタテインメント，評価"]),
+            ]
+        boxes.append(_box("section-header", [f"{page_number}. 節{page_number}"]))
+        for _ in range(paragraphs_per_page):
+            lines = [rng.choice(_SENTENCES) for _ in range(rng.randint(2, 6))]
+            boxes.append(_box("text", lines, [62.0] + [50.0] * (len(lines) - 1)))
+        boxes.append(_box("picture", ["スクリーンショット"]))
+        boxes.append(_box("caption", [f"図{figure_number} 合成図{figure_number}"]))
+        figure_number += 1
+        boxes.append(_box("caption", [f"表{table_number} 合成表{table_number}"]))
+        boxes.append(_table_box(table_number, 4))
+        table_number += 1
+        boxes.append(_box("footnote", [f"*[{page_number}] 脚注{page_number}"]))
+        if page_number == pages:
+            boxes.append(_box("section-header", ["参考文献"]))
+            boxes.append(_box("list-item", [f"[{i}] 著者{i}: 参考文献{i}, 情報処理学会論文誌 (2020)." for i in range(1, 11)]))
+        boxes.append(_box("page-footer", [f"© 2025 Information Processing Society of Japan {page_number}"]))
+        page_list.append(_page(page_number, boxes, words_per_page))
+    return {
+        "filename": f"synthetic_{seed}.pdf",
+        "page_count": pages,
+        "toc": [],
+        "pages": page_list,
+        "metadata": {
+            "format": "PDF 1.7", "title": "", "author": "", "subject": "", "keywords": "",
+            "creator": "", "producer": "", "creationDate": "", "modDate": "", "trapped": "",
+            "encryption": None,
+        },
+        "from_bytes": False,
+        "image_dpi": 150,
+        "image_format": "png",
+        "image_path": "",
+        "use_ocr": False,
+        "form_fields": {},
+        "force_text": True,
+        "embed_images": False,
+        "write_images": False,
+    }
+
+
+def synthetic_metadata(recid: int, seed: int = 0) -> dict[str, Any]:
+    """IPSJ電子図書館のメタデータエクスポートを模した`*_metadata.json`の中身を作る。"""
+    rng = random.Random(seed * 100003 + recid)
+    authors = rng.randint(1, 6)
+    biblio = {
+        "bibliographic_titles": [{"bibliographic_title": "エンタテインメントコンピューティングシンポジウム2025論文集"}],
+        "bibliographicPageStart": str(rng.randint(1, 300)),
+        "bibliographicPageEnd": str(rng.randint(301, 600)),
+        "bibliographicVolumeNumber": "2025",
+    }
+    return {
+        "links": {"self": f"https://ipsj.ixsq.nii.ac.jp/records/{recid}"},
+        "metadata": {
+            "_item_metadata": {
+                "item_title": f"合成論文 {recid}",
+                "item_18_description_7": {"attribute_value_mlt": [{"subitem_description": rng.choice(_SENTENCES) * 4}]},
+                "pubdate": {"attribute_value": f"2025-08-{rng.randint(1, 28):02d}"},
+                "item_language": {"attribute_value_mlt": [{"subitem_language": "jpn"}]},
+                "item_file_price": {"attribute_value_mlt": [{"url": {"url": f"https://example.invalid/{recid}.pdf"}}]},
+                "item_18_creator_5": {
+                    "attribute_value_mlt": [{"creatorNames": {"creatorName": f"著者{i}"}} for i in range(authors)]
+                },
+                "item_18_text_3": {
+                    "attribute_value_mlt": [{"subitem_text_value": f"所属{i}"} for i in range(authors)]
+                },
+                "item_18_biblio_info_10": {"attribute_value_mlt": [biblio]},
+            },
+            "_files_info": [{"url": f"https://ipsj.ixsq.nii.ac.jp/records/{recid}/files/{recid}.pdf"}],
+        },
+    }
+
+
+def write_synthetic_archive(root: Path, papers: int, pages: int = 6) -> list[Path]:
+    """
+    `root/data/recid_*/`にPDF・メタデータ・レイアウトキャッシュ（`<pdf>.json`）を並べる。
+    PDFはダミーだが、レイアウトキャッシュがあるので抽出はキャッシュヒットとして扱われる。
+    """
+    pdfs: list[Path] = []
+    for index in range(papers):
+        recid = 200000 + index
+        folder = root / "data" / f"recid_{recid}"
+        folder.mkdir(parents=True, exist_ok=True)
+        pdf = folder / f"IPSJ-EC2025{index:04d}.pdf"
+        pdf.write_bytes(b"%PDF-1.7\n% synthetic " + str(recid).encode() + b"\n%%EOF\n")
+        (folder / f"recid_{recid}_metadata.json").write_text(
+            json.dumps(synthetic_metadata(recid), ensure_ascii=False), encoding="utf-8"
+        )
+        pdf.with_name(f"{pdf.name}.json").write_text(
+            json.dumps(synthetic_layout(pages=pages, seed=index), ensure_ascii=False), encoding="utf-8"
+        )
+        pdfs.append(pdf)
+    return pdfs
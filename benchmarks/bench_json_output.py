@@ -0,0 +1,75 @@
+"""`content.json` / `fallbacks.json` の書き出しモード別に、書き込みバイト数とシリアライズ時間を比較する。"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from ec_scripts.json_io import COMPRESSIONS, JsonOutputOptions, load_json, output_path
+from ec_scripts.parsing.paper_parser import parse_paper
+from ec_scripts.parsing.pdf_types import Paper
+from ec_scripts.parsing.pymupdf_layout_types import PdfDocument
+from ec_scripts.parsing.stream import TokenStream
+
+from _bench import print_table, timed
+from _synthetic import synthetic_layout
+
+
+def build_papers(count: int, pages: int) -> list[Paper]:
+    papers: list[Paper] = []
+    for seed in range(count):
+        paper = Paper()
+        doc = PdfDocument.model_validate(synthetic_layout(pages=pages, seed=seed))
+        parse_paper(paper, TokenStream(Path(f"synthetic_{seed}.pdf"), doc)).unwrap()
+        papers.append(paper)
+    return papers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    papers = build_papers(args.papers, args.pages)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        for compact in (False, True):
+            for compression in COMPRESSIONS:
+                options = JsonOutputOptions(compact=compact, compression=compression)
+
+                def write_all() -> int:
+                    written = 0
+                    for index, paper in enumerate(papers):
+                        content = out / f"{index}_content.json"
+                        warnings = out / f"{index}_fallbacks.json"
+                        paper.decode_json(content, warnings, options)
+                        written += output_path(content, options).stat().st_size
+                        written += output_path(warnings, options).stat().st_size
+                    return written
+
+                seconds, written = timed(write_all, args.repeat)
+                load_seconds, _ = timed(
+                    lambda: [load_json(out / f"{index}_content.json") for index in range(len(papers))],
+                    args.repeat,
+                )
+                for stale in out.iterdir():
+                    stale.unlink()
+                rows.append(
+                    {
+                        "mode": f"{'compact' if compact else 'indent=4'}+{compression}",
+                        "bytes_written": written,
+                        "bytes_per_paper": written // len(papers),
+                        "serialise_s": seconds,
+                        "ms_per_paper": seconds * 1000 / len(papers),
+                        "load_s": load_seconds,
+                    }
+                )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
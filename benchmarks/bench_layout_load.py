@@ -0,0 +1,87 @@
+"""
+レイアウトキャッシュ（`<pdf>.json`）の読み込み方式ごとに、読み込み時間とワーカーのピークRSSを比較する。
+計測のたびに新しいプロセスを起動し、そのプロセスの`ru_maxrss`をワーカー1つ分のピークRSSとして報告する。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _bench import peak_rss_mb, print_table
+from _synthetic import synthetic_layout
+
+MODES = ["read_text+PdfDocument", "bytes+PdfDocument", "bytes+TokenDocument", "load_token_document+tokens"]
+
+
+def run_worker(mode: str, directory: Path, repeat: int) -> None:
+    from ec_scripts.parsing.pdf2text import load_token_document, read_cache_bytes
+    from ec_scripts.parsing.pymupdf_layout_types import PdfDocument, TokenDocument
+    from ec_scripts.parsing.tokens import doc_to_tokens
+
+    caches = sorted(directory.glob("*.pdf.json"))
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for cache in caches:
+            match mode:
+                case "read_text+PdfDocument":
+                    PdfDocument.model_validate_json(cache.read_text(encoding="utf-8"))
+                case "bytes+PdfDocument":
+                    PdfDocument.model_validate_json(read_cache_bytes(cache))
+                case "bytes+TokenDocument":
+                    TokenDocument.model_validate_json(read_cache_bytes(cache))
+                case "load_token_document+tokens":
+                    doc_to_tokens(load_token_document(cache.with_name(cache.name.removesuffix(".json"))).unwrap())
+    seconds = time.perf_counter() - start
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline_rss}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--words", type=int, default=3000, help="1ページあたりの words 要素数（キャッシュを大きくする）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.dir, args.repeat)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        for seed in range(args.papers):
+            layout = synthetic_layout(pages=args.pages, seed=seed, words_per_page=args.words)
+            (directory / f"paper{seed}.pdf.json").write_text(json.dumps(layout, ensure_ascii=False), encoding="utf-8")
+        cache_bytes = sum(path.stat().st_size for path in directory.glob("*.pdf.json"))
+        for mode in MODES:
+            completed = subprocess.run(
+                [sys.executable, __file__, "--worker", mode, "--dir", str(directory), "--repeat", str(args.repeat)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            measured = json.loads(completed.stdout.strip().splitlines()[-1])
+            rows.append(
+                {
+                    "mode": mode,
+                    "ms_per_cache": measured["seconds"] * 1000 / (args.papers * args.repeat),
+                    "peak_rss_mb": measured["peak_rss_mb"],
+                    "rss_over_import_mb": measured["peak_rss_mb"] - measured["baseline_rss_mb"],
+                }
+            )
+    print(f"{args.papers} caches, {cache_bytes / args.papers / 1024 / 1024:.2f} MiB each")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
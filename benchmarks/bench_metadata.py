@@ -0,0 +1,65 @@
+"""合成したIPSJメタデータに対して、候補パスの都度解析とコンパイル済みパスの探索速度を比較する。"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import fields
+from typing import Any, Iterable
+
+from returns.maybe import Maybe, Nothing, Some
+
+from ec_scripts.metadata.json_tools import first_present, get_path, parse_path
+from ec_scripts.metadata.metadata_simplifier import simplify_metadata
+from ec_scripts.metadata.metadata_types import COMPILED_PATHS
+
+from _bench import print_table, timed
+from _synthetic import synthetic_metadata
+
+
+def legacy_first_present(data: Any, paths: Iterable[str]) -> Maybe[Any]:
+    """コンパイル導入前の`first_present`（探索のたびに`parse_path`する）。"""
+    for path in paths:
+        value = get_path(data, parse_path(path))
+        if isinstance(value, Some):
+            return value
+    return Nothing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payloads", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = [synthetic_metadata(200000 + i) for i in range(args.payloads)]
+    compiled = [getattr(COMPILED_PATHS, field.name) for field in fields(COMPILED_PATHS)]
+    specs = [[path.spec for path in candidates] for candidates in compiled]
+
+    def run_legacy() -> None:
+        for payload in payloads:
+            for candidates in specs:
+                legacy_first_present(payload["metadata"], candidates)
+
+    def run_compiled() -> None:
+        for payload in payloads:
+            for candidates in compiled:
+                first_present(payload["metadata"], candidates)
+
+    def run_simplify() -> None:
+        for payload in payloads:
+            simplify_metadata(payload, []).unwrap()
+
+    legacy_s, _ = timed(run_legacy, args.repeat)
+    compiled_s, _ = timed(run_compiled, args.repeat)
+    simplify_s, _ = timed(run_simplify, args.repeat)
+    print_table(
+        [
+            {"mode": "lookup: parse_path per call", "seconds": legacy_s, "us_per_payload": legacy_s * 1e6 / args.payloads, "speedup": 1.0},
+            {"mode": "lookup: compiled paths", "seconds": compiled_s, "us_per_payload": compiled_s * 1e6 / args.payloads, "speedup": legacy_s / compiled_s},
+            {"mode": "simplify_metadata (compiled)", "seconds": simplify_s, "us_per_payload": simplify_s * 1e6 / args.payloads, "speedup": ""},
+        ]
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+レイアウトからトークン列を作る経路ごとの所要時間を比較し、`layout_json_to_tokens`の出力が
+pydanticモデルを経由する`doc_to_tokens`と一致することを確かめる。
+`--check ROOT_PATH`を付けると、合成データの代わりに実アーカイブのキャッシュ全件で一致だけを確かめる。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from _bench import print_table, timed
+from _synthetic import synthetic_layout
+
+from ec_scripts.parsing.pymupdf_layout_types import PdfDocument, TokenDocument
+from ec_scripts.parsing.tokens import doc_to_tokens, layout_json_to_tokens
+
+
+def check_archive(root_path: Path) -> int:
+    """キャッシュごとに3経路のトークン列を比較し、一致しなかった数を返す。"""
+    mismatches = 0
+    caches = sorted(root_path.glob("./data/recid_*/*.pdf.json"))
+    for cache in caches:
+        data = cache.read_bytes()
+        expected = doc_to_tokens(PdfDocument.model_validate_json(data))
+        for name, actual in (
+            ("TokenDocument", doc_to_tokens(TokenDocument.model_validate_json(data))),
+            ("raw", layout_json_to_tokens(json.loads(data))),
+        ):
+            if actual != expected:
+                mismatches += 1
+                print(f"mismatch ({name}): {cache}")
+    print(f"checked {len(caches)} caches, {mismatches} mismatches")
+    return mismatches
+
+
+def measure(layout: dict[str, Any], repeat: int) -> list[dict[str, Any]]:
+    data = json.dumps(layout, ensure_ascii=False).encode("utf-8")
+    expected = doc_to_tokens(PdfDocument.model_validate_json(data))
+    cases = {
+        # キャッシュから読むとき
+        "cache: PdfDocument": lambda: doc_to_tokens(PdfDocument.model_validate_json(data)),
+        "cache: TokenDocument": lambda: doc_to_tokens(TokenDocument.model_validate_json(data)),
+        "cache: json.loads+raw": lambda: layout_json_to_tokens(json.loads(data)),
+        # 抽出した直後（デコード済みの辞書がある）のとき
+        "extracted: PdfDocument": lambda: doc_to_tokens(PdfDocument.model_validate(layout)),
+        "extracted: raw": lambda: layout_json_to_tokens(layout),
+    }
+    rows: list[dict[str, Any]] = []
+    for name, fn in cases.items():
+        (seconds, tokens) = timed(fn, repeat)
+        rows.append({"path": name, "ms": seconds * 1000, "tokens": len(tokens), "identical": tokens == expected})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--words", type=int, default=300, help="1ページあたりの words 要素数")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--check", type=Path, default=None, metavar="ROOT_PATH")
+    args = parser.parse_args()
+
+    if args.check is not None:
+        sys.exit(1 if check_archive(args.check) else 0)
+
+    layout = synthetic_layout(pages=args.pages, seed=0, words_per_page=args.words)
+    rows = measure(layout, args.repeat)
+    print_table(rows)
+    if not all(row["identical"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
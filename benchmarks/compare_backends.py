@@ -0,0 +1,104 @@
+"""
+レイアウト抽出バックエンド（`layout`と`fast`）を実アーカイブのPDFで比較する。
+論文ごとに、抽出にかかった時間と、両者のトークン列・解析結果（`Paper`のセグメント列）の一致度を報告する。
+
+    python benchmarks/compare_backends.py ROOT_PATH [--limit N] [--use-cache]
+
+既定では`layout`側もpymupdf4llmで抽出し直す（キャッシュは書き換えない）。`--use-cache`を付けると、
+`layout`側はキャッシュ済みレイアウトを読むだけにして、解析結果の一致だけを手早く確かめられる。
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any
+
+from _bench import print_table
+
+from ec_scripts.parsing.fast_layout import extract_fast_layout
+from ec_scripts.parsing.paper_parser import parse_paper
+from ec_scripts.parsing.pdf2text import extract_layout, json_cache_path, load_layout_tokens
+from ec_scripts.parsing.pdf_types import Paper
+from ec_scripts.parsing.stream import TokenStream
+from ec_scripts.parsing.tokens import Token, layout_json_to_tokens
+from ec_scripts.quality.golden import content_digest
+
+
+def layout_tokens(path_pdf: Path, use_cache: bool) -> tuple[float, list[Token], int]:
+    start = time.perf_counter()
+    if use_cache and json_cache_path(path_pdf).exists():
+        (tokens, page_count) = load_layout_tokens(path_pdf).unwrap()
+    else:
+        ob = extract_layout(path_pdf, write_cache=False)
+        (tokens, page_count) = (layout_json_to_tokens(ob), len(ob["pages"]))
+    return (time.perf_counter() - start, tokens, page_count)
+
+
+def fast_tokens(path_pdf: Path) -> tuple[float, list[Token], int]:
+    start = time.perf_counter()
+    ob = extract_fast_layout(path_pdf)
+    tokens = layout_json_to_tokens(ob)
+    return (time.perf_counter() - start, tokens, len(ob["pages"]))
+
+
+def parse(path_pdf: Path, tokens: list[Token], page_count: int) -> Paper | None:
+    paper = Paper()
+    result = parse_paper(paper, TokenStream.from_tokens(path_pdf, tokens, page_count))
+    return paper if result.map(lambda _: True).value_or(False) else None
+
+
+def segment_keys(paper: Paper | None) -> list[tuple[str, str]]:
+    if paper is None:
+        return []
+    return [(segment.type, segment.content) for segment in paper.segments]
+
+
+def compare(path_pdf: Path, use_cache: bool) -> dict[str, Any]:
+    (layout_seconds, layout, layout_pages) = layout_tokens(path_pdf, use_cache)
+    (fast_seconds, fast, fast_pages) = fast_tokens(path_pdf)
+    layout_paper = parse(path_pdf, layout, layout_pages)
+    fast_paper = parse(path_pdf, fast, fast_pages)
+    identical = (
+        layout_paper is not None and fast_paper is not None and content_digest(layout_paper) == content_digest(fast_paper)
+    )
+    return {
+        "pdf": path_pdf.name,
+        "layout_ms": layout_seconds * 1000,
+        "fast_ms": fast_seconds * 1000,
+        "speedup": layout_seconds / fast_seconds if fast_seconds else 0.0,
+        "token_types": SequenceMatcher(None, [t.type.value for t in layout], [t.type.value for t in fast], autojunk=False).ratio(),
+        "segments": SequenceMatcher(None, segment_keys(layout_paper), segment_keys(fast_paper), autojunk=False).ratio(),
+        "layout_ok": layout_paper is not None,
+        "fast_ok": fast_paper is not None,
+        "identical": identical,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root_path", type=Path)
+    parser.add_argument("--limit", type=int, default=None, help="比較するPDFの数の上限")
+    parser.add_argument("--use-cache", action="store_true", help="layout側はキャッシュ済みレイアウトを使う")
+    args = parser.parse_args()
+
+    paths = sorted(args.root_path.glob("./data/recid_*/*.pdf"))[: args.limit]
+    rows = [compare(path, args.use_cache) for path in paths]
+    print_table(rows)
+    if not rows:
+        return
+    layout_total = sum(row["layout_ms"] for row in rows)
+    fast_total = sum(row["fast_ms"] for row in rows)
+    print(f"papers: {len(rows)}")
+    print(f"extraction: layout {layout_total:.1f}ms, fast {fast_total:.1f}ms ({layout_total / fast_total:.1f}x)")
+    print(f"parsed: layout {sum(row['layout_ok'] for row in rows)}, fast {sum(row['fast_ok'] for row in rows)}")
+    print(f"identical content.json: {sum(row['identical'] for row in rows)}/{len(rows)}")
+    print(f"mean agreement: token types {statistics.mean(row['token_types'] for row in rows):.3f}, "
+          f"segments {statistics.mean(row['segments'] for row in rows):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+解析段のワーカープロセスが異常終了しても、段階的なバッチ実行（`run_staged`）と`parse_many`が止まらずに終わるかを確かめる回帰テスト。
+合成データのうち`--victims`本の論文を解析するときにワーカープロセスが自分自身を`SIGKILL`し、
+メモリ予算なし・`--max-memory`相当の予算あり・1本ずつしか流れない予算のそれぞれで、すべての論文の結果が1件ずつ返ること、
+落ちた論文だけが失敗として記録されること（同じプールで解析中だった論文は解析し直される）、
+予算の予約がすべて返されることを調べる。`parse_many`はプールを作り直さないので、落ちた論文を含む失敗として返ることだけを調べる。
+ワーカーに差し替えた関数を引き継がせるため、プロセスの開始方法は`fork`に固定する（Linuxのみ）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+from _bench import print_table
+from _synthetic import write_synthetic_archive
+
+from ec_scripts.output import batch, staged
+from ec_scripts.output.batch import ParseFailure, ParseOutcome, parse_many
+from ec_scripts.output.memory_budget import MemoryBudget
+from ec_scripts.output.staged import StagedReport, run_staged
+from ec_scripts.output.writer import OutputWriter
+
+# ワーカープロセスを落とす論文のファイル名（`fork`でワーカーに引き継がれる）
+VICTIMS: set[str] = set()
+_parse_prefetched_outcome = staged._parse_prefetched_outcome
+_parse_one = batch.parse_one
+
+
+def crash_if_victim(path: Path) -> None:
+    if path.name in VICTIMS:
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+def crashing_outcome(item: staged.Prefetched, profile: bool, backend: staged.Backend) -> ParseOutcome:
+    crash_if_victim(item.path)
+    return _parse_prefetched_outcome(item, profile, backend)
+
+
+def crashing_parse_one(path: Path, cache: bool = True, profile: bool = False, backend: staged.Backend = "layout") -> ParseOutcome:
+    crash_if_victim(path)
+    return _parse_one(path, cache, profile, backend)
+
+
+def staged_runner(jobs: int, budget: MemoryBudget | None) -> Callable[[list[Path], Path], Iterable[ParseOutcome]]:
+    def run(paths: list[Path], out_path: Path) -> Iterable[ParseOutcome]:
+        with OutputWriter(out_path) as writer:
+            for outcome, _ in run_staged(paths, writer, StagedReport(), jobs, 2, None, False, "layout", budget):
+                yield outcome
+
+    return run
+
+
+def run_case(
+    name: str,
+    root: Path,
+    paths: list[Path],
+    runner: Callable[[list[Path], Path], Iterable[ParseOutcome]],
+    timeout: float,
+    budget: MemoryBudget | None = None,
+    retried: bool = True,
+) -> dict[str, object]:
+    """`retried=True`なら、落とした論文だけが失敗することまで調べる。"""
+    out_path = root / name
+    out_path.mkdir()
+    outcomes: list[ParseOutcome] = []
+
+    def run() -> None:
+        outcomes.extend(runner(paths, out_path))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    names = [outcome[0].name for outcome in outcomes]
+    failed = {outcome[0].name for outcome in outcomes if isinstance(outcome[2], ParseFailure)}
+    problems: list[str] = []
+    if thread.is_alive():
+        problems.append(f"{timeout:.0f}秒以内に終わらない")
+    if sorted(names) != sorted(path.name for path in paths):
+        problems.append(f"結果が{len(names)}件（{len(paths)}件のはず）")
+    if failed != VICTIMS if retried else not VICTIMS <= failed:
+        problems.append(f"失敗した論文が落とした論文と違う: {sorted(failed ^ VICTIMS)}")
+    if budget is not None and (budget.in_flight != 0 or budget.reserved != 0):
+        problems.append(f"予約が返されていない（in_flight={budget.in_flight}, reserved={budget.reserved}）")
+    return {
+        "case": name,
+        "results": len(names),
+        "failed": len(failed),
+        "ok": len(names) - len(failed),
+        "problems": "; ".join(problems) or "-",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=8)
+    parser.add_argument("--victims", type=int, default=2, help="ワーカープロセスを落とす論文の数")
+    parser.add_argument("--jobs", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120.0, help="1つのケースがこの秒数で終わらなければ失敗とする")
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("fork", force=True)
+    staged._parse_prefetched_outcome = crashing_outcome
+    batch.parse_one = crashing_parse_one
+    rows: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = write_synthetic_archive(root, args.papers)
+        # 最初の1本と、プールを作り直した後の1本を落とす
+        VICTIMS.update(path.name for path in paths[1 : 1 + 3 * args.victims : 3][: args.victims])
+        rows.append(run_case("plain", root, paths, staged_runner(args.jobs, None), args.timeout))
+        for (name, budget) in [("budget", MemoryBudget(8 << 30, args.jobs)), ("tight-budget", MemoryBudget(1, args.jobs))]:
+            # tight-budget: 予算に1本も収まらず、解析段に1本ずつしか流れない場合
+            rows.append(run_case(name, root, paths, staged_runner(args.jobs, budget), args.timeout, budget))
+        rows.append(run_case("parse_many", root, paths, lambda paths, _: parse_many(paths, jobs=args.jobs), args.timeout, retried=False))
+    print_table(rows)
+    if any(row["problems"] != "-" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
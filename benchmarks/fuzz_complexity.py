@@ -0,0 +1,264 @@
+"""
+`parse_paper`が入力の大きさに対して線形に振る舞うかを確かめる負荷テスト。
+箇条書き・脚注・参考文献の継続行や、途切れた段落の連結のように、文字列の`+=`や正規表現が
+入力に比例しない時間・メモリを使いうる形のトークン列を、大きさを倍々にしながら生成して解析する。
+大きさと所要時間・ピークメモリを両対数で直線に当てはめた傾きが`--max-exponent`を超えたパターンと
+`parse_paper`の分岐（`ParseProfile`）を報告し、傾きが超えたままの最小の大きさのトークン列を
+再現用のJSONとして`--out-dir`に保存する。`--replay FILE`で保存したトークン列をもう一度解析できる。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from _bench import print_table
+
+from ec_scripts.parsing.paper_parser import parse_paper
+from ec_scripts.parsing.pdf_types import Paper
+from ec_scripts.parsing.profile import ParseProfile
+from ec_scripts.parsing.stream import TokenStream
+from ec_scripts.parsing.tokens import Token, TokenType, dump_tokens
+
+# 1行あたりの文字数（大きさnのパターンはおおよそn行になる）
+LINE = "エンタテインメントシステムの体験を評価するための手法を提案"
+# これより短い計測は誤差が大きいので、傾きの当てはめに使わない
+MIN_SECONDS = 0.002
+
+
+def token(type: TokenType, lines: list[str], x0: int = 50) -> Token:
+    return Token(type, "".join(lines), lines, [x0] * len(lines), [False] * len(lines), [])
+
+
+def head() -> list[Token]:
+    return [
+        token(TokenType.PAGE_HEADER, ["「エンタテインメントコンピューティングシンポジウム（EC2025）」2025年 8月"]),
+        token(TokenType.TITLE, ["負荷試験用の論文"]),
+        token(TokenType.TEXT, ["著者一 著者二"]),
+        token(TokenType.TEXT, ["概要：負荷試験のための概要．"]),
+        token(TokenType.TEXT, ["キーワード：負荷，試験"]),
+    ]
+
+
+def document(builder: Callable[[int], list[Token]], n: int) -> list[Token]:
+    """見出し部分と、末尾のページフッタ（`TokenStream.empty`は最後の1トークンを読まない）で本体を挟む。"""
+    return head() + builder(n) + [token(TokenType.PAGE_FOOTER, ["© 2025 Information Processing Society of Japan"])]
+
+
+def paragraph_continuation(n: int) -> list[Token]:
+    """句点で終わらない段落がn個のトークンに分かれて続く（`extend_last_paragraph`の連結）。"""
+    return [token(TokenType.TEXT, [LINE, LINE]) for _ in range(n // 2)]
+
+
+def list_item_lines(n: int) -> list[Token]:
+    """1つの箇条書きトークンに継続行がn行ある（`split_list_items`の連結）。"""
+    return [token(TokenType.LIST_ITEM, ["(1) " + LINE] + [LINE] * (n - 1))]
+
+
+def list_items_many(n: int) -> list[Token]:
+    """箇条書きトークンがn個続く（`extend_last_listitems`の連結）。"""
+    return [token(TokenType.LIST_ITEM, [f"({i % 100}) {LINE}"]) for i in range(n)]
+
+
+def footnote_lines(n: int) -> list[Token]:
+    """1つの脚注トークンに継続行がn行ある（`split_footnotes`の連結）。"""
+    return [token(TokenType.FOOTNOTE, ["*1 " + LINE] + [LINE] * (n - 1))]
+
+
+def reference_continuation(n: int) -> list[Token]:
+    """参考文献の1件目にn行の継続行が付く（`parse_references`の最後の参考文献への連結）。"""
+    return [
+        token(TokenType.SECTION_HEADER, ["参考文献"]),
+        token(TokenType.LIST_ITEM, ["[1] " + LINE] + [LINE] * (n - 1)),
+    ]
+
+
+def many_sections(n: int) -> list[Token]:
+    """節見出しと1行の段落がn/2組（線形であるべき基準）。"""
+    tokens: list[Token] = []
+    for i in range(n // 2):
+        tokens.append(token(TokenType.SECTION_HEADER, [f"{i % 99 + 1}. 節"]))
+        tokens.append(token(TokenType.TEXT, [LINE + "．"]))
+    return tokens
+
+
+def long_line(n: int) -> list[Token]:
+    """n行分の長さの1行だけの段落（行単位の正規表現）。"""
+    return [token(TokenType.TEXT, [LINE * n + "．"])]
+
+
+PATTERNS: dict[str, Callable[[int], list[Token]]] = {
+    "paragraph-continuation": paragraph_continuation,
+    "list-item-lines": list_item_lines,
+    "list-items-many": list_items_many,
+    "footnote-lines": footnote_lines,
+    "reference-continuation": reference_continuation,
+    "many-sections": many_sections,
+    "long-line": long_line,
+}
+
+
+def run_parse(tokens: list[Token]) -> Paper:
+    paper = Paper()
+    paper.profile = ParseProfile()
+    parse_paper(paper, TokenStream.from_tokens(Path("fuzz"), tokens, 1)).unwrap()
+    return paper
+
+
+def measure(build: Callable[[], list[Token]], parse: Callable[[list[Token]], Any], repeat: int) -> tuple[float, int, dict[str, float]]:
+    """最速の所要時間、ピークメモリ（tracemalloc）、最速の回の分岐ごとの時間を返す。"""
+    best = float("inf")
+    branches: dict[str, float] = {}
+    for _ in range(repeat):
+        tokens = build()
+        start = time.perf_counter()
+        result = parse(tokens)
+        seconds = time.perf_counter() - start
+        if seconds < best:
+            best = seconds
+            profile = getattr(result, "profile", None)
+            branches = {name: stats.seconds for name, stats in profile.branches.items()} if profile is not None else {}
+    tokens = build()
+    tracemalloc.start()
+    parse(tokens)
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (best, peak, branches)
+
+
+def exponent(sizes: list[int], values: list[float], floor: float = 0.0) -> float | None:
+    """両対数での最小二乗の傾き。`floor`以下の値は除く。2点未満なら`None`。"""
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if value > floor]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator if denominator else None
+
+
+def minimise(builder: Callable[[int], list[Token]], parse: Callable[[list[Token]], Any], start: int, limit: float, repeat: int) -> int:
+    """
+    大きさを半分にしながら、nと2nの間の傾きが`limit`を超えている最小のnを探す。
+    見つかったnの2倍の入力が、超線形を示す最小の再現になる。
+    """
+    n = start
+    while n >= 2:
+        half = n // 2
+        (small, _, _) = measure(lambda: document(builder, half), parse, repeat)
+        (large, _, _) = measure(lambda: document(builder, n), parse, repeat)
+        if large < MIN_SECONDS or math.log(large / max(small, 1e-9)) / math.log(2) <= limit:
+            return n
+        n = half
+    return n
+
+
+def save_reproducer(out_dir: Path, name: str, n: int, tokens: list[Token], time_exponent: float | None) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{name}.json"
+    path.write_text(
+        json.dumps(
+            {
+                "pattern": name,
+                "size": n,
+                "time_exponent": time_exponent,
+                "tokens": [
+                    {"type": t.type.value, "lines": t.lines, "line_x0": t.line_x0, "line_starts_with_bold": t.line_starts_with_bold, "cells": t.cells}
+                    for t in tokens
+                ],
+            },
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    return path
+
+
+def load_reproducer(path: Path) -> list[Token]:
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        Token(TokenType(t["type"]), "".join(t["lines"]), t["lines"], t["line_x0"], t["line_starts_with_bold"], t["cells"])
+        for t in obj["tokens"]
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000, 8000], help="試す大きさ（おおよその行数）。")
+    parser.add_argument("--pattern", choices=[*PATTERNS, "dump-tokens"], nargs="*", default=None, help="試すパターン（既定はすべて）。")
+    parser.add_argument("--repeat", type=int, default=3, help="大きさごとの計測回数。最速の時間を使います。")
+    parser.add_argument("--max-exponent", type=float, default=1.3, help="所要時間・メモリの傾きがこれを超えたら超線形とみなします。")
+    parser.add_argument("--out-dir", type=Path, default=Path("fuzz_reproducers"), help="超線形だったパターンの最小の再現を保存するディレクトリ。")
+    parser.add_argument("--replay", type=Path, default=None, help="保存した再現用のJSONを解析し、所要時間を表示します。")
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        tokens = load_reproducer(args.replay)
+        (seconds, peak, branches) = measure(lambda: load_reproducer(args.replay), run_parse, args.repeat)
+        print(f"{len(tokens)} tokens: {seconds * 1000:.2f}ms, peak {peak / 1024 / 1024:.1f}MiB")
+        for name, branch_seconds in sorted(branches.items(), key=lambda item: -item[1]):
+            print(f"  {name:<48} {branch_seconds * 1000:.2f}ms")
+        return
+
+    targets: dict[str, tuple[Callable[[int], list[Token]], Callable[[list[Token]], Any]]] = {
+        name: (lambda n, builder=builder: document(builder, n), run_parse) for name, builder in PATTERNS.items()
+    }
+    # 警告の表示に使う`dump_tokens`は`parse_paper`を通さずに直接測る
+    targets["dump-tokens"] = (lambda n: [token(TokenType.TEXT, [LINE]) for _ in range(n)], dump_tokens)
+    selected = args.pattern or list(targets)
+
+    rows: list[dict[str, Any]] = []
+    flagged = False
+    for name in selected:
+        (build, parse) = targets[name]
+        times: list[float] = []
+        peaks: list[float] = []
+        branch_times: dict[str, list[float]] = {}
+        for n in args.sizes:
+            (seconds, peak, branches) = measure(lambda: build(n), parse, args.repeat)
+            times.append(seconds)
+            peaks.append(float(peak))
+            for branch, branch_seconds in branches.items():
+                branch_times.setdefault(branch, [0.0] * (len(times) - 1)).append(branch_seconds)
+            for series in branch_times.values():
+                series += [0.0] * (len(times) - len(series))
+        time_exponent = exponent(args.sizes, times, MIN_SECONDS)
+        memory_exponent = exponent(args.sizes, peaks)
+        superlinear = any(value is not None and value > args.max_exponent for value in (time_exponent, memory_exponent))
+        slow_branches = [
+            f"{branch}({value:.2f})"
+            for branch, series in branch_times.items()
+            if (value := exponent(args.sizes, series, MIN_SECONDS)) is not None and value > args.max_exponent
+        ]
+        reproducer = ""
+        if superlinear or slow_branches:
+            flagged = True
+            # `dump_tokens`は関数1つなので、再現用のトークン列は保存しない
+            if name in PATTERNS:
+                n = minimise(PATTERNS[name], parse, args.sizes[-1], args.max_exponent, args.repeat)
+                reproducer = str(save_reproducer(args.out_dir, name, n, build(n), time_exponent))
+        rows.append(
+            {
+                "pattern": name,
+                "ms@max": times[-1] * 1000,
+                "peak_MiB@max": peaks[-1] / 1024 / 1024,
+                "time_exp": "-" if time_exponent is None else f"{time_exponent:.2f}",
+                "mem_exp": "-" if memory_exponent is None else f"{memory_exponent:.2f}",
+                "status": "SUPERLINEAR" if superlinear or slow_branches else "ok",
+                "branches": ", ".join(slow_branches),
+                "reproducer": reproducer,
+            }
+        )
+    print_table(rows)
+    if flagged:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
-from .output.pipeline import parse_metadata_and_paper, tidy_up_paper_folder, parse_paper_only
+from .output.pipeline import parse_metadata_and_paper, tidy_up_paper_folder, parse_paper_only, parse_paper_bytes
 from .metadata.metadata_simplifier import simplify_metadata_of_paper
+from .output.batch import ParseFailure, aparse_many, parse_many
+from .json_io import JsonOutputOptions, load_json
 
 __all__ = [
     "tidy_up_paper_folder",
     "parse_metadata_and_paper",
     "parse_paper_only",
-    "simplify_metadata_of_paper"
+    "parse_paper_bytes",
+    "parse_many",
+    "aparse_many",
+    "ParseFailure",
+    "simplify_metadata_of_paper",
+    "JsonOutputOptions",
+    "load_json",
 ]
\ No newline at end of file
@@ -4,54 +4,453 @@ from __future__ import annotations
 
 import argparse
 import logging
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext, redirect_stdout
+from datetime import datetime
 from pathlib import Path
+from typing import Callable
 
 from tqdm import tqdm
 
-from .output.overview import (
-    summarize_references,
-    summarize_segments,
-    summarize_warnings,
-    write_overview_csv,
-)
-from .output.pipeline import parse_paper_only, tidy_up_paper_folder
+from .json_io import COMPRESSIONS, JsonOutputOptions, dump_json, encode_json
+from .output.overview import write_overview_csv
+from .output.batch import ParseFailure, parse_many
+from .output.metadata_table import refresh_metadata
+from .output.pipeline import parse_paper_bytes, parse_paper_only
+from .output.rebuild import rebuild_outputs
+from .output.writer import OutputWriter
+from .parsing.citations import link_citations
+from .parsing.pdf2text import BACKENDS, Backend
+from .parsing.pdf_types import Paper
+from .parsing.profile import ParseProfile, write_profile_report
+from .parsing.layout_cache import cache_stats, format_size, parse_size, prune_cache, scan_cache, warm_cache
+from .output.chunks import CHUNKS_NAME, DEFAULT_CHUNK_CHARS
+from .output.duplicates import DuplicateGroups, fan_out, group_duplicates
+from .output.memory_budget import MemoryBudget
+from .output.staged import StagedReport, run_staged, write_stage_report
+from .output.shard import Shard, merge_shard_outputs, parse_shard, select_shard
+from .output.reference_index import REFERENCE_INDEX_NAME, ReferenceIndex
+from .output.topic_index import TOPIC_INDEX_NAME, TOPIC_KINDS, TopicIndex
+from .output.warning_index import WARNING_INDEX_NAME, WarningIndex
+from .output.watch import watch
+from .quality.golden import compare_corpus, is_regression, measure_corpus, read_golden, write_golden
+
+
+# ファイルの代わりに標準入出力を使うことを表すパス
+STDIO = "-"
+
+
+def _shard_argument(spec: str) -> Shard:
+    try:
+        return parse_shard(spec)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def merge_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts merge",
+        description="--shard で分担して作った出力フォルダを、再解析せずに一つにまとめます。",
+    )
+    parser.add_argument("out_path", type=Path, help="統合先ディレクトリ。")
+    parser.add_argument("shard_dirs", type=Path, nargs="+", help="各シャードの出力ディレクトリ。")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    merged = merge_shard_outputs(args.shard_dirs, args.out_path)
+    print(f"merged {merged} papers into {args.out_path}")
+
+
+def metadata_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts metadata",
+        description="PDFを読まずに、data/recid_*/*_metadata.json だけから metadata.json と一覧表（metadata.jsonl / metadata.csv）を作り直します。",
+    )
+    parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。")
+    parser.add_argument("-o", "--out_path", type=Path, help="出力先ディレクトリ。", default="./result")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="並列に読み込むプロセス数（既定はCPU数）。")
+    parser.add_argument("--compact", action="store_true", help="インデントなしのコンパクトなJSONを出力します。")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="none", help="metadata.json の圧縮形式。")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    json_options = JsonOutputOptions(compact=args.compact, compression=args.compress)
+    records = refresh_metadata(args.root_path, args.out_path, args.jobs, json_options)
+    failures = [record for record in records if record.error is not None]
+    for record in failures:
+        logging.error(f"{record.recid} のメタデータを簡略化できませんでした: {record.error}")
+    print(f"wrote metadata for {len(records) - len(failures)}/{len(records)} papers into {args.out_path}")
+
+
+def overview_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts overview",
+        description="PDFを読まずに、出力フォルダの metadata.json / content.json / fallbacks.json だけから overview.csv と各索引を作り直します。",
+    )
+    parser.add_argument("out_path", type=Path, help="解析結果の出力ディレクトリ。")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="並列に読み込むプロセス数（既定はCPU数）。")
+    parser.add_argument("--chunks", action="store_true", help=f"{CHUNKS_NAME} も作り直します。")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS, help="1チャンクの文字数の上限。")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    if not args.out_path.is_dir():
+        print(f"{args.out_path} がありません。", file=sys.stderr)
+        sys.exit(1)
+    loaded = rebuild_outputs(args.out_path, args.jobs, args.chunk_chars if args.chunks else None)
+    failures = sum(1 for result in loaded if result.error is not None)
+    print(f"rebuilt overview.csv and indexes from {len(loaded) - failures}/{len(loaded)} papers in {args.out_path}")
+
+
+def _size_argument(text: str) -> int:
+    try:
+        return parse_size(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def _format_time(timestamp: float | None) -> str:
+    return "-" if timestamp is None else datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+def cache_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts cache",
+        description="レイアウト抽出キャッシュ（<pdf>.json / <pdf>.txt）を管理します。",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats_parser = commands.add_parser("stats", help="キャッシュの件数と容量を表示します。")
+    stats_parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。")
+    prune_parser = commands.add_parser("prune", help="最後に読まれた時刻が古いものから削除し、容量を上限以下に収めます。")
+    prune_parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。")
+    prune_parser.add_argument("--max-size", type=_size_argument, required=True, help="キャッシュ容量の上限（例: 500M, 2G）。")
+    prune_parser.add_argument("--dry-run", action="store_true", help="削除せずに対象だけを表示します。")
+    warm_parser = commands.add_parser("warm", help="解析の前に、キャッシュの無いPDFのレイアウト抽出を並列に済ませます。")
+    warm_parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。")
+    warm_parser.add_argument("-j", "--jobs", type=int, default=None, help="並列に抽出するプロセス数（既定はCPU数）。")
+    warm_parser.add_argument("--shard", type=_shard_argument, default=None, help="i/N を指定すると、そのシャードのPDFだけを対象にします。")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    match args.command:
+        case "stats":
+            stats = cache_stats(scan_cache(args.root_path))
+            print(f"entries: {stats.count}")
+            print(f"total:   {format_size(stats.total_bytes)}")
+            for kind in sorted(stats.bytes_by_kind):
+                print(f"  {kind}: {stats.count_by_kind[kind]} files, {format_size(stats.bytes_by_kind[kind])}")
+            print(f"oldest access: {_format_time(stats.oldest_access)}")
+            print(f"newest access: {_format_time(stats.newest_access)}")
+        case "prune":
+            evicted = prune_cache(args.root_path, args.max_size, args.dry_run)
+            for entry in evicted:
+                print(f"{'would remove' if args.dry_run else 'removed'} {entry.path} ({format_size(entry.size)})")
+            print(f"{len(evicted)} entries, {format_size(sum(entry.size for entry in evicted))}")
+        case "warm":
+            paths = select_shard(sorted(args.root_path.glob("./data/recid_*/*.pdf")), args.shard)
+            failures = 0
+            for path, error in tqdm(warm_cache(paths, args.jobs)):
+                if error is not None:
+                    failures += 1
+                    logging.error(f"{path} のレイアウト抽出に失敗しました: {error}")
+            if failures:
+                sys.exit(1)
+
+
+def golden_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts golden",
+        description="キャッシュ済みレイアウトを全件再解析し、記録しておいた出力・解析時間と比較します。",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("record", "現在のパーサーの出力ダイジェストと解析時間をゴールデンとして記録します。"),
+        ("check", "ゴールデンと比較し、出力の変化や解析時間の悪化があれば終了コード1で終わります。"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("root_path", type=Path, help="data/recid_*/*.pdf.json を含むルートディレクトリ。")
+        command.add_argument("--golden", type=Path, default=Path("golden.json"), help="ゴールデンファイルのパス。")
+        command.add_argument("-j", "--jobs", type=int, default=None, help="並列に解析するプロセス数（既定はCPU数）。")
+        command.add_argument("--repeat", type=int, default=3, help="1本あたりの解析回数。最速の時間を記録します。")
+    check_parser = commands.choices["check"]
+    check_parser.add_argument("--time-ratio", type=float, default=1.5, help="この倍率を超えて遅くなった論文を回帰とみなします。")
+    check_parser.add_argument("--time-slack", type=float, default=0.005, help="この秒数未満の悪化は無視します。")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    current = measure_corpus(args.root_path, args.jobs, args.repeat)
+    if args.command == "record":
+        write_golden(args.golden, current)
+        print(f"recorded {len(current)} papers into {args.golden}")
+        return
+
+    golden = read_golden(args.golden)
+    diffs = compare_corpus(golden, current, args.time_ratio, args.time_slack)
+    for diff in diffs:
+        if diff.status == "ok":
+            continue
+        old = "-" if diff.old_seconds is None else f"{diff.old_seconds * 1000:.2f}ms"
+        new = "-" if diff.new_seconds is None else f"{diff.new_seconds * 1000:.2f}ms"
+        print(f"[{diff.status}] {diff.key} ({old} -> {new})")
+        for detail in diff.details:
+            print(f"\t{detail}")
+    statuses = Counter(diff.status for diff in diffs)
+    old_total = sum(entry.parse_seconds for key, entry in golden.items() if key in current)
+    new_total = sum(entry.parse_seconds for key, entry in current.items() if key in golden)
+    print(" ".join(f"{status}={count}" for status, count in sorted(statuses.items())))
+    print(f"total parse time: {old_total:.3f}s -> {new_total:.3f}s")
+    total_regressed = new_total > old_total * args.time_ratio and new_total - old_total > args.time_slack
+    if is_regression(diffs) or total_regressed:
+        sys.exit(1)
+
+
+def warnings_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts warnings",
+        description=f"出力フォルダの {WARNING_INDEX_NAME} から、警告コードごとの件数や該当する論文を引きます。",
+    )
+    parser.add_argument("out_path", type=Path, help="解析結果の出力ディレクトリ。")
+    parser.add_argument("--code", default=None, help="この警告コードの警告を、論文とトークン位置つきで一覧します。")
+    parser.add_argument("--paper", default=None, help="この論文フォルダ名（PDFのファイル名）の警告だけを一覧します。")
+    args = parser.parse_args(argv)
+    index_path = args.out_path / WARNING_INDEX_NAME
+    if not index_path.exists():
+        print(f"{index_path} がありません。", file=sys.stderr)
+        sys.exit(1)
+    with WarningIndex(index_path) as warning_index:
+        if args.code is None and args.paper is None:
+            for code, count, papers in warning_index.code_counts():
+                print(f"{code:<32} {count:>7} warnings in {papers:>6} papers")
+            return
+        for hit in warning_index.find(args.code, args.paper):
+            fatal = " (fatal)" if hit.fatal else ""
+            print(f"{hit.paper}\t{hit.code}{fatal}\ttoken {hit.position + 1}\t{hit.token_type or '-'}\t{hit.explanation}")
+
+
+def references_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts references",
+        description=f"出力フォルダの {REFERENCE_INDEX_NAME} から、よく引用される文献や、文献を引用している論文を引きます。",
+    )
+    parser.add_argument("out_path", type=Path, help="解析結果の出力ディレクトリ。")
+    parser.add_argument("--top", type=int, default=20, help="引用している論文の多い順に、この件数の文献を表示します。")
+    parser.add_argument("--work", default=None, help="この文献IDを引用している論文を一覧します。")
+    parser.add_argument("--paper", default=None, help="この論文フォルダ名（PDFのファイル名）の参考文献と文献IDを一覧します。")
+    args = parser.parse_args(argv)
+    index_path = args.out_path / REFERENCE_INDEX_NAME
+    if not index_path.exists():
+        print(f"{index_path} がありません。", file=sys.stderr)
+        sys.exit(1)
+    with ReferenceIndex(index_path) as reference_index:
+        if args.work is not None or args.paper is not None:
+            citations = reference_index.citing(args.work) if args.work is not None else reference_index.cited_by(args.paper)
+            for citation in citations:
+                print(f"{citation.paper}\t{citation.sign}\t{citation.work_id}\t{citation.title}\t{citation.content}")
+            return
+        for work in reference_index.most_cited(args.top):
+            print(f"{work.work_id}  {work.citing_papers:>5}  {work.content}")
+
+
+def topics_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts topics",
+        description=f"出力フォルダの {TOPIC_INDEX_NAME} から、キーワード・節見出しの頻度や、それを含む論文を引きます。",
+    )
+    parser.add_argument("out_path", type=Path, help="解析結果の出力ディレクトリ。")
+    parser.add_argument("--kind", choices=TOPIC_KINDS, default="keyword", help="キーワード（keyword）と節見出し（section）のどちらを引くか。")
+    parser.add_argument("--top", type=int, default=20, help="含む論文の多い順に、この件数を表示します。")
+    parser.add_argument("--since", type=int, default=None, help="この年以降に出版された論文だけを数えます。")
+    parser.add_argument("--until", type=int, default=None, help="この年以前に出版された論文だけを数えます。")
+    parser.add_argument("--term", default=None, help="このキーワード・節見出しを含む論文と、年ごとの論文数を表示します。")
+    args = parser.parse_args(argv)
+    index_path = args.out_path / TOPIC_INDEX_NAME
+    if not index_path.exists():
+        print(f"{index_path} がありません。", file=sys.stderr)
+        sys.exit(1)
+    with TopicIndex(index_path) as topic_index:
+        if args.term is not None:
+            for hit in topic_index.papers_with(args.kind, args.term):
+                print(f"{hit.year}\t{hit.paper}\t{hit.count}\t{hit.title}")
+            print(" ".join(f"{year}={count}" for year, count in topic_index.yearly_counts(args.kind, args.term)))
+            return
+        for topic in topic_index.top_terms(args.kind, args.top, args.since, args.until):
+            print(f"{topic.papers:>6} papers {topic.occurrences:>6} times  {topic.label}")
+
+
+def watch_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="ec_scripts watch",
+        description="data/recid_* を定期的に走査し、新しく追加・変更された論文フォルダだけを解析して、overview.csv と各索引を更新し続けます。",
+    )
+    parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。")
+    parser.add_argument("-o", "--out_path", type=Path, help="出力先ディレクトリ。", default="./result")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="並列に解析するプロセス数。プロセスは監視中ずっと使い回します。")
+    parser.add_argument("--interval", type=float, default=5.0, help="走査の間隔（秒）。")
+    parser.add_argument("--settle", type=float, default=10.0, help="フォルダの中身がこの秒数変わらなくなってから解析します（コピー途中のファイルを避けるため）。")
+    parser.add_argument("--once", action="store_true", help="待ちのフォルダをすべて処理したら終了します。")
+    parser.add_argument("--compact", action="store_true", help="インデントなしのコンパクトなJSONを出力します。")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="none", help="content.json / fallbacks.json 等の圧縮形式。")
+    parser.add_argument("--backend", choices=BACKENDS, default="layout", help="レイアウト抽出の方式。")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+    json_options = JsonOutputOptions(compact=args.compact, compression=args.compress)
+    with ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else nullcontext() as executor:
+        try:
+            watch(
+                args.root_path,
+                args.out_path,
+                args.interval,
+                args.settle,
+                args.jobs,
+                json_options,
+                args.backend,
+                executor,
+                args.once,
+                on_processed=lambda folders, rows: print(
+                    f"{datetime.now().isoformat(timespec='seconds')} processed {len(folders)} folders ({len(rows)} papers written)",
+                    flush=True,
+                ),
+            )
+        except KeyboardInterrupt:
+            pass
+
+
+SUBCOMMANDS: dict[str, Callable[[list[str]], None]] = {
+    "merge": merge_main,
+    "metadata": metadata_main,
+    "overview": overview_main,
+    "cache": cache_main,
+    "golden": golden_main,
+    "warnings": warnings_main,
+    "references": references_main,
+    "topics": topics_main,
+    "watch": watch_main,
+}
+
+
+def print_profile_summary(profile: ParseProfile, limit: int = 10) -> None:
+    print(f"profiled {profile.papers} papers, fallback rate {profile.fallback_rate():.1%}")
+    for row in profile.rows()[:limit]:
+        print(f"  {row['branch']:<48} calls={row['calls']:<7} time={row['time_share']:.1%} warnings/call={row['warning_rate']}")
+
+
+def print_stage_summary(report: StagedReport) -> None:
+    print(f"stages ({report.wall_seconds:.2f}s):")
+    for row in report.rows():
+        print(f"  {row['stage']:<9} workers={row['workers']:<3} items={row['items']:<7} utilisation={row['utilisation']:.1%} queue mean={row['queue_mean']} max={row['queue_max']}/{row['queue_capacity']}")
+
+
+def print_memory_summary(budget: MemoryBudget) -> None:
+    print(
+        f"memory budget {format_size(budget.limit)}: worker rss {format_size(budget.worker_rss)} x {budget.workers}, "
+        f"max in flight {budget.max_in_flight}, max reserved {format_size(budget.max_reserved)}, "
+        f"largest paper {format_size(budget.max_transient)}"
+    )
 
 
 def main() -> None:
+    argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        SUBCOMMANDS[argv[0]](argv[1:])
+        return
+    parse_main(argv)
+
+
+def parse_main(argv: list[str]) -> None:
     parser = argparse.ArgumentParser(
+        prog="ec_scripts",
         description="Entertainment Computing分野における論文PDFとメタデータをプログラムで読みやすい形式に整理し直します。"
     )
-    parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。PDFだけを渡した場合、その論文の構造を示したJSONだけが出力されます。")
-    parser.add_argument("-o", "--out_path", type=Path, help="出力先ディレクトリ。", default="./result")
+    parser.add_argument("root_path", type=Path, help="data/recid_* を含むルートディレクトリ。PDFだけを渡した場合、その論文の構造を示したJSONだけが出力されます。- なら標準入力からPDFを読みます。")
+    parser.add_argument("-o", "--out_path", type=Path, help="出力先ディレクトリ。PDFを1本だけ解析するときに - を指定すると、content.json を標準出力に書きます。", default="./result")
     parser.add_argument("-v", "--verbose", type=bool, help="詳細ログを出力します。", default=False)
-    args = parser.parse_args()
+    parser.add_argument("--compact", action="store_true", help="インデントなしのコンパクトなJSONを出力します。")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="並列に解析するプロセス数。")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="none", help="content.json / fallbacks.json 等の圧縮形式。")
+    parser.add_argument("--shard", type=_shard_argument, default=None, help="i/N を指定すると、recidのハッシュでN分割したうちi番目（0始まり）だけを処理します。")
+    parser.add_argument("--profile", type=Path, default=None, help="parse_paper の分岐ごとの呼び出し回数・累積時間・警告率を集計し、このCSVに書き出します。")
+    parser.add_argument("--backend", choices=BACKENDS, default="layout", help="レイアウト抽出の方式。fast はレイアウト解析モデルを使わずに文字サイズ・太字・位置から推定します（キャッシュは使いません）。")
+    parser.add_argument("--cache-budget", type=_size_argument, default=None, help="処理後、レイアウトキャッシュをこの容量（例: 2G）以下にLRUで削減します。")
+    parser.add_argument("--prefetch", type=int, default=2, help="メタデータJSONとレイアウトキャッシュを先読みするスレッド数。0 にすると先読み・解析・書き出しを重ねずに処理します。")
+    parser.add_argument("--queue-size", type=int, default=None, help="段の間のキューに溜める論文数の上限（既定は 2 * jobs）。")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="標準入力（-）から読んだPDFのレイアウトを、中身のハッシュをキーにしてこのディレクトリにキャッシュします。")
+    parser.add_argument("--max-memory", type=_size_argument, default=None, help="解析中の論文が使うメモリの合計をこの予算（例: 8G）に収まるよう、同時に解析する本数を観測したRSSとページ数・ファイルサイズから調整します。")
+    parser.add_argument("--recycle-after", type=int, default=None, help="この本数を解析したワーカープロセスを作り直し、断片化したメモリを手放させます。")
+    parser.add_argument("--chunks", action="store_true", help=f"埋め込み・検索用に、本文を節ごとのチャンクに切り分けて {CHUNKS_NAME} に書き出します。")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS, help="1チャンクの文字数の上限。")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false", help="PDFの中身のハッシュで重複をまとめず、同じ中身のPDFもそれぞれ解析します。")
+    parser.add_argument("--stage-report", type=Path, default=None, help="先読み・解析・書き出しの段ごとの件数・稼働率・キューの深さをこのCSVに書き出します。")
+    args = parser.parse_args(argv)
+    if args.prefetch <= 0 and (args.max_memory is not None or args.recycle_after is not None):
+        parser.error("--max-memory と --recycle-after は --prefetch 0 とは併用できません。")
     root_path = args.root_path
     out_path = args.out_path
+    json_options = JsonOutputOptions(compact=args.compact, compression=args.compress)
     logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
     assert isinstance(root_path, Path)
     assert isinstance(out_path, Path)
     if root_path.is_dir():
-        paths = list(root_path.glob("./data/recid_*/*.pdf"))
-        overview_rows: list[dict[str, str | int]] = []
-
-        for path in tqdm(paths):
-            if path.is_dir():
-                continue
-            metadata, paper = tidy_up_paper_folder(path, out_path)
-            warning_summary = summarize_warnings(paper)
-            segment_summary = summarize_segments(paper)
-            reference_summary = summarize_references(paper)
-            overview_rows.append(
-                {
-                    "paper_title": metadata.get("title", ""),
-                    "pdf_path": str(path),
-                    **segment_summary,
-                    **reference_summary,
-                    **warning_summary,
-                }
-            )
+        paths = [path for path in root_path.glob("./data/recid_*/*.pdf") if not path.is_dir()]
+        paths = select_shard(sorted(paths), args.shard)
+        overview_rows: list[dict[str, str | int | float]] = []
+
+        profile = ParseProfile()
+
+        groups = group_duplicates(paths) if args.dedup else DuplicateGroups(paths, {})
+        report = StagedReport()
+        budget = MemoryBudget(args.max_memory, max(args.jobs, 1)) if args.max_memory is not None else None
+
+        with OutputWriter(out_path, json_options, args.chunk_chars if args.chunks else None) as writer:
+            if args.prefetch > 0:
+                results = run_staged(
+                    groups.unique, writer, report, args.jobs, args.prefetch, args.queue_size,
+                    args.profile is not None, args.backend, budget, args.recycle_after,
+                )
+            else:
+                results = ((outcome, writer.handle(outcome)) for outcome in parse_many(groups.unique, jobs=args.jobs, profile=args.profile is not None, backend=args.backend))
+            for outcome, row in tqdm(fan_out(results, groups, writer, args.backend, args.jobs), total=len(paths)):
+                paper = outcome[2]
+                # 失敗した論文も、失敗するまでの分岐の時間と`failures`を集計に含める
+                if isinstance(paper, (Paper, ParseFailure)) and paper.profile is not None:
+                    profile.merge(paper.profile)
+                if row is not None:
+                    overview_rows.append(row)
         write_overview_csv(out_path, overview_rows)
+        if groups.copies:
+            print(f"reused results for {groups.duplicate_count} duplicate PDFs of {len(groups.copies)} papers (see duplicate_of in overview.csv)")
+        if report.stages:
+            print_stage_summary(report)
+            if budget is not None:
+                print_memory_summary(budget)
+            if args.stage_report is not None:
+                write_stage_report(args.stage_report, report)
+        if args.profile is not None:
+            write_profile_report(args.profile, profile)
+            print_profile_summary(profile)
+        if args.cache_budget is not None:
+            prune_cache(root_path, args.cache_budget)
+    elif str(root_path) == STDIO or str(out_path) == STDIO:
+        parse_stdio_main(root_path, out_path, args.cache_dir, args.backend, json_options)
     else: 
-        paper= parse_paper_only(root_path).unwrap()
-        paper.decode_json(out_path, out_path.with_name(f"{out_path.name}_warnings.json"))
+        paper= parse_paper_only(root_path, backend=args.backend).unwrap()
+        paper.decode_json(out_path, out_path.with_name(f"{out_path.name}_warnings.json"), json_options)
+        dump_json(link_citations(paper).to_dict(), out_path.with_name(f"{out_path.name}_citations.json"), json_options)
+
+
+def parse_stdio_main(root_path: Path, out_path: Path, cache_dir: Path | None, backend: Backend, options: JsonOutputOptions) -> None:
+    """
+    `-`で標準入力からPDFを読み、または標準出力へ`content.json`を書く。
+    標準入力からのPDFは一時ファイルを作らずに解析し、`--cache-dir`があるときだけ中身のハッシュでキャッシュする。
+    """
+    # pymupdf4llmは標準出力に案内を出すことがあるため、解析中は標準エラー出力へ逃がす
+    with redirect_stdout(sys.stderr):
+        if str(root_path) == STDIO:
+            paper = parse_paper_bytes(sys.stdin.buffer.read(), cache_dir=cache_dir, backend=backend).unwrap()
+        else:
+            paper = parse_paper_only(root_path, backend=backend).unwrap()
+    if str(out_path) == STDIO:
+        sys.stdout.buffer.write(encode_json(paper.content_dict(), options))
+        sys.stdout.buffer.flush()
+        return
+    paper.decode_json(out_path, out_path.with_name(f"{out_path.name}_warnings.json"), options)
+    dump_json(link_citations(paper).to_dict(), out_path.with_name(f"{out_path.name}_citations.json"), options)
         
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""JSON出力の書式・圧縮オプションと、どの形式でも読み戻せるローダー。"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import lzma
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+Compression = Literal["none", "gzip", "xz"]
+
+COMPRESSIONS: tuple[Compression, ...] = ("none", "gzip", "xz")
+
+_SUFFIXES: dict[Compression, str] = {"none": "", "gzip": ".gz", "xz": ".xz"}
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+
+@dataclass(frozen=True)
+class JsonOutputOptions:
+    """
+    JSONの書き出し方。
+    既定値は従来通り `indent=4` の非圧縮JSON。
+    """
+
+    compact: bool = False
+    compression: Compression = "none"
+    level: int | None = None
+
+
+DEFAULT_JSON_OUTPUT = JsonOutputOptions()
+
+
+def output_path(path: Path, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT) -> Path:
+    """圧縮形式に応じた拡張子（`.gz` / `.xz`）を付けた実際の出力先を返す。"""
+    suffix = _SUFFIXES[options.compression]
+    return path.with_name(path.name + suffix) if suffix else path
+
+
+def encode_json(obj: Any, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT) -> bytes:
+    """`obj`をオプションに従ってJSONのバイト列に変換する。"""
+    if options.compact:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(obj, ensure_ascii=False, indent=4)
+    data = text.encode("utf-8")
+    match options.compression:
+        case "gzip":
+            return gzip.compress(data, compresslevel=6 if options.level is None else options.level)
+        case "xz":
+            return lzma.compress(data, preset=6 if options.level is None else options.level)
+        case _:
+            return data
+
+
+def dump_json(obj: Any, path: Path, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT) -> Path:
+    """`obj`をJSONとして書き出し、実際に書き込んだパスを返す。"""
+    target = output_path(path, options)
+    target.write_bytes(encode_json(obj, options))
+    return target
+
+
+def decode_json_bytes(data: bytes) -> Any:
+    """非圧縮・gzip・xzのいずれかで書かれたJSONバイト列を読み込む。"""
+    if data.startswith(_GZIP_MAGIC):
+        data = gzip.decompress(data)
+    elif data.startswith(_XZ_MAGIC):
+        data = lzma.decompress(data)
+    return json.loads(data)
+
+
+def resolve_json_path(path: Path) -> Path:
+    """
+    `content.json`のような論理パスから、実在するファイル（`.gz` / `.xz` を含む）を探す。
+    見つからなければ`FileNotFoundError`を投げる。
+    """
+    for suffix in ("", ".gz", ".xz"):
+        candidate = path.with_name(path.name + suffix) if suffix else path
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(path)
+
+
+def load_json(path: Path) -> Any:
+    """`dump_json`で書いたJSONを、書式・圧縮形式に関わらず読み込む。"""
+    return decode_json_bytes(resolve_json_path(path).read_bytes())
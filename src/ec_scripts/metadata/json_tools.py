@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Iterable, Sequence
 
 from returns.maybe import Maybe, Nothing, Some
@@ -48,31 +50,62 @@ def parse_path(path: PathSpec) -> Path:
     return tokens
 
 
-def get_path(data: Any, path: Sequence[PathToken]) -> Maybe[Any]:
-    """Traverse nested dict/list data by a path."""
+@dataclass(frozen=True)
+class CompiledPath:
+    """A path string parsed once into tokens, reusable across lookups."""
+
+    spec: PathSpec
+    tokens: tuple[PathToken, ...]
+
+    def get(self, data: Any) -> Maybe[Any]:
+        value = _lookup(data, self.tokens)
+        return Nothing if value is _MISSING else Some(value)
+
+
+@lru_cache(maxsize=None)
+def compile_path(path: PathSpec) -> CompiledPath:
+    """Parse a path string once; repeated calls with the same string hit the cache."""
+    return CompiledPath(path, tuple(parse_path(path)))
+
+
+def compile_paths(paths: Iterable[PathSpec | CompiledPath]) -> tuple[CompiledPath, ...]:
+    """Compile a list of candidate paths, keeping their order."""
+    return tuple(path if isinstance(path, CompiledPath) else compile_path(path) for path in paths)
+
+
+_MISSING = object()
+
+
+def _lookup(data: Any, path: Sequence[PathToken]) -> Any:
+    """Traverse nested dict/list data by a path, returning `_MISSING` on a miss."""
     current = data
     for key in path:
         if isinstance(key, int):
             if not isinstance(current, list) or key >= len(current):
-                return Nothing
-            current = current[key]
-        else:
-            if not isinstance(current, dict) or key not in current:
-                return Nothing
-            current = current[key]
-    return Some(current)
+                return _MISSING
+        elif not isinstance(current, dict) or key not in current:
+            return _MISSING
+        current = current[key]
+    return current
+
+
+def get_path(data: Any, path: Sequence[PathToken]) -> Maybe[Any]:
+    """Traverse nested dict/list data by a path."""
+    value = _lookup(data, path)
+    return Nothing if value is _MISSING else Some(value)
 
 
-def first_present(data: Any, paths: Iterable[PathSpec]) -> Maybe[Any]:
+def first_present(data: Any, paths: Iterable[PathSpec | CompiledPath]) -> Maybe[Any]:
     """Return the first successful path lookup from a list of paths."""
     for path in paths:
-        value = get_path(data, parse_path(path))
-        if isinstance(value, Some):
-            return value
+        compiled = path if isinstance(path, CompiledPath) else compile_path(path)
+        value = _lookup(data, compiled.tokens)
+        if value is not _MISSING:
+            return Some(value)
     return Nothing
 
 
-def required(data: Any, candidate_paths: Iterable[PathSpec], field_name: str) -> Result[Any, str]:
+def required(data: Any, candidate_paths: Iterable[PathSpec | CompiledPath], field_name: str) -> Result[Any, str]:
     """Return the first matching value or a Failure for a missing required field."""
     value = first_present(data, candidate_paths)
     match value:
@@ -13,50 +13,33 @@ from returns.result import Failure, Result, Success
 from .json_tools import first_failure as _first_failure
 from .json_tools import first_present as _first_present
 from .json_tools import required as _required
-from .metadata_types import AffiliationEntry, Author, Bibliographic, PATHS, SimplifiedMetadata
+from .metadata_types import AffiliationEntry, Author, Bibliographic, COMPILED_PATHS, SimplifiedMetadata
 
 def _is_affiliation_entry(entry: Any) -> TypeGuard[AffiliationEntry]:
     """Check if an entry has a valid affiliation shape."""
     return isinstance(entry, dict) and isinstance(entry.get("subitem_text_value"), str)
 
 
-def _biblio_path(suffix: str) -> str:
-    """Build a standard path for bibliographic metadata fields."""
-    return f"_item_metadata.item_18_biblio_info_10.attribute_value_mlt[0].{suffix}"
-
-
 def _bibliographic(metadata: dict[str, Any], warnings:list[str]) -> Result[Bibliographic, str]:
     """Extract required bibliographic fields."""
     title = _required(
         data=metadata,
-        candidate_paths=[
-            _biblio_path("bibliographic_titles[0].bibliographic_title"),
-            "sourceTitle[0]",
-        ],
+        candidate_paths=COMPILED_PATHS.bibliographic_title,
         field_name="bibliographic.title",
     )
     page_start = _required(
         data=metadata,
-        candidate_paths=[
-            _biblio_path("bibliographicPageStart"),
-            "pageStart[0]",
-        ],
+        candidate_paths=COMPILED_PATHS.bibliographic_page_start,
         field_name="bibliographic.page_start",
     )
     page_end = _required(
         data=metadata,
-        candidate_paths=[
-            _biblio_path("bibliographicPageEnd"),
-            "pageEnd[0]",
-        ],
+        candidate_paths=COMPILED_PATHS.bibliographic_page_end,
         field_name="bibliographic.page_end",
     )
     volume_number = _required(
         data=metadata,
-        candidate_paths=[
-            _biblio_path("bibliographicVolumeNumber"),
-            "volume[0]",
-        ],
+        candidate_paths=COMPILED_PATHS.bibliographic_volume_number,
         field_name="bibliographic.volume_number",
     )
     failure = _first_failure([title, page_start, page_end, volume_number])
@@ -82,7 +65,7 @@ def _parse_date(value: str) -> Result[date, str]:
 
 def _author_names_from_item_metadata(metadata: dict[str, Any], warnings:list[str]) -> Maybe[list[str]]:
     """Extract author names from item metadata entries."""
-    value = _first_present(metadata, PATHS.authors_item_metadata)
+    value = _first_present(metadata, COMPILED_PATHS.authors_item_metadata)
     match value:
         case Some(entries):
             if not isinstance(entries, list):
@@ -102,7 +85,7 @@ def _author_names_from_item_metadata(metadata: dict[str, Any], warnings:list[str
 
 def _author_names_from_creator(metadata: dict[str, Any], warnings:list[str]) -> Maybe[list[str]]:
     """Extract author names from creator name lists."""
-    value = _first_present(metadata, PATHS.authors_creator)
+    value = _first_present(metadata, COMPILED_PATHS.authors_creator)
     match value:
         case Some(entries):
             if not isinstance(entries, list) or not entries:
@@ -130,7 +113,7 @@ def _authors(metadata: dict[str, Any], warnings:list[str]) -> Result[list[Author
         return names_result
     names = names_result.unwrap()
 
-    affiliations_value_maybe = _first_present(metadata, PATHS.affiliations)
+    affiliations_value_maybe = _first_present(metadata, COMPILED_PATHS.affiliations)
     if affiliations_value_maybe is Nothing:
         return Failure("missing affiliations")
     affiliations_value = affiliations_value_maybe.unwrap()
@@ -160,31 +143,31 @@ def simplify_metadata(payload: dict[str, Any], warnings:list[str]) -> Result[Sim
     if not isinstance(metadata, dict):
         return Failure("missing metadata")
 
-    title_result = _required(data=metadata, candidate_paths=PATHS.title, field_name="title")
+    title_result = _required(data=metadata, candidate_paths=COMPILED_PATHS.title, field_name="title")
     abstract_result = _required(
         data=metadata,
-        candidate_paths=PATHS.abstract,
+        candidate_paths=COMPILED_PATHS.abstract,
         field_name="abstract",
     )
     date_value_result = _required(
         data=metadata,
-        candidate_paths=PATHS.publication_date,
+        candidate_paths=COMPILED_PATHS.publication_date,
         field_name="publication date",
     )
     authors_result = _authors(metadata, warnings)
     language_result = _required(
         data=metadata,
-        candidate_paths=PATHS.language,
+        candidate_paths=COMPILED_PATHS.language,
         field_name="language",
     )
     file_url_result = _required(
         data=metadata,
-        candidate_paths=PATHS.file_url,
+        candidate_paths=COMPILED_PATHS.file_url,
         field_name="file url",
     )
     self_url_result = _required(
         data=payload,
-        candidate_paths=["links.self"],
+        candidate_paths=COMPILED_PATHS.links_self,
         field_name="links.self",
     )
 
@@ -229,11 +212,19 @@ def simplify_metadata(payload: dict[str, Any], warnings:list[str]) -> Result[Sim
         }
     )
 
-def simplify_metadata_of_paper(paper_pdf: Path):
-    recid = paper_pdf.parent.name
-    json_path = paper_pdf.parent/f"{recid}_metadata.json"
-    txt = json_path.read_text(encoding="utf-8")
-    metadata_json = json.loads(txt)
+def simplify_metadata_bytes(data: bytes):
+    """読み込み済みのメタデータJSONを簡略化する（先読みしたバイト列を別プロセスで処理するとき用）。"""
+    metadata_json = json.loads(data)
     warnings:list[str] = []
     result = simplify_metadata(metadata_json, warnings)
     return result, warnings
+
+def simplify_metadata_file(json_path: Path):
+    return simplify_metadata_bytes(json_path.read_bytes())
+
+def metadata_path_of_paper(paper_pdf: Path) -> Path:
+    recid = paper_pdf.parent.name
+    return paper_pdf.parent/f"{recid}_metadata.json"
+
+def simplify_metadata_of_paper(paper_pdf: Path):
+    return simplify_metadata_file(metadata_path_of_paper(paper_pdf))
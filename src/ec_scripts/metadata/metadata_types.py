@@ -7,7 +7,7 @@ from typing import TypedDict
 
 from returns.maybe import Maybe
 
-from .json_tools import PathSpec
+from .json_tools import CompiledPath, PathSpec, compile_paths
 
 
 class PublicationDate(TypedDict):
@@ -114,3 +114,56 @@ PATHS = CandidatePathsForMetaData(
         "_item_metadata.item_18_text_3.attribute_value_mlt",
     ],
 )
+
+
+@dataclass(frozen=True)
+class CompiledPathsForMetaData:
+    """`CandidatePathsForMetaData`と書誌情報・リンクの候補パスを一度だけ解析したもの。"""
+
+    title: tuple[CompiledPath, ...]
+    abstract: tuple[CompiledPath, ...]
+    publication_date: tuple[CompiledPath, ...]
+    language: tuple[CompiledPath, ...]
+    file_url: tuple[CompiledPath, ...]
+    authors_item_metadata: tuple[CompiledPath, ...]
+    authors_creator: tuple[CompiledPath, ...]
+    affiliations: tuple[CompiledPath, ...]
+    bibliographic_title: tuple[CompiledPath, ...]
+    bibliographic_page_start: tuple[CompiledPath, ...]
+    bibliographic_page_end: tuple[CompiledPath, ...]
+    bibliographic_volume_number: tuple[CompiledPath, ...]
+    links_self: tuple[CompiledPath, ...]
+
+
+def _biblio_path(suffix: str) -> str:
+    """Build a standard path for bibliographic metadata fields."""
+    return f"_item_metadata.item_18_biblio_info_10.attribute_value_mlt[0].{suffix}"
+
+
+COMPILED_PATHS = CompiledPathsForMetaData(
+    title=compile_paths(PATHS.title),
+    abstract=compile_paths(PATHS.abstract),
+    publication_date=compile_paths(PATHS.publication_date),
+    language=compile_paths(PATHS.language),
+    file_url=compile_paths(PATHS.file_url),
+    authors_item_metadata=compile_paths(PATHS.authors_item_metadata),
+    authors_creator=compile_paths(PATHS.authors_creator),
+    affiliations=compile_paths(PATHS.affiliations),
+    bibliographic_title=compile_paths([
+        _biblio_path("bibliographic_titles[0].bibliographic_title"),
+        "sourceTitle[0]",
+    ]),
+    bibliographic_page_start=compile_paths([
+        _biblio_path("bibliographicPageStart"),
+        "pageStart[0]",
+    ]),
+    bibliographic_page_end=compile_paths([
+        _biblio_path("bibliographicPageEnd"),
+        "pageEnd[0]",
+    ]),
+    bibliographic_volume_number=compile_paths([
+        _biblio_path("bibliographicVolumeNumber"),
+        "volume[0]",
+    ]),
+    links_self=compile_paths(["links.self"]),
+)
@@ -0,0 +1,169 @@
+"""複数の論文PDFを並列に解析し、完了したものから順に返すバッチAPI。"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator
+
+from returns.primitives.exceptions import UnwrapFailedError
+from returns.result import Failure
+
+from ..metadata.metadata_types import SimplifiedMetadata
+from ..parsing.pdf2text import Backend
+from ..parsing.pdf_types import Paper
+from ..parsing.profile import ParseProfile
+from ..parsing.stream import ExceptionReport
+from .pipeline import parse_metadata_and_paper
+
+
+@dataclass
+class ParseFailure:
+    """
+    1本の論文の解析に失敗したことを表す。`report`はパーサー由来の失敗であれば設定される。
+    `profile`は、プロファイルを取っていたときに失敗するまでに記録した分岐ごとの集計。
+    """
+
+    reason: str
+    report: ExceptionReport | None = None
+    profile: ParseProfile | None = None
+
+    def __str__(self) -> str:
+        return str(self.report) if self.report is not None else self.reason
+
+
+type ParseOutcome = tuple[Path, SimplifiedMetadata | None, Paper | ParseFailure]
+
+
+def _root_cause(error: BaseException) -> BaseException | str:
+    """`UnwrapFailedError`の入れ子をたどり、最初に失敗した値を取り出す。"""
+    current: object = error
+    while isinstance(current, UnwrapFailedError):
+        container = current.halted_container
+        if not isinstance(container, Failure):
+            break
+        current = container.failure()
+    return current if isinstance(current, (BaseException, str)) else repr(current)
+
+
+def to_parse_failure(error: BaseException, profile: ParseProfile | None = None) -> ParseFailure:
+    cause = _root_cause(error)
+    if isinstance(cause, ExceptionReport):
+        return ParseFailure(cause.exception, cause, profile)
+    if isinstance(cause, str):
+        return ParseFailure(cause, profile=profile)
+    return ParseFailure(f"{type(cause).__name__}: {cause}", profile=profile)
+
+
+def parse_one(path: Path, cache: bool = True, profile: bool = False, backend: Backend = "layout") -> ParseOutcome:
+    """
+    1本の論文をメタデータ込みで解析する。例外は送出せず`ParseFailure`として返す。
+    `profile=True`なら`Paper.profile`に（失敗したときは`ParseFailure.profile`に）分岐ごとの集計が入る。
+    """
+    recorder = ParseProfile() if profile else None
+    try:
+        result = parse_metadata_and_paper(path, cache, recorder or False, backend)
+    except Exception as error:
+        return (path, None, to_parse_failure(error, recorder))
+    if isinstance(result, Failure):
+        return (path, None, to_parse_failure(result.failure(), recorder))
+    (metadata, paper) = result.unwrap()
+    return (path, metadata, paper)
+
+
+def _executor(jobs: int) -> Executor:
+    return ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else ThreadPoolExecutor(max_workers=1)
+
+
+def parse_many(
+    paths: Iterable[Path],
+    jobs: int = 1,
+    cache: bool = True,
+    max_in_flight: int | None = None,
+    profile: bool = False,
+    backend: Backend = "layout",
+    executor: Executor | None = None,
+) -> Iterator[ParseOutcome]:
+    """
+    `paths`の論文を解析し、完了した順に`(path, metadata, Paper | ParseFailure)`を返すジェネレータ。
+    `paths`は必要な分だけ遅延して読み進め、同時に抱える論文は`max_in_flight`（既定は`2 * jobs`）本までに抑える。
+    `jobs=1`のときはプロセスを立てずに呼び出し元で逐次解析する。
+    `executor`を渡すと、呼び出しのたびにプロセスを立て直さずにそれを使い回す（終了はさせない）。
+    """
+    if jobs <= 1 and executor is None:
+        for path in paths:
+            yield parse_one(path, cache, profile, backend)
+        return
+
+    limit = max(max_in_flight or 2 * jobs, 1)
+    pending_paths = iter(paths)
+    with nullcontext(executor) if executor is not None else _executor(jobs) as pool:
+        # どの論文の解析かを、ワーカーが落ちて結果が返らないときにも分かるようにしておく
+        in_flight: dict[Future[ParseOutcome], Path] = {}
+
+        def fill() -> None:
+            while len(in_flight) < limit:
+                path = next(pending_paths, None)
+                if path is None:
+                    return
+                try:
+                    future = pool.submit(parse_one, path, cache, profile, backend)
+                except Exception as error:
+                    # 壊れたプールには投入できない。残りの論文も失敗として返す
+                    future = Future()
+                    future.set_exception(error)
+                in_flight[future] = path
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as error:
+                    # ワーカープロセスが落ちた場合など（`BrokenProcessPool`）
+                    yield (path, None, to_parse_failure(error))
+            fill()
+
+
+async def aparse_many(
+    paths: Iterable[Path],
+    jobs: int = 1,
+    cache: bool = True,
+    max_in_flight: int | None = None,
+    profile: bool = False,
+    backend: Backend = "layout",
+) -> AsyncIterator[ParseOutcome]:
+    """`parse_many`の非同期版。解析はイベントループの外（スレッド/プロセス）で行う。"""
+    limit = max(max_in_flight or 2 * jobs, 1)
+    loop = asyncio.get_running_loop()
+    pending_paths = iter(paths)
+    with _executor(jobs) as executor:
+        in_flight: dict[asyncio.Future[ParseOutcome], Path] = {}
+
+        def fill() -> None:
+            while len(in_flight) < limit:
+                path = next(pending_paths, None)
+                if path is None:
+                    return
+                try:
+                    future = loop.run_in_executor(executor, parse_one, path, cache, profile, backend)
+                except Exception as error:
+                    future = loop.create_future()
+                    future.set_exception(error)
+                in_flight[future] = path
+
+        fill()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as error:
+                    yield (path, None, to_parse_failure(error))
+            fill()
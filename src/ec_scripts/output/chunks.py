@@ -0,0 +1,192 @@
+"""
+埋め込み・検索用に、`Paper.segments`を大きさの揃ったチャンクに切り分けてJSONLに書き出す。
+各チャンクには安定したID、節の見出しの並び（`SectionTitle`の番号から作る）、論文のメタデータ、
+文字数とトークン数の見積もりが付くので、索引付けの側で`content.json`を読み直す必要はない。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Iterator, Self
+
+from ..metadata.metadata_types import SimplifiedMetadata
+from ..parsing.pdf_types import Paper, Segment
+
+CHUNKS_NAME = "chunks.jsonl"
+# 1チャンクの文字数の上限の既定値
+DEFAULT_CHUNK_CHARS = 1200
+
+_SENTENCE_END = re.compile(r"(?<=[。．！？.!?])")
+_ASCII_RUN = re.compile(r"[\x00-\x7f]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークナイザーに依存しない大まかな見積もり。
+    日本語などASCII以外の文字は1文字1トークン、ASCIIの連なりは4文字で1トークンと数える。
+    """
+    ascii_chars = 0
+    ascii_tokens = 0
+    for run in _ASCII_RUN.findall(text):
+        ascii_chars += len(run)
+        ascii_tokens += math.ceil(len(run.strip()) / 4)
+    return (len(text) - ascii_chars) + ascii_tokens
+
+
+def section_depth(sign: str | None) -> int:
+    """`"2."`は1、`"2.1"`は2。番号の無い見出しは1とみなす。"""
+    numbers = [part for part in (sign or "").strip().rstrip(".").split(".") if part.strip()]
+    return max(len(numbers), 1)
+
+
+def split_text(text: str, max_chars: int) -> list[str]:
+    """`max_chars`を超える文章を、文末で区切ってから詰め直す。1文が長すぎればそのまま切る。"""
+    if len(text) <= max_chars:
+        return [text]
+    pieces: list[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if len(current) + len(sentence) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _segment_text(segment: Segment) -> str:
+    """本文として扱う文字列。表は`content`にキャプション、`sign`にMarkdownの表が入っている。"""
+    match segment.type:
+        case "Figure":
+            return f"{segment.title or ''}\n{segment.content}".strip()
+        case "Table":
+            return f"{segment.content}\n{segment.sign or ''}".strip()
+        case _:
+            return segment.content.strip()
+
+
+@dataclass(frozen=True)
+class Chunk:
+    id: str
+    paper: str
+    title: str
+    year: int
+    authors: list[str]
+    section_path: list[str]
+    kind: str
+    # このチャンクが由来する`segments`の添字の範囲（両端を含む）
+    segments: tuple[int, int]
+    text: str
+    chars: int
+    tokens: int
+
+
+def _chunk_kind(segment: Segment) -> str:
+    return {"Figure": "figure", "Table": "table", "FootNote": "footnote"}.get(segment.type, "body")
+
+
+def chunk_paper(path_pdf: Path, metadata: SimplifiedMetadata, paper: Paper, max_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[Chunk]:
+    """
+    節ごとに、段落・箇条書きを`max_chars`以下にまとめたチャンクを順に返す。
+    図・表・脚注は本文と混ぜず、それぞれ単独のチャンクにする（チャンクは本文の順に並ぶ）。概要は節の外の`abstract`チャンクになる。
+    IDは論文・節・本文から作るハッシュなので、同じ出力からは何度作っても変わらない。
+    """
+    seen: dict[str, int] = {}
+    common = {
+        "paper": path_pdf.name,
+        "title": metadata["title"] or paper.title,
+        "year": metadata["publication_date"]["year"],
+        "authors": [author["name"] for author in metadata["authors"]],
+    }
+
+    def make(section_path: list[str], kind: str, first: int, last: int, text: str) -> Chunk:
+        digest = hashlib.sha1("\0".join([path_pdf.name, *section_path, kind, text]).encode()).hexdigest()[:16]
+        seen[digest] = seen.get(digest, 0) + 1
+        chunk_id = digest if seen[digest] == 1 else f"{digest}-{seen[digest]}"
+        return Chunk(chunk_id, **common, section_path=list(section_path), kind=kind, segments=(first, last), text=text, chars=len(text), tokens=estimate_tokens(text))
+
+    abstract = (metadata["abstract"] or paper.abstract).strip()
+    for piece in split_text(abstract, max_chars) if abstract else []:
+        yield make([], "abstract", -1, -1, piece)
+
+    section_path: list[tuple[int, str]] = []
+    buffer: list[str] = []
+    (first, last) = (-1, -1)
+
+    def flush() -> Iterator[Chunk]:
+        nonlocal buffer
+        if buffer:
+            yield make([name for _, name in section_path], "body", first, last, "\n".join(buffer))
+        buffer = []
+
+    for index, segment in enumerate(paper.segments):
+        if segment.type == "SectionTitle":
+            yield from flush()
+            depth = section_depth(segment.sign)
+            section_path = [entry for entry in section_path if entry[0] < depth]
+            section_path.append((depth, f"{segment.sign or ''} {segment.content}".strip()))
+            continue
+        text = _segment_text(segment)
+        if not text:
+            continue
+        kind = _chunk_kind(segment)
+        if kind != "body":
+            yield from flush()
+            for piece in split_text(text, max_chars):
+                yield make([name for _, name in section_path], kind, index, index, piece)
+            continue
+        for piece in split_text(text, max_chars):
+            if buffer and sum(len(part) + 1 for part in buffer) + len(piece) > max_chars:
+                yield from flush()
+            if not buffer:
+                first = index
+            buffer.append(piece)
+            last = index
+    yield from flush()
+
+
+class ChunkWriter:
+    """バッチ実行中、論文の書き出しのたびにチャンクを`chunks.jsonl`へ追記する。"""
+
+    path: Path
+    max_chars: int
+    chunks: int
+    _file: IO[str]
+
+    def __init__(self, path: Path, max_chars: int = DEFAULT_CHUNK_CHARS):
+        self.path = path
+        self.max_chars = max_chars
+        self.chunks = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("w", encoding="utf-8")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def write(self, path_pdf: Path, metadata: SimplifiedMetadata, paper: Paper) -> int:
+        """チャンクを書き、その数を返す。論文ごとにフラッシュするので、読み手は実行中から追いかけられる。"""
+        written = 0
+        for chunk in chunk_paper(path_pdf, metadata, paper, self.max_chars):
+            self._file.write(json.dumps(asdict(chunk), ensure_ascii=False) + "\n")
+            written += 1
+        self._file.flush()
+        self.chunks += written
+        return written
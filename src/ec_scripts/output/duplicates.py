@@ -0,0 +1,163 @@
+"""
+同じ中身のPDFが複数の`recid_*`に置かれている（再アップロードや、中身の変わらない訂正版）ときに、
+PDFの中身のハッシュでまとめて1回だけ解析し、結果をそれぞれのrecidのメタデータで書き出す。
+"""
+
+from __future__ import annotations
+
+import copy
+import dataclasses
+import hashlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from returns.result import Failure
+
+from ..metadata.metadata_simplifier import simplify_metadata_of_paper
+from ..parsing.pdf2text import Backend
+from ..parsing.pdf_types import Paper
+from ..parsing.stream import WarningCode, exception_report_prior
+from .batch import ParseFailure, ParseOutcome, to_parse_failure
+from .pipeline import parse_paper_only
+from .writer import OutputWriter, OverviewRow
+
+# ハッシュを計算するスレッド数（読み込み待ちが主なのでCPU数より多くてよい）
+DIGEST_THREADS = 8
+
+
+def pdf_digest(path_pdf: Path) -> str:
+    with path_pdf.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+@dataclass
+class DuplicateGroups:
+    """解析する論文（各ハッシュの最初のPDF）と、その結果を使い回す同じ中身のPDF。"""
+
+    unique: list[Path]
+    copies: dict[Path, list[Path]]
+
+    @property
+    def duplicate_count(self) -> int:
+        return sum(len(paths) for paths in self.copies.values())
+
+
+def _digest_or_none(path_pdf: Path) -> str | None:
+    try:
+        return pdf_digest(path_pdf)
+    except OSError:
+        return None
+
+
+def group_duplicates(paths: Iterable[Path], threads: int = DIGEST_THREADS) -> DuplicateGroups:
+    """
+    `paths`のPDFをハッシュでまとめる。順序は`paths`の順を保ち、最初に現れたものを解析する側にする。
+    読めないPDFはどれとも重複しないものとして解析する側に入れ、解析段でほかの論文と同じように失敗させる。
+    """
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        digests = list(executor.map(_digest_or_none, paths))
+    first: dict[str, Path] = {}
+    groups = DuplicateGroups([], {})
+    for path, digest in zip(paths, digests):
+        if digest is None:
+            groups.unique.append(path)
+            continue
+        original = first.setdefault(digest, path)
+        if original is path:
+            groups.unique.append(path)
+        else:
+            groups.copies.setdefault(original, []).append(path)
+    return groups
+
+
+def reuse_paper(paper: Paper, path_copy: Path) -> ParseOutcome:
+    """
+    解析済みの`paper`を、同じ中身の`path_copy`のメタデータと組み合わせる。
+    メタデータ由来の警告だけをこのrecidのものに入れ替え、抽出・解析の時間は払っていないので0にする。
+    """
+    try:
+        (simplified_result, warnings) = simplify_metadata_of_paper(path_copy)
+    except Exception as error:
+        return (path_copy, None, to_parse_failure(error))
+    if isinstance(simplified_result, Failure):
+        return (path_copy, None, to_parse_failure(simplified_result.failure()))
+    metadata = simplified_result.unwrap()
+    reused = copy.copy(paper)
+    # 解析の分岐ごとの時間は元の論文の分として集計済みなので、使い回した分を重ねて数えない
+    reused.profile = None
+    reused.warnings = [exception_report_prior(metadata["title"], warning) for warning in warnings] + [
+        warning for warning in paper.warnings if warning.code != WarningCode.METADATA
+    ]
+    reused.metrics = dataclasses.replace(paper.metrics, extract_seconds=0.0, parse_seconds=0.0)
+    return (path_copy, metadata, reused)
+
+
+def _parse_shared(path_pdf: Path, backend: Backend) -> Paper | ParseFailure:
+    """ワーカープロセスで動く。メタデータを使わずにPDFだけをもう一度解析する（キャッシュがあれば抽出はしない）。"""
+    try:
+        result = parse_paper_only(path_pdf, True, False, backend)
+    except Exception as error:
+        return to_parse_failure(error)
+    if isinstance(result, Failure):
+        return to_parse_failure(result.failure())
+    return result.unwrap()
+
+
+def _write_copies(
+    path_pdf: Path,
+    shared: Paper | ParseFailure,
+    groups: DuplicateGroups,
+    writer: OutputWriter,
+) -> Iterator[tuple[ParseOutcome, OverviewRow | None]]:
+    for path_copy in groups.copies[path_pdf]:
+        if isinstance(shared, ParseFailure):
+            reused: ParseOutcome = (path_copy, None, shared)
+        else:
+            reused = reuse_paper(shared, path_copy)
+        yield (reused, writer.handle(reused, duplicate_of=path_pdf))
+
+
+def _shared_result(future: Future[Paper | ParseFailure]) -> Paper | ParseFailure:
+    try:
+        return future.result()
+    except Exception as error:
+        # ワーカープロセスが落ちた場合など
+        return to_parse_failure(error)
+
+
+def fan_out(
+    results: Iterable[tuple[ParseOutcome, OverviewRow | None]],
+    groups: DuplicateGroups,
+    writer: OutputWriter,
+    backend: Backend = "layout",
+    jobs: int = 1,
+) -> Iterator[tuple[ParseOutcome, OverviewRow | None]]:
+    """
+    解析した論文の結果をそのまま流し、続けて同じ中身のPDFの分を、それぞれのメタデータと組み合わせて書き出して流す。
+    パーサーが報告した失敗（PDFそのものの解析の失敗）なら、同じ中身のPDFも同じ理由で失敗として記録する。
+    報告の無い失敗はそのrecidのメタデータが原因かもしれないため、メタデータを使わずにPDFだけをもう一度解析して使い回す。
+    この解析は書き出しを止めないよう、必要になったときに作る`jobs`個のワーカープロセスで行う。
+    """
+    executor: ProcessPoolExecutor | None = None
+    pending: dict[Future[Paper | ParseFailure], Path] = {}
+    try:
+        for outcome, row in results:
+            yield (outcome, row)
+            (path_pdf, _, paper) = outcome
+            if path_pdf in groups.copies:
+                if isinstance(paper, ParseFailure) and paper.report is None:
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=max(jobs, 1))
+                    pending[executor.submit(_parse_shared, path_pdf, backend)] = path_pdf
+                else:
+                    yield from _write_copies(path_pdf, paper, groups, writer)
+            for future in [future for future in pending if future.done()]:
+                yield from _write_copies(pending.pop(future), _shared_result(future), groups, writer)
+        for future in as_completed(pending):
+            yield from _write_copies(pending[future], _shared_result(future), groups, writer)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,154 @@
+"""
+メモリ予算に合わせて、同時に解析する論文の数を調整する。
+図の多い論文ではレイアウトの木が大きく膨らむため、ワーカー数を固定すると空きメモリを使い切れないか、
+OOMで落とされる。ワーカーが実際に使ったRSSを論文ごとに観測し、次に流す論文のページ数・ファイルサイズから
+必要なメモリを見積もって、予算に収まる分だけを解析段に流す。
+"""
+
+from __future__ import annotations
+
+import resource
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pymupdf
+
+# レイアウト抽出をするときの、ページ1枚あたりの見積もりの初期値（観測で置き換わる）
+BYTES_PER_PAGE = 256 * 1024
+# 最初の観測が返ってくるまでの、見積もりサイズ1バイトあたりのメモリの初期値
+INITIAL_RATIO = {"cached": 8.0, "extract": 4.0}
+# 比率は観測値が大きければすぐに追従し、小さければこの割合でゆっくり下げる
+RATIO_DECAY = 0.8
+
+_STATUS_PATH = Path("/proc/self/status")
+_CLEAR_REFS_PATH = Path("/proc/self/clear_refs")
+
+
+def _status_bytes(key: str) -> int | None:
+    try:
+        for line in _STATUS_PATH.read_text().splitlines():
+            if line.startswith(key):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _maxrss_bytes() -> int:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def current_rss() -> int:
+    """このプロセスの現在のRSS。`/proc`が無い環境では最大RSSで代用する。"""
+    rss = _status_bytes("VmRSS:")
+    return rss if rss is not None else _maxrss_bytes()
+
+
+def reset_peak_rss() -> None:
+    """
+    Linuxでは`clear_refs`に5を書くと最大RSS（`VmHWM`）が現在値に戻り、論文ごとのピークを測れる。
+    戻せない環境では`peak_rss`がプロセス開始からの最大値になり、見積もりは安全側にずれる。
+    """
+    try:
+        _CLEAR_REFS_PATH.write_text("5")
+    except OSError:
+        pass
+
+
+def peak_rss() -> int:
+    peak = _status_bytes("VmHWM:")
+    return peak if peak is not None else _maxrss_bytes()
+
+
+@dataclass(frozen=True)
+class MemorySample:
+    """ワーカーが1本の論文を解析する前のRSS、解析中のピーク、解析後のRSS。`warm`はそのワーカーの2本目以降か。"""
+
+    before: int
+    peak: int
+    after: int
+    warm: bool
+
+    @property
+    def transient(self) -> int:
+        return max(self.peak - self.before, 0)
+
+
+@dataclass(frozen=True)
+class PaperCost:
+    """解析前に分かる、論文1本の重さ。`kind`はレイアウトキャッシュを読むか（`cached`）抽出するか（`extract`）。"""
+
+    kind: str
+    size: int
+
+    @classmethod
+    def of(cls, path_pdf: Path, layout_bytes: int | None) -> PaperCost:
+        if layout_bytes is not None:
+            return cls("cached", layout_bytes)
+        with pymupdf.open(path_pdf) as doc:
+            pages = doc.page_count
+        return cls("extract", path_pdf.stat().st_size + pages * BYTES_PER_PAGE)
+
+
+@dataclass
+class MemoryBudget:
+    """
+    `limit`バイトの予算から、ワーカー`workers`個の常駐分を除いた残りを、解析中の論文の見積もりで分け合う。
+    解析中の論文が無ければ、見積もりが予算を超えていても1本は流す（進まなくなるのを防ぐ）。
+    ワーカーの常駐分はモデルを読み込むまで分からないため、最初の観測が返るまでは1本ずつ流す。
+    """
+
+    limit: int
+    workers: int
+    worker_rss: int = field(default_factory=current_rss)
+    ratios: dict[str, float] = field(default_factory=lambda: dict(INITIAL_RATIO))
+    in_flight: int = 0
+    reserved: int = 0
+    max_in_flight: int = 0
+    max_reserved: int = 0
+    max_transient: int = 0
+    samples: int = 0
+    _condition: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    def predict(self, cost: PaperCost) -> int:
+        return int(self.ratios[cost.kind] * cost.size)
+
+    def available(self) -> int:
+        return self.limit - self.workers * self.worker_rss
+
+    def _fits(self, predicted: int) -> bool:
+        if self.in_flight == 0:
+            return True
+        return self.samples > 0 and self.reserved + predicted <= self.available()
+
+    def acquire(self, cost: PaperCost, stop: threading.Event | None = None) -> int:
+        """見積もりが予算に収まるまで待ち、予約した量を返す（`release`に渡す）。"""
+        predicted = self.predict(cost)
+        with self._condition:
+            while not self._fits(predicted):
+                if stop is not None and stop.is_set():
+                    break
+                self._condition.wait(timeout=0.5)
+            self.in_flight += 1
+            self.reserved += predicted
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.max_reserved = max(self.max_reserved, self.reserved)
+        return predicted
+
+    def release(self, reserved: int, cost: PaperCost, sample: MemorySample | None) -> None:
+        """解析が終わった論文の予約を返し、観測したRSSで見積もりを更新する。"""
+        with self._condition:
+            self.in_flight -= 1
+            self.reserved -= reserved
+            if sample is not None:
+                self.samples += 1
+                self.worker_rss = max(self.worker_rss, sample.after)
+                self.max_transient = max(self.max_transient, sample.transient)
+                # ワーカーの1本目はレイアウト解析モデルの読み込みなど一度きりの確保を含むため、比率には使わない
+                if sample.warm and cost.size > 0:
+                    observed = sample.transient / cost.size
+                    self.ratios[cost.kind] = max(observed, self.ratios[cost.kind] * RATIO_DECAY + observed * (1 - RATIO_DECAY))
+            self._condition.notify_all()
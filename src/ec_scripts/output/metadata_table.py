@@ -0,0 +1,164 @@
+"""PDFに触れずに、アーカイブ全体のメタデータだけを簡略化して一覧表にする。"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from returns.result import Failure
+
+from ..json_io import DEFAULT_JSON_OUTPUT, JsonOutputOptions
+from ..metadata.metadata_simplifier import simplify_metadata_file
+from ..metadata.metadata_types import SimplifiedMetadata
+from .pipeline import metadata_decode_json
+
+METADATA_TABLE_FIELDS = [
+    "recid",
+    "folder",
+    "title",
+    "abstract",
+    "year",
+    "month",
+    "day",
+    "authors",
+    "affiliations",
+    "bibliographic_title",
+    "page_start",
+    "page_end",
+    "volume_number",
+    "language",
+    "file_url",
+    "self_url",
+    "warnings",
+    "error",
+]
+
+
+@dataclass
+class MetadataRecord:
+    """1つの`recid_*`フォルダのメタデータ簡略化結果。"""
+
+    recid: str
+    folder: str
+    metadata: SimplifiedMetadata | None
+    warnings: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    def to_json_line(self) -> str:
+        return json.dumps(
+            {
+                "recid": self.recid,
+                "folder": self.folder,
+                "metadata": self.metadata,
+                "warnings": self.warnings,
+                "error": self.error,
+            },
+            ensure_ascii=False,
+        )
+
+    def to_row(self) -> dict[str, str | int]:
+        row: dict[str, str | int] = {
+            "recid": self.recid,
+            "folder": self.folder,
+            "warnings": " ; ".join(self.warnings),
+            "error": self.error or "",
+        }
+        metadata = self.metadata
+        if metadata is None:
+            return row
+        row.update(
+            {
+                "title": metadata["title"],
+                "abstract": metadata["abstract"],
+                "year": metadata["publication_date"]["year"],
+                "month": metadata["publication_date"]["month"],
+                "day": metadata["publication_date"]["day"],
+                "authors": " ; ".join(author["name"] for author in metadata["authors"]),
+                "affiliations": " ; ".join(author["affiliation"] for author in metadata["authors"]),
+                "bibliographic_title": metadata["bibliographic"]["title"],
+                "page_start": metadata["bibliographic"]["page_start"],
+                "page_end": metadata["bibliographic"]["page_end"],
+                "volume_number": metadata["bibliographic"]["volume_number"],
+                "language": metadata["language"],
+                "file_url": metadata["urls"]["file"],
+                "self_url": metadata["urls"]["self"],
+            }
+        )
+        return row
+
+
+def find_metadata_files(root_path: Path) -> list[Path]:
+    return sorted(root_path.glob("./data/recid_*/*_metadata.json"))
+
+
+def output_folder_name(json_path: Path) -> str:
+    """
+    論文フォルダ名は通常の出力と揃えてPDFのファイル名とする（PDFの中身は読まない）。
+    PDFが見つからなければ`recid_*`フォルダ名を使う。
+    """
+    pdfs = sorted(json_path.parent.glob("*.pdf"))
+    return pdfs[0].name if pdfs else json_path.parent.name
+
+
+def simplify_metadata_record(json_path: Path) -> MetadataRecord:
+    recid = json_path.parent.name
+    folder = output_folder_name(json_path)
+    try:
+        (result, warnings) = simplify_metadata_file(json_path)
+    except (OSError, ValueError) as error:
+        return MetadataRecord(recid, folder, None, [], f"{type(error).__name__}: {error}")
+    if isinstance(result, Failure):
+        return MetadataRecord(recid, folder, None, warnings, str(result.failure()))
+    return MetadataRecord(recid, folder, result.unwrap(), warnings)
+
+
+def simplify_metadata_records(json_paths: list[Path], jobs: int = 1) -> Iterator[MetadataRecord]:
+    """各メタデータJSONを簡略化する。`jobs > 1`なら複数プロセスでまとめて読み込む。"""
+    if jobs <= 1:
+        yield from map(simplify_metadata_record, json_paths)
+        return
+    chunksize = max(1, len(json_paths) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(simplify_metadata_record, json_paths, chunksize=chunksize)
+
+
+def write_metadata_table(out_path: Path, records: Iterable[MetadataRecord]) -> None:
+    """`metadata.jsonl`と`metadata.csv`をrecid順に書き出す。"""
+    out_path.mkdir(parents=True, exist_ok=True)
+    ordered = sorted(records, key=lambda record: record.recid)
+    with (out_path / "metadata.jsonl").open("w", encoding="utf-8") as f:
+        for record in ordered:
+            f.write(record.to_json_line() + "\n")
+    with (out_path / "metadata.csv").open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=METADATA_TABLE_FIELDS)
+        writer.writeheader()
+        for record in ordered:
+            writer.writerow(record.to_row())
+
+
+def refresh_metadata(
+    root_path: Path,
+    out_path: Path,
+    jobs: int | None = None,
+    options: JsonOutputOptions = DEFAULT_JSON_OUTPUT,
+) -> list[MetadataRecord]:
+    """
+    `root_path/data/recid_*/*_metadata.json`だけを読み、論文フォルダごとの`metadata.json`と
+    全体の`metadata.jsonl` / `metadata.csv`を`out_path`に書き出す。
+    """
+    json_paths = find_metadata_files(root_path)
+    records: list[MetadataRecord] = []
+    for record in simplify_metadata_records(json_paths, jobs or os.cpu_count() or 1):
+        records.append(record)
+        if record.metadata is None:
+            continue
+        target_folder = out_path / record.folder
+        target_folder.mkdir(parents=True, exist_ok=True)
+        metadata_decode_json(target_folder / "metadata.json", record.metadata, options)
+    write_metadata_table(out_path, records)
+    return records
@@ -4,16 +4,23 @@ from __future__ import annotations
 
 import csv
 from pathlib import Path
+from typing import Iterable
 
+from ..metadata.metadata_types import SimplifiedMetadata
 from ..parsing.pdf_types import Paper
+from ..parsing.tokens import TokenType
 
 
-def summarize_warnings(paper: Paper) -> dict[str, str | int]:
+def group_warnings(paper: Paper) -> dict[str, list[str]]:
+    """警告を`WarningCode`ごとにまとめる。"""
     groups: dict[str, list[str]] = {}
     for warning in paper.warnings:
-        message = warning.exception
-        key = message[:10]
-        groups.setdefault(key, []).append(message)
+        groups.setdefault(str(warning.code), []).append(warning.exception)
+    return groups
+
+
+def summarize_warnings(paper: Paper) -> dict[str, str | int]:
+    groups = group_warnings(paper)
     group_summaries: list[str] = []
     group_examples: list[str] = []
     for key in sorted(groups.keys()):
@@ -30,38 +37,93 @@ def summarize_warnings(paper: Paper) -> dict[str, str | int]:
 
 
 def summarize_segments(paper: Paper) -> dict[str, int]:
-    section_count = 0
-    paragraph_count = 0
-    for segment in paper.segments:
-        if segment.type == "SectionTitle":
-            section_count += 1
-        elif segment.type == "Paragraph":
-            paragraph_count += 1
+    counts = paper.metrics.segment_counts
     return {
-        "section_count": section_count,
-        "paragraph_count": paragraph_count,
+        "section_count": counts.get("SectionTitle", 0),
+        "paragraph_count": counts.get("Paragraph", 0),
+        "list_count": counts.get("ListItems", 0),
+        "figure_count": counts.get("Figure", 0),
+        "table_count": counts.get("Table", 0),
+        "footnote_count": counts.get("FootNote", 0),
     }
 
 def summarize_references(paper: Paper) -> dict[str, int]:
     return {"reference_count": len(paper.references)}
 
 
-def write_overview_csv(out_path: Path, rows: list[dict[str, str | int]]) -> None:
+def summarize_metrics(paper: Paper) -> dict[str, str | int | float]:
+    metrics = paper.metrics
+    return {
+        "page_count": metrics.page_count,
+        "token_count": sum(metrics.token_counts.values()),
+        **{f"tokens_{token_type.value}": metrics.token_counts.get(token_type.value, 0) for token_type in TokenType},
+        "text_chars": metrics.text_chars,
+        "layout_cached": int(metrics.layout_cached),
+        "extract_seconds": round(metrics.extract_seconds, 4),
+        "parse_seconds": round(metrics.parse_seconds, 4),
+    }
+
+
+def overview_row(path_pdf: Path, metadata: SimplifiedMetadata, paper: Paper, duplicate_of: Path | None = None) -> dict[str, str | int | float]:
+    """`duplicate_of`は、同じ中身のPDFとして解析結果を使い回した元の論文。"""
+    return {
+        "paper_title": metadata.get("title", ""),
+        "pdf_path": str(path_pdf),
+        **summarize_segments(paper),
+        **summarize_references(paper),
+        **summarize_metrics(paper),
+        "duplicate_of": "" if duplicate_of is None else str(duplicate_of),
+        **summarize_warnings(paper),
+    }
+
+
+OVERVIEW_FIELDS = [
+    "paper_title",
+    "pdf_path",
+    "section_count",
+    "paragraph_count",
+    "list_count",
+    "figure_count",
+    "table_count",
+    "footnote_count",
+    "reference_count",
+    "page_count",
+    "token_count",
+    *(f"tokens_{token_type.value}" for token_type in TokenType),
+    "text_chars",
+    "layout_cached",
+    "extract_seconds",
+    "parse_seconds",
+    "duplicate_of",
+    "warning_count",
+    "warning_group_count",
+    "warning_groups",
+    "warning_examples",
+]
+
+
+def write_overview_csv(out_path: Path, rows: list[dict[str, str | int | float]]) -> None:
     out_path.mkdir(parents=True, exist_ok=True)
     overview_path = out_path / "overview.csv"
-    fieldnames = [
-        "paper_title",
-        "pdf_path",
-        "section_count",
-        "paragraph_count",
-        "reference_count",
-        "warning_count",
-        "warning_group_count",
-        "warning_groups",
-        "warning_examples",
-    ]
     with overview_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=OVERVIEW_FIELDS, extrasaction="ignore")
         writer.writeheader()
         for row in rows:
             writer.writerow(row)
+
+
+def update_overview_csv(out_path: Path, rows: list[dict[str, str | int | float]], removed: Iterable[Path] = ()) -> None:
+    """
+    既存の`overview.csv`のうち、`rows`と同じ`pdf_path`の行だけを置き換え（無ければ追加し）、`pdf_path`順に書き直す。
+    `removed`の論文（今回解析に失敗した論文など）の行は消す。
+    """
+    overview_path = out_path / "overview.csv"
+    merged: dict[str, dict[str, str | int | float]] = {}
+    if overview_path.exists():
+        with overview_path.open(encoding="utf-8", newline="") as f:
+            merged = {row["pdf_path"]: dict(row) for row in csv.DictReader(f)}
+    for path_pdf in removed:
+        merged.pop(str(path_pdf), None)
+    for row in rows:
+        merged[str(row["pdf_path"])] = row
+    write_overview_csv(out_path, [merged[key] for key in sorted(merged)])
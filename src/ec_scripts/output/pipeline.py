@@ -2,62 +2,140 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 import shutil
+import time
 from pathlib import Path
+from typing import Callable
 
 from returns.primitives.exceptions import UnwrapFailedError
-from returns.result import safe
+from returns.result import Result, safe
 
-from ..metadata.metadata_simplifier import simplify_metadata_of_paper
+from ..json_io import DEFAULT_JSON_OUTPUT, JsonOutputOptions, dump_json
+from ..metadata.metadata_simplifier import simplify_metadata_bytes, simplify_metadata_of_paper
 from ..metadata.metadata_types import SimplifiedMetadata
+from ..parsing.citations import link_citations
 from ..parsing.paper_parser import parse_paper
 from ..parsing.stream import TokenStream, exception_report_prior
-from ..parsing.pdf2text import pdf2json
+from ..parsing.pdf2text import Backend, content_cache_path, json_cache_path, load_layout_tokens, load_layout_tokens_from_bytes
 from ..parsing.pdf_types import Paper
+from ..parsing.profile import ParseProfile
+from ..parsing.tokens import Token
 
 
-@safe(exceptions=(UnwrapFailedError,))
-def parse_metadata_and_paper(path: Path):
-    (simplified_result, warnings) = simplify_metadata_of_paper(path)
-    metadata = simplified_result.unwrap()
+def _parse_into(paper: Paper, path: Path, cached: bool, backend: Backend, prefetched: bytes | bytearray | None = None) -> None:
+    """レイアウトを読み込んで`paper`に解析し、抽出・解析それぞれの所要時間を`paper.metrics`に記録する。"""
+    layout_cached = backend == "layout" and (prefetched is not None or (cached and json_cache_path(path).exists()))
+    _parse_loaded(paper, path, lambda: load_layout_tokens(path, cached, backend, prefetched), layout_cached)
+
+
+def _parse_loaded(paper: Paper, filename: Path, load: Callable[[], Result[tuple[list[Token], int], Exception]], layout_cached: bool) -> None:
+    start = time.perf_counter()
+    (tokens, page_count) = load().unwrap()
+    extracted = time.perf_counter()
+    tokenstream = TokenStream.from_tokens(filename, tokens, page_count)
+    paper.metrics.count_tokens(tokenstream.page_count, (token.type.value for token in tokenstream.tokens))
+
+    parse_paper(paper, tokenstream).unwrap()
+    paper.metrics.layout_cached = layout_cached
+    paper.metrics.extract_seconds = extracted - start
+    paper.metrics.parse_seconds = time.perf_counter() - extracted
 
+
+def _profile_of(profile: bool | ParseProfile) -> ParseProfile | None:
+    """
+    `profile`に`ParseProfile`を渡すと、`Paper.profile`としてそれに記録する。
+    解析に失敗すると`Paper`は返らないため、呼び出し元が集計を受け取りたいときに使う。
+    """
+    if isinstance(profile, ParseProfile):
+        return profile
+    return ParseProfile() if profile else None
+
+
+def _new_paper(metadata: SimplifiedMetadata, warnings: list[str], profile: bool | ParseProfile) -> Paper:
     paper = Paper()
+    paper.profile = _profile_of(profile)
     for warning in warnings:
         paper.warnings.append(exception_report_prior(metadata["title"], warning))
-    pdf_document = pdf2json(path).unwrap()
-    tokenstream = TokenStream(path, pdf_document)
+    return paper
 
-    parse_paper(paper, tokenstream).unwrap()
+
+@safe(exceptions=(UnwrapFailedError,))
+def parse_metadata_and_paper(path: Path, cached: bool = True, profile: bool | ParseProfile = False, backend: Backend = "layout"):
+    (simplified_result, warnings) = simplify_metadata_of_paper(path)
+    metadata = simplified_result.unwrap()
+
+    paper = _new_paper(metadata, warnings, profile)
+    _parse_into(paper, path, cached, backend)
+    return (metadata, paper)
+
+@safe(exceptions=(UnwrapFailedError,))
+def parse_prefetched(
+    path: Path,
+    metadata_bytes: bytes,
+    layout_bytes: bytes | bytearray | None,
+    profile: bool | ParseProfile = False,
+    backend: Backend = "layout",
+):
+    """
+    `parse_metadata_and_paper`と同じ結果を、先読みしておいたメタデータJSONとレイアウトキャッシュの中身から作る。
+    `layout_bytes`が`None`なら通常どおりキャッシュを探すか抽出する。
+    """
+    (simplified_result, warnings) = simplify_metadata_bytes(metadata_bytes)
+    metadata = simplified_result.unwrap()
+
+    paper = _new_paper(metadata, warnings, profile)
+    _parse_into(paper, path, True, backend, layout_bytes)
     return (metadata, paper)
 
 @safe(exceptions=(UnwrapFailedError,))
-def parse_paper_only(path: Path):
+def parse_paper_only(path: Path, cached: bool = True, profile: bool | ParseProfile = False, backend: Backend = "layout"):
     paper = Paper()
-    pdf_document = pdf2json(path).unwrap()
-    tokenstream = TokenStream(path, pdf_document)
+    paper.profile = _profile_of(profile)
+    _parse_into(paper, path, cached, backend)
+    return (paper)
 
-    parse_paper(paper, tokenstream).unwrap()
+@safe(exceptions=(UnwrapFailedError,))
+def parse_paper_bytes(
+    data: bytes,
+    filename: str = "<stdin>",
+    cache_dir: Path | None = None,
+    profile: bool | ParseProfile = False,
+    backend: Backend = "layout",
+):
+    """
+    `parse_paper_only`のバイト列版。メモリ上のPDFを解析し、一時ファイルを作らずに`Paper`を返す。
+    `cache_dir`を渡したときだけ、PDFの中身のハッシュをキーにしたレイアウトキャッシュを読み書きする。
+    """
+    paper = Paper()
+    paper.profile = _profile_of(profile)
+    layout_cached = backend == "layout" and cache_dir is not None and content_cache_path(cache_dir, data).exists()
+    _parse_loaded(paper, Path(filename), lambda: load_layout_tokens_from_bytes(data, filename, cache_dir, backend), layout_cached)
     return (paper)
 
-def metadata_decode_json(out: Path, metadata: SimplifiedMetadata):
-    return out.write_text(json.dumps(metadata, ensure_ascii=False, indent=4), encoding="utf-8")
+def metadata_decode_json(out: Path, metadata: SimplifiedMetadata, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT):
+    return dump_json(metadata, out, options)
 
 
-def tidy_up_paper_folder(path_pdf: Path, out_path: Path):
+def write_paper_folder(path_pdf: Path, out_path: Path, metadata: SimplifiedMetadata, paper: Paper, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT):
+    """解析済みの論文を`out_path / path_pdf.name`以下に書き出す。"""
     target_folder = out_path / path_pdf.name
     os.makedirs(target_folder, exist_ok=True)
     metadata_path = target_folder / "metadata.json"
     content_path = target_folder / "content.json"
     warning_path = target_folder / "fallbacks.json"
+    citations_path = target_folder / "citations.json"
     pdf_path = target_folder / "paper.pdf"
 
-    (metadata, paper) = parse_metadata_and_paper(path_pdf).unwrap()
-    metadata_decode_json(metadata_path, metadata)
+    metadata_decode_json(metadata_path, metadata, options)
     paper.warn()
-    paper.decode_json(content_path, warning_path)
+    paper.decode_json(content_path, warning_path, options)
+    dump_json(link_citations(paper).to_dict(), citations_path, options)
     shutil.copy(path_pdf, pdf_path)
 
+
+def tidy_up_paper_folder(path_pdf: Path, out_path: Path, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT):
+    (metadata, paper) = parse_metadata_and_paper(path_pdf).unwrap()
+    write_paper_folder(path_pdf, out_path, metadata, paper, options)
     return metadata, paper
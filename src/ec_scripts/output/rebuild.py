@@ -0,0 +1,166 @@
+"""
+PDFを解析し直さずに、出力フォルダの論文ごとの`metadata.json`・`content.json`・`fallbacks.json`から
+`overview.csv`と各索引を作り直す。集計の列や`summarize_warnings`のまとめ方を変えたときに使う。
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+from ..json_io import load_json, resolve_json_path
+from ..metadata.metadata_types import SimplifiedMetadata
+from ..parsing.pdf_types import Paper, Reference, Segment
+from ..parsing.stream import SURROUNDING_RADIUS, ExceptionReport, WarningCode
+from ..parsing.tokens import Token, TokenType
+from .chunks import CHUNKS_NAME, ChunkWriter
+from .overview import overview_row, write_overview_csv
+from .reference_index import REFERENCE_INDEX_NAME, ReferenceIndex
+from .topic_index import TOPIC_INDEX_NAME, TopicIndex
+from .warning_index import WARNING_INDEX_NAME, WarningIndex
+from .writer import OverviewRow
+
+# `content.json`には残らない、抽出・解析したときの値。既存の`overview.csv`の行から引き継ぐ
+CARRIED_FIELDS = (
+    "page_count",
+    "token_count",
+    *(f"tokens_{token_type.value}" for token_type in TokenType),
+    "layout_cached",
+    "extract_seconds",
+    "parse_seconds",
+    "duplicate_of",
+)
+
+
+@dataclass
+class LoadedPaper:
+    """論文フォルダ1つから読み戻した結果。読めなければ`error`に理由が入る。"""
+
+    folder: str
+    metadata: SimplifiedMetadata | None
+    paper: Paper | None
+    error: str | None = None
+
+
+def find_paper_folders(out_path: Path) -> list[Path]:
+    """`content.json`（圧縮されていてもよい）を持つ論文フォルダを名前順に返す。"""
+    folders: list[Path] = []
+    for folder in sorted(out_path.iterdir()):
+        try:
+            resolve_json_path(folder / "content.json")
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        folders.append(folder)
+    return folders
+
+
+def _token_from_dict(obj: dict[str, str]) -> Token:
+    """`Token.to_dict`の逆。`type`は`str(TokenType.TEXT)`、つまり`"TokenType.TEXT"`の形で書かれている。"""
+    lines = obj["content"].split("\n")
+    token_type = TokenType[obj["type"].removeprefix("TokenType.")]
+    return Token(token_type, "".join(lines), lines, [0] * len(lines), [False] * len(lines), [])
+
+
+def _report_from_dict(obj: dict[str, Any]) -> ExceptionReport:
+    """
+    `ExceptionReport.decode_dict`の逆。前後のトークンのうち警告が出た位置は書き出されていないが、
+    `exception_report`は前後`SURROUNDING_RADIUS`個を取るので位置から決まる（メタデータ由来の警告は-1）。
+    """
+    position = obj["current_position"]
+    tokens = [_token_from_dict(token) for token in obj["surroundings"]]
+    return ExceptionReport(obj["filename"], position, (tokens, min(position, SURROUNDING_RADIUS)), obj["explanation"], WarningCode(obj["code"]))
+
+
+def paper_from_outputs(content: dict[str, Any], fallbacks: dict[str, Any]) -> Paper:
+    """
+    `content.json`と`fallbacks.json`の中身から`Paper`を組み立てる。
+    セグメント数と本文の文字数は解析中と同じ規則で数え直す（箇条書きは要素ごとに付けた改行を除く）。
+    """
+    paper = Paper()
+    paper.title = content["title"]
+    paper.abstract = content["abstract"]
+    paper.keywords = content["keywords"]
+    for obj in content["segments"]:
+        segment = Segment(**obj)
+        paper.segments.append(segment)
+        paper.metrics.count_segment(segment)
+        match segment.type:
+            case "SectionTitle" | "Paragraph" | "FootNote":
+                paper.metrics.text_chars += len(segment.content)
+            case "ListItems":
+                paper.metrics.text_chars += len(segment.content) - segment.content.count("\n")
+    paper.references = [Reference(**obj) for obj in content["references"]]
+    paper.warnings = [_report_from_dict(obj) for obj in fallbacks["warnings"]]
+    return paper
+
+
+def load_paper_folder(folder: Path) -> LoadedPaper:
+    """論文フォルダから`metadata.json`・`content.json`・`fallbacks.json`だけを読む（`citations.json`とPDFは読まない）。"""
+    try:
+        metadata = load_json(folder / "metadata.json")
+        paper = paper_from_outputs(load_json(folder / "content.json"), load_json(folder / "fallbacks.json"))
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        return LoadedPaper(folder.name, None, None, f"{type(error).__name__}: {error}")
+    return LoadedPaper(folder.name, metadata, paper)
+
+
+def load_paper_folders(folders: list[Path], jobs: int = 1) -> Iterator[LoadedPaper]:
+    """各論文フォルダを読み戻す。`jobs > 1`なら複数プロセスで読み込む（順序は`folders`のまま）。"""
+    if jobs <= 1:
+        yield from map(load_paper_folder, folders)
+        return
+    chunksize = max(1, len(folders) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(load_paper_folder, folders, chunksize=chunksize)
+
+
+def read_previous_rows(out_path: Path) -> dict[str, dict[str, str]]:
+    """既存の`overview.csv`の行を論文フォルダ名（`pdf_path`のファイル名）ごとに返す。"""
+    overview_path = out_path / "overview.csv"
+    if not overview_path.exists():
+        return {}
+    with overview_path.open(encoding="utf-8", newline="") as f:
+        return {Path(row["pdf_path"]).name: row for row in csv.DictReader(f)}
+
+
+def rebuild_outputs(out_path: Path, jobs: int | None = None, chunk_chars: int | None = None) -> list[LoadedPaper]:
+    """
+    `out_path`の論文フォルダをすべて読み戻し、`overview.csv`を書き直して、各索引の論文ごとの行を置き換える。
+    `pdf_path`と`CARRIED_FIELDS`の列は既存の`overview.csv`から引き継ぎ、行が無ければ`pdf_path`は論文フォルダのパス、
+    ほかは空欄にする。読めなかった論文フォルダと、論文フォルダの無い論文（解析に失敗した論文の`fatal`な警告など）の索引の行はそのまま残す。
+    `chunk_chars`を渡すと`chunks.jsonl`も作り直す。
+    """
+    previous = read_previous_rows(out_path)
+    loaded: list[LoadedPaper] = []
+    rows: list[OverviewRow] = []
+    with (
+        WarningIndex(out_path / WARNING_INDEX_NAME) as warning_index,
+        ReferenceIndex(out_path / REFERENCE_INDEX_NAME) as reference_index,
+        TopicIndex(out_path / TOPIC_INDEX_NAME) as topic_index,
+        ChunkWriter(out_path / CHUNKS_NAME, chunk_chars) if chunk_chars is not None else nullcontext() as chunk_writer,
+    ):
+        for result in load_paper_folders(find_paper_folders(out_path), jobs or os.cpu_count() or 1):
+            loaded.append(result)
+            old = previous.get(result.folder)
+            if result.metadata is None or result.paper is None:
+                logging.error(f"{result.folder} を読み込めませんでした（overview.csv の行と索引は前のままにします）: {result.error}")
+                if old is not None:
+                    rows.append(old)
+                continue
+            # 論文フォルダ名はPDFのファイル名なので、行が無くても索引のキー（`path_pdf.name`）は変わらない
+            path_pdf = Path(old["pdf_path"]) if old is not None else out_path / result.folder
+            warning_index.replace_paper(path_pdf, result.paper.warnings)
+            reference_index.replace_paper(path_pdf, result.paper.title, result.paper.references)
+            topic_index.replace_paper(path_pdf, result.metadata, result.paper)
+            if chunk_writer is not None:
+                chunk_writer.write(path_pdf, result.metadata, result.paper)
+            row = overview_row(path_pdf, result.metadata, result.paper)
+            rows.append(row | {field: "" if old is None else old.get(field, "") for field in CARRIED_FIELDS})
+    write_overview_csv(out_path, sorted(rows, key=lambda row: str(row["pdf_path"])))
+    return loaded
@@ -0,0 +1,150 @@
+"""
+コーパス全体の参考文献索引（`references.sqlite`）。
+参考文献の文字列を正規化したキーで同一の文献をまとめ、文献から引用している論文への転置索引を作る。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from ..parsing.pdf_types import Reference
+from .sqlite_index import SqliteIndex
+
+REFERENCE_INDEX_NAME = "references.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    work_id TEXT PRIMARY KEY,
+    normalized TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS papers (
+    paper TEXT PRIMARY KEY,
+    pdf_path TEXT NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS citations (
+    paper TEXT NOT NULL,
+    work_id TEXT NOT NULL,
+    sign TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS citations_work ON citations (work_id, paper);
+CREATE INDEX IF NOT EXISTS citations_paper ON citations (paper);
+"""
+
+# 正規化で取り除く文字種（句読点・記号・空白・制御文字）
+_IGNORED_CATEGORIES = ("P", "S", "Z", "C")
+
+
+@dataclass(frozen=True)
+class CitedWork:
+    work_id: str
+    content: str
+    citing_papers: int
+
+
+@dataclass(frozen=True)
+class Citation:
+    paper: str
+    title: str
+    work_id: str
+    sign: str
+    content: str
+
+
+def normalize_reference(content: str) -> str:
+    """
+    NFKCで全角・半角を揃えて大文字小文字を畳み、句読点・記号・空白を落とす。
+    改行位置やハイフン、区切り記号の違いだけの参考文献が同じキーになる。
+    """
+    folded = unicodedata.normalize("NFKC", content).casefold()
+    return "".join(char for char in folded if not unicodedata.category(char).startswith(_IGNORED_CATEGORIES))
+
+
+def reference_key(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class ReferenceIndex(SqliteIndex):
+    """参考文献索引への読み書き。"""
+
+    SCHEMA = _SCHEMA
+    PAPER_TABLES = ("papers", "citations")
+    SHARED_TABLES = ("works",)
+
+    # 論文の行を消した・取り込んだときだけ、閉じるときに孤立した文献を消す（読むだけなら何も書き込まない）
+    _dirty: bool = False
+
+    def replace_paper(self, path_pdf: Path, title: str, references: Iterable[Reference]) -> None:
+        """`path_pdf`の論文の参考文献をすべて`references`で置き換える。"""
+        paper = path_pdf.name
+        works: list[tuple[str, str, str]] = []
+        citations: list[tuple[str, str, str, int]] = []
+        for position, reference in enumerate(references):
+            normalized = normalize_reference(reference.content)
+            if not normalized:
+                continue
+            work_id = reference_key(normalized)
+            works.append((work_id, normalized, reference.content.strip()))
+            citations.append((paper, work_id, reference.sign, position))
+        with self.connection:
+            self._delete_paper(paper)
+            self.connection.execute("INSERT INTO papers VALUES (?, ?, ?)", (paper, str(path_pdf), title))
+            self.connection.executemany("INSERT OR IGNORE INTO works VALUES (?, ?, ?)", works)
+            self.connection.executemany("INSERT INTO citations VALUES (?, ?, ?, ?)", citations)
+
+    def most_cited(self, limit: int = 20) -> list[CitedWork]:
+        """引用している論文の数が多い順に文献を返す。"""
+        rows = self.connection.execute(
+            """
+            SELECT works.work_id, works.content, COUNT(DISTINCT citations.paper) AS citing
+            FROM citations JOIN works USING (work_id)
+            GROUP BY works.work_id ORDER BY citing DESC, works.work_id LIMIT ?
+            """,
+            (limit,),
+        )
+        return [CitedWork(work_id, content, citing) for (work_id, content, citing) in rows]
+
+    def citing(self, work_id: str) -> list[Citation]:
+        """文献`work_id`を引用している論文。"""
+        return self._citations("citations.work_id = ?", work_id)
+
+    def cited_by(self, paper: str) -> list[Citation]:
+        """論文フォルダ名`paper`の参考文献。"""
+        return self._citations("citations.paper = ?", paper)
+
+    def _citations(self, condition: str, value: str) -> list[Citation]:
+        rows = self.connection.execute(
+            f"""
+            SELECT citations.paper, papers.title, citations.work_id, citations.sign, works.content
+            FROM citations JOIN works USING (work_id) JOIN papers USING (paper)
+            WHERE {condition} ORDER BY citations.paper, citations.position
+            """,
+            (value,),
+        )
+        return [Citation(*row) for row in rows]
+
+    def _delete_paper(self, paper: str) -> None:
+        self._dirty = True
+        super()._delete_paper(paper)
+
+    def absorb(self, other_path: Path, skip: Iterable[str] = ()) -> None:
+        self._dirty = True
+        super().absorb(other_path, skip)
+
+    def close(self) -> None:
+        # 論文の置き換え・取り込みのたびではなく、閉じるときにまとめて孤立した文献を消す
+        if self._dirty:
+            self.prune_works()
+        super().close()
+
+    def prune_works(self) -> int:
+        """どの論文からも引用されなくなった文献を削除し、その数を返す。"""
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM works WHERE work_id NOT IN (SELECT work_id FROM citations)")
+        return cursor.rowcount
@@ -0,0 +1,131 @@
+"""複数ノードで分担処理するためのシャード割り当てと、シャードごとの出力の統合。"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from .chunks import CHUNKS_NAME
+from .reference_index import REFERENCE_INDEX_NAME, ReferenceIndex
+from .sqlite_index import SqliteIndex
+from .topic_index import TOPIC_INDEX_NAME, TopicIndex
+from .warning_index import WARNING_INDEX_NAME, WarningIndex
+
+_INDEXES: tuple[tuple[str, type[SqliteIndex]], ...] = (
+    (WARNING_INDEX_NAME, WarningIndex),
+    (REFERENCE_INDEX_NAME, ReferenceIndex),
+    (TOPIC_INDEX_NAME, TopicIndex),
+)
+
+
+@dataclass(frozen=True)
+class Shard:
+    """`index / count`番目のシャード（`index`は0始まり）。"""
+
+    index: int
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def contains(self, path_pdf: Path) -> bool:
+        return shard_of(recid_of(path_pdf), self.count) == self.index
+
+
+def parse_shard(spec: str) -> Shard:
+    """`"i/N"`形式のシャード指定を読む。`0 <= i < N`でなければ`ValueError`。"""
+    index_text, sep, count_text = spec.partition("/")
+    if not sep or not index_text.isdigit() or not count_text.isdigit():
+        raise ValueError(f"shard must be written as i/N: {spec!r}")
+    shard = Shard(int(index_text), int(count_text))
+    if shard.count < 1 or not 0 <= shard.index < shard.count:
+        raise ValueError(f"shard index must satisfy 0 <= i < N: {spec!r}")
+    return shard
+
+
+def recid_of(path_pdf: Path) -> str:
+    """`data/recid_*/xxx.pdf`の`recid_*`フォルダ名を返す。"""
+    return path_pdf.parent.name
+
+
+def shard_of(recid: str, count: int) -> int:
+    """
+    recidのハッシュからシャード番号を決める。
+    Pythonの`hash()`は実行ごとに変わるため、ノード間で一致するSHA-1を用いる。
+    """
+    digest = hashlib.sha1(recid.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def select_shard(paths: Iterable[Path], shard: Shard | None) -> list[Path]:
+    if shard is None:
+        return list(paths)
+    return [path for path in paths if shard.contains(path)]
+
+
+def read_overview_csv(path: Path) -> tuple[list[str], list[dict[str, str]]]:
+    with path.open(encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        return (list(reader.fieldnames or []), list(reader))
+
+
+def merge_shard_outputs(shard_dirs: Iterable[Path], out_path: Path) -> int:
+    """
+    シャードごとの出力フォルダ（論文フォルダ群と`overview.csv`、各索引）を`out_path`にまとめる。
+    再解析はせず、論文フォルダはコピー、`overview.csv`は行を連結して`pdf_path`順に並べ直し、各索引は取り込む。
+    `chunks.jsonl`は、コピーした論文の行だけをシャードの順に連結する。
+    同じ論文フォルダが複数のシャード（または既存の`out_path`）にあるときは先に見つけたものを使い、
+    ほかのシャードの同じ論文の`overview.csv`の行と索引の行も取り込まない。既存の`out_path`の`overview.csv`の行は残す。
+    統合した論文フォルダの数を返す。
+    """
+    out_path.mkdir(parents=True, exist_ok=True)
+    fieldnames: list[str] = []
+    rows: list[dict[str, str]] = []
+    if (out_path / "overview.csv").exists():
+        (fieldnames, rows) = read_overview_csv(out_path / "overview.csv")
+    merged = 0
+    for shard_dir in shard_dirs:
+        copied: set[str] = set()
+        skipped: set[str] = set()
+        for folder in sorted(shard_dir.iterdir()):
+            if not folder.is_dir():
+                continue
+            target = out_path / folder.name
+            if target.exists():
+                logging.warning(f"{folder.name} は複数のシャードに含まれています。{shard_dir} のものは無視します。")
+                skipped.add(folder.name)
+                continue
+            shutil.copytree(folder, target)
+            copied.add(folder.name)
+            merged += 1
+        for name, index_type in _INDEXES:
+            shard_index = shard_dir / name
+            if shard_index.exists():
+                with index_type(out_path / name) as index:
+                    # 論文フォルダの無い論文（解析に失敗した論文の`fatal`な警告など）の行は取り込む
+                    index.absorb(shard_index, skipped)
+        chunks = shard_dir / CHUNKS_NAME
+        if chunks.exists():
+            with (out_path / CHUNKS_NAME).open("a", encoding="utf-8") as merged_chunks, chunks.open(encoding="utf-8") as shard_chunks:
+                merged_chunks.writelines(line for line in shard_chunks if json.loads(line)["paper"] in copied)
+        overview = shard_dir / "overview.csv"
+        if not overview.exists():
+            logging.warning(f"{shard_dir} に overview.csv がありません。")
+            continue
+        (names, shard_rows) = read_overview_csv(overview)
+        fieldnames += [name for name in names if name not in fieldnames]
+        rows += [row for row in shard_rows if Path(row.get("pdf_path", "")).name in copied]
+
+    rows.sort(key=lambda row: row.get("pdf_path", ""))
+    with (out_path / "overview.csv").open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    return merged
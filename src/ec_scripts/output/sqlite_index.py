@@ -0,0 +1,63 @@
+"""出力フォルダに置くSQLite索引（警告索引・参考文献索引など）の共通部分。"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import ClassVar, Iterable, Self
+
+
+class SqliteIndex:
+    """
+    論文フォルダ名（PDFのファイル名）を`paper`列に持つ表からなる索引。
+    論文単位で行を置き換えるので、バッチの途中でも、再解析した論文だけを差し替えるときにも同じように使える。
+    """
+
+    SCHEMA: ClassVar[str] = ""
+    # `paper`列を持ち、論文単位で置き換える表
+    PAPER_TABLES: ClassVar[tuple[str, ...]] = ()
+    # 論文をまたいで共有され、取り込み時には未登録の行だけを追加する表
+    SHARED_TABLES: ClassVar[tuple[str, ...]] = ()
+
+    connection: sqlite3.Connection
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(self.SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+    def _delete_paper(self, paper: str) -> None:
+        for table in self.PAPER_TABLES:
+            self.connection.execute(f"DELETE FROM {table} WHERE paper = ?", (paper,))
+
+    def remove_paper(self, path_pdf: Path) -> None:
+        with self.connection:
+            self._delete_paper(path_pdf.name)
+
+    def absorb(self, other_path: Path, skip: Iterable[str] = ()) -> None:
+        """
+        別の同種の索引の内容を取り込む。同じ論文の行はあちらのもので置き換える。
+        `skip`に挙げた論文（論文フォルダ名）の行は取り込まず、こちらの行をそのまま残す。
+        """
+        with self.connection:
+            self.connection.execute("ATTACH DATABASE ? AS other", (str(other_path),))
+            self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS absorb_skip (paper TEXT PRIMARY KEY)")
+            self.connection.execute("DELETE FROM absorb_skip")
+            self.connection.executemany("INSERT OR IGNORE INTO absorb_skip VALUES (?)", ((paper,) for paper in skip))
+            for table in self.SHARED_TABLES:
+                self.connection.execute(f"INSERT OR IGNORE INTO {table} SELECT * FROM other.{table}")
+            for table in self.PAPER_TABLES:
+                absorbed = f"SELECT * FROM other.{table} WHERE paper NOT IN (SELECT paper FROM absorb_skip)"
+                self.connection.execute(f"DELETE FROM {table} WHERE paper IN (SELECT paper FROM ({absorbed}))")
+                self.connection.execute(f"INSERT INTO {table} {absorbed}")
+        self.connection.execute("DETACH DATABASE other")
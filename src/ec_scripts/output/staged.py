@@ -0,0 +1,323 @@
+"""
+先読み・解析・書き出しを重ねて動かす段階的なバッチ実行。
+ネットワークストレージ上では、1本ずつ「読む→解析→書く」を直列に行うとI/O待ちの間CPUが遊ぶため、
+メタデータJSONとレイアウトキャッシュの先読み（スレッド）、解析（プロセス）、書き出し（呼び出し元のスレッド）を
+容量つきのキューでつなぎ、各段を同時に動かす。
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from returns.result import Failure
+
+from ..metadata.metadata_simplifier import metadata_path_of_paper
+from ..parsing.pdf2text import Backend, json_cache_path, mark_cache_access, read_cache_bytes
+from ..parsing.profile import ParseProfile
+from .memory_budget import MemoryBudget, MemorySample, PaperCost, current_rss, peak_rss, reset_peak_rss
+from .batch import ParseFailure, ParseOutcome, to_parse_failure
+from .pipeline import parse_prefetched
+from .writer import OutputWriter, OverviewRow
+
+STAGE_FIELDS = ["stage", "workers", "items", "busy_seconds", "utilisation", "queue_capacity", "queue_mean", "queue_max"]
+
+
+@dataclass
+class StageStats:
+    """1つの段の処理件数・稼働時間と、その段の入力キューの深さ。"""
+
+    name: str
+    workers: int
+    queue_capacity: int
+    items: int = 0
+    busy_seconds: float = 0.0
+    queue_samples: int = 0
+    queue_total: int = 0
+    queue_max: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, depth: int) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+            self.queue_samples += 1
+            self.queue_total += depth
+            self.queue_max = max(self.queue_max, depth)
+
+    def row(self, wall_seconds: float) -> dict[str, str | int | float]:
+        capacity = wall_seconds * self.workers
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilisation": round(self.busy_seconds / capacity, 3) if capacity else 0.0,
+            "queue_capacity": self.queue_capacity,
+            "queue_mean": round(self.queue_total / self.queue_samples, 2) if self.queue_samples else 0.0,
+            "queue_max": self.queue_max,
+        }
+
+
+@dataclass
+class StagedReport:
+    stages: list[StageStats] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def rows(self) -> list[dict[str, str | int | float]]:
+        return [stage.row(self.wall_seconds) for stage in self.stages]
+
+
+@dataclass(frozen=True)
+class Prefetched:
+    path: Path
+    metadata: bytes | None
+    layout: bytearray | None
+    error: str | None = None
+    # メモリ予算を使うときだけ、先読みのついでに見積もっておく
+    cost: PaperCost | None = None
+
+
+# 先読み段の終わりを解析段に知らせる番兵
+_DONE = object()
+
+
+def prefetch(path_pdf: Path, backend: Backend, estimate: bool = False) -> Prefetched:
+    """
+    メタデータJSONと（あれば）レイアウトキャッシュの中身を読む。読めなければ`error`に理由を入れる。
+    `estimate=True`なら`PaperCost`も求める（キャッシュが無ければページ数を数えるためにPDFを開く）。
+    ここで例外を投げると先読みスレッドが止まってしまうため、どの失敗も`error`にして返す。
+    """
+    try:
+        metadata = metadata_path_of_paper(path_pdf).read_bytes()
+        layout: bytearray | None = None
+        path_json = json_cache_path(path_pdf)
+        if backend == "layout" and path_json.exists():
+            mark_cache_access(path_json)
+            layout = read_cache_bytes(path_json)
+        if not estimate:
+            return Prefetched(path_pdf, metadata, layout)
+        try:
+            cost = PaperCost.of(path_pdf, None if layout is None else len(layout))
+        except Exception:
+            # 開けないPDFは解析段で失敗として記録される。見積もりはファイルサイズだけで済ませる
+            cost = PaperCost("extract", path_pdf.stat().st_size)
+        return Prefetched(path_pdf, metadata, layout, cost=cost)
+    except Exception as error:
+        return Prefetched(path_pdf, None, None, f"{type(error).__name__}: {error}")
+
+
+# ワーカープロセスがこれまでに解析した論文の数（`MemorySample.warm`に使う）
+_parsed_in_worker = 0
+
+
+def parse_prefetched_one(item: Prefetched, profile: bool, backend: Backend, measure: bool = False) -> tuple[ParseOutcome, float, MemorySample | None]:
+    """
+    解析段のワーカーで動く。結果と、ワーカーが実際に解析に使った秒数を返す。
+    `measure=True`なら、解析前後のRSSと解析中のピークも返す。
+    """
+    global _parsed_in_worker
+    if measure:
+        reset_peak_rss()
+        before = current_rss()
+    start = time.perf_counter()
+    outcome = _parse_prefetched_outcome(item, profile, backend)
+    seconds = time.perf_counter() - start
+    sample = MemorySample(before, peak_rss(), current_rss(), _parsed_in_worker > 0) if measure else None
+    _parsed_in_worker += 1
+    return (outcome, seconds, sample)
+
+
+def _parse_prefetched_outcome(item: Prefetched, profile: bool, backend: Backend) -> ParseOutcome:
+    assert item.metadata is not None
+    recorder = ParseProfile() if profile else None
+    try:
+        result = parse_prefetched(item.path, item.metadata, item.layout, recorder or False, backend)
+    except Exception as error:
+        return (item.path, None, to_parse_failure(error, recorder))
+    if isinstance(result, Failure):
+        return (item.path, None, to_parse_failure(result.failure(), recorder))
+    (metadata, paper) = result.unwrap()
+    return (item.path, metadata, paper)
+
+
+def run_staged(
+    paths: Iterable[Path],
+    writer: OutputWriter,
+    report: StagedReport | None = None,
+    jobs: int = 1,
+    prefetch_threads: int = 4,
+    queue_size: int | None = None,
+    profile: bool = False,
+    backend: Backend = "layout",
+    budget: MemoryBudget | None = None,
+    recycle_after: int | None = None,
+) -> Iterator[tuple[ParseOutcome, OverviewRow | None]]:
+    """
+    `paths`の論文を3段のパイプラインで処理し、書き出しが終わった順に`(結果, overview.csvの行)`を返す。
+    - 先読み: `prefetch_threads`本のスレッドがメタデータJSONとレイアウトキャッシュを読む
+    - 解析: `jobs`個のプロセスが先読み済みのバイト列から解析する
+    - 書き出し: 呼び出し元のスレッドで`writer`が論文フォルダと各索引を書く
+    段の間のキューはそれぞれ`queue_size`（既定は`2 * jobs`）件までで、後段が詰まれば前段は待つ。
+    `report`を渡すと、段ごとの件数・稼働率・キューの深さを記録する。
+    `budget`を渡すと、解析中の論文のメモリの見積もりが予算に収まる分だけを解析段に流す（`MemoryBudget`）。
+    `recycle_after`本を解析したワーカープロセスは作り直し、断片化したヒープを手放させる。
+    ワーカープロセスが異常終了したときはプールを作り直し、解析中だった論文は1本ずつ解析し直す。
+    """
+    capacity = max(queue_size or 2 * jobs, 1)
+    prefetch_stage = StageStats("prefetch", prefetch_threads, capacity)
+    parse_stage = StageStats("parse", jobs, capacity)
+    write_stage = StageStats("write", 1, capacity)
+    if report is not None:
+        report.stages = [prefetch_stage, parse_stage, write_stage]
+    started = time.perf_counter()
+
+    pending_paths: queue.Queue[Path | None] = queue.Queue()
+    for path in paths:
+        pending_paths.put(path)
+    for _ in range(prefetch_threads):
+        pending_paths.put(None)
+    parse_queue: queue.Queue[Prefetched | object] = queue.Queue(maxsize=capacity)
+    # 解析中と書き出し待ちの合計を抑える。書き出し段が1件処理するたびに1つ空く
+    in_flight = threading.Semaphore(capacity)
+    # 解析結果、または先読みが尽きたときに投入した総数
+    write_queue: queue.Queue[tuple[ParseOutcome, float] | int] = queue.Queue()
+    stop = threading.Event()
+
+    def prefetch_worker() -> None:
+        try:
+            while not stop.is_set():
+                path = pending_paths.get()
+                if path is None:
+                    break
+                start = time.perf_counter()
+                item = prefetch(path, backend, budget is not None)
+                prefetch_stage.record(time.perf_counter() - start, parse_queue.qsize())
+                parse_queue.put(item)
+        finally:
+            # 振り分けスレッドが番兵の数を数えて終わるので、何があっても必ず入れる
+            parse_queue.put(_DONE)
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=max(jobs, 1), max_tasks_per_child=recycle_after)
+
+    # ワーカープロセスが落ちるとプールごと使えなくなるので、作り直したら末尾に足す
+    pools = [new_pool()]
+    pools_lock = threading.Lock()
+
+    def finish(item: Prefetched, reserved: int, outcome: ParseOutcome, seconds: float, sample: MemorySample | None) -> None:
+        if budget is not None and item.cost is not None:
+            budget.release(reserved, item.cost, sample)
+        write_queue.put((outcome, seconds))
+
+    # 落ちたプールで解析中だった論文を1本ずつ解析し直すときに取る
+    retry_lock = threading.Lock()
+
+    def retry_alone(item: Prefetched, reserved: int) -> None:
+        """
+        プールが壊れたときに解析中だった論文を、ワーカー1個だけの新しいプールで1本ずつ解析し直す。
+        同じプールにいただけの論文は解析でき、ワーカーを落とした論文だけがもう一度落ちて失敗になる。
+        """
+        try:
+            with retry_lock, ProcessPoolExecutor(max_workers=1) as pool:
+                (outcome, seconds, sample) = pool.submit(parse_prefetched_one, item, profile, backend, budget is not None).result()
+        except Exception as error:
+            (outcome, seconds, sample) = ((item.path, None, to_parse_failure(error)), 0.0, None)
+        finish(item, reserved, outcome, seconds, sample)
+
+    def on_parsed(item: Prefetched, reserved: int, future: Future[tuple[ParseOutcome, float, MemorySample | None]]) -> None:
+        try:
+            (outcome, seconds, sample) = future.result()
+        except BrokenProcessPool:
+            # このコールバックは壊れたプールのロックを持ったまま呼ばれるため、解析し直しは別のスレッドで待つ
+            threading.Thread(target=retry_alone, args=(item, reserved), daemon=True).start()
+            return
+        except Exception as error:
+            # 書き出し段が待ち続けないよう失敗として流す
+            (outcome, seconds, sample) = ((item.path, None, to_parse_failure(error)), 0.0, None)
+        finish(item, reserved, outcome, seconds, sample)
+
+    def submit(item: Prefetched, reserved: int) -> None:
+        """解析段に投入する。プールが壊れていれば作り直す。投入できなければ失敗として書き出し段に流す。"""
+        try:
+            with pools_lock:
+                try:
+                    future = pools[-1].submit(parse_prefetched_one, item, profile, backend, budget is not None)
+                except BrokenProcessPool:
+                    logging.warning("解析段のワーカープロセスが異常終了したため、プロセスプールを作り直します。")
+                    pools[-1].shutdown(wait=False, cancel_futures=True)
+                    pools.append(new_pool())
+                    future = pools[-1].submit(parse_prefetched_one, item, profile, backend, budget is not None)
+        except Exception as error:
+            # 作り直したプールにも投入できなかった（打ち切られてプールを閉じた後など）
+            finish(item, reserved, (item.path, None, to_parse_failure(error)), 0.0, None)
+            return
+        future.add_done_callback(partial(on_parsed, item, reserved))
+
+    def dispatch() -> None:
+        (finished, submitted) = (0, 0)
+        try:
+            while finished < prefetch_threads:
+                item = parse_queue.get()
+                if item is _DONE:
+                    finished += 1
+                    continue
+                assert isinstance(item, Prefetched)
+                in_flight.acquire()
+                if stop.is_set():
+                    return
+                submitted += 1
+                if item.error is not None:
+                    write_queue.put(((item.path, None, ParseFailure(item.error)), 0.0))
+                    continue
+                reserved = budget.acquire(item.cost, stop) if budget is not None and item.cost is not None else 0
+                submit(item, reserved)
+        finally:
+            # 書き出し段は総数を受け取るまで待つので、何があっても必ず入れる
+            write_queue.put(submitted)
+
+    for _ in range(prefetch_threads):
+        threading.Thread(target=prefetch_worker, daemon=True).start()
+    threading.Thread(target=dispatch, daemon=True).start()
+    (written, total) = (0, None)
+    try:
+        while total is None or written < total:
+            parsed = write_queue.get()
+            if isinstance(parsed, int):
+                total = parsed
+                continue
+            (outcome, parse_seconds) = parsed
+            if not isinstance(outcome[2], ParseFailure) or parse_seconds:
+                parse_stage.record(parse_seconds, parse_queue.qsize())
+            start = time.perf_counter()
+            row = writer.handle(outcome)
+            write_stage.record(time.perf_counter() - start, write_queue.qsize())
+            written += 1
+            in_flight.release()
+            yield (outcome, row)
+    finally:
+        stop.set()
+        # 途中で打ち切られたとき、空きを待っている振り分けスレッドを起こす
+        in_flight.release()
+        with pools_lock:
+            for pool in pools:
+                pool.shutdown()
+        if report is not None:
+            report.wall_seconds = time.perf_counter() - started
+
+
+def write_stage_report(path: Path, report: StagedReport) -> None:
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STAGE_FIELDS)
+        writer.writeheader()
+        for row in report.rows():
+            writer.writerow(row)
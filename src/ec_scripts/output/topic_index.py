@@ -0,0 +1,136 @@
+"""
+コーパス全体のキーワード・節見出しの転置索引（`topics.sqlite`）。
+正規化したキーワード・節見出しから、それを含む論文と出版年を`content.json`を読まずに引けるようにする。
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from ..metadata.metadata_types import SimplifiedMetadata
+from ..parsing.pdf_types import Paper
+from .sqlite_index import SqliteIndex
+
+TOPIC_INDEX_NAME = "topics.sqlite"
+
+TopicKind = Literal["keyword", "section"]
+TOPIC_KINDS: tuple[TopicKind, ...] = ("keyword", "section")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    paper TEXT PRIMARY KEY,
+    pdf_path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    year INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    paper TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS terms_term ON terms (kind, term, paper);
+CREATE INDEX IF NOT EXISTS terms_paper ON terms (paper);
+"""
+
+
+@dataclass(frozen=True)
+class TopicCount:
+    term: str
+    label: str
+    papers: int
+    occurrences: int
+
+
+@dataclass(frozen=True)
+class TopicHit:
+    paper: str
+    title: str
+    year: int
+    label: str
+    count: int
+
+
+def normalize_term(text: str) -> str:
+    """NFKCで全角・半角を揃えて大文字小文字を畳み、空白を1つにまとめる。"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def paper_terms(paper: Paper) -> dict[tuple[TopicKind, str], tuple[str, int]]:
+    """論文のキーワードと節見出しを`(種別, 正規化後) -> (最初の表記, 出現回数)`にまとめる。"""
+    labels: dict[tuple[TopicKind, str], str] = {}
+    counts: Counter[tuple[TopicKind, str]] = Counter()
+    sections = [segment.content for segment in paper.segments if segment.type == "SectionTitle"]
+    for kind, texts in (("keyword", paper.keywords), ("section", sections)):
+        for text in texts:
+            term = normalize_term(text)
+            if not term:
+                continue
+            labels.setdefault((kind, term), text.strip())
+            counts[(kind, term)] += 1
+    return {key: (labels[key], count) for key, count in counts.items()}
+
+
+class TopicIndex(SqliteIndex):
+    """キーワード・節見出し索引への読み書き。"""
+
+    SCHEMA = _SCHEMA
+    PAPER_TABLES = ("papers", "terms")
+
+    def replace_paper(self, path_pdf: Path, metadata: SimplifiedMetadata, paper: Paper) -> None:
+        """`path_pdf`の論文のキーワード・節見出しをすべて置き換える。"""
+        name = path_pdf.name
+        title = metadata.get("title", "") or paper.title
+        year = metadata["publication_date"]["year"]
+        with self.connection:
+            self._delete_paper(name)
+            self.connection.execute("INSERT INTO papers VALUES (?, ?, ?, ?)", (name, str(path_pdf), title, year))
+            self.connection.executemany(
+                "INSERT INTO terms VALUES (?, ?, ?, ?, ?)",
+                [(name, kind, term, label, count) for (kind, term), (label, count) in paper_terms(paper).items()],
+            )
+
+    def top_terms(
+        self, kind: TopicKind, limit: int = 20, year_from: int | None = None, year_to: int | None = None
+    ) -> list[TopicCount]:
+        """含む論文の数が多い順に、キーワードまたは節見出しを返す。"""
+        rows = self.connection.execute(
+            """
+            SELECT terms.term, MIN(terms.label), COUNT(DISTINCT terms.paper), SUM(terms.count)
+            FROM terms JOIN papers USING (paper)
+            WHERE terms.kind = ? AND papers.year BETWEEN ? AND ?
+            GROUP BY terms.term ORDER BY COUNT(DISTINCT terms.paper) DESC, terms.term LIMIT ?
+            """,
+            (kind, -1 if year_from is None else year_from, 9999 if year_to is None else year_to, limit),
+        )
+        return [TopicCount(*row) for row in rows]
+
+    def papers_with(self, kind: TopicKind, text: str) -> list[TopicHit]:
+        """正規化して`text`と一致するキーワードまたは節見出しを含む論文を、出版年順に返す。"""
+        rows = self.connection.execute(
+            """
+            SELECT papers.paper, papers.title, papers.year, terms.label, terms.count
+            FROM terms JOIN papers USING (paper)
+            WHERE terms.kind = ? AND terms.term = ?
+            ORDER BY papers.year, papers.paper
+            """,
+            (kind, normalize_term(text)),
+        )
+        return [TopicHit(*row) for row in rows]
+
+    def yearly_counts(self, kind: TopicKind, text: str) -> list[tuple[int, int]]:
+        """`text`を含む論文の数を出版年ごとに返す。"""
+        return self.connection.execute(
+            """
+            SELECT papers.year, COUNT(DISTINCT terms.paper)
+            FROM terms JOIN papers USING (paper)
+            WHERE terms.kind = ? AND terms.term = ?
+            GROUP BY papers.year ORDER BY papers.year
+            """,
+            (kind, normalize_term(text)),
+        ).fetchall()
@@ -0,0 +1,100 @@
+"""
+コーパス全体の警告索引（`warnings.sqlite`）。
+論文ごとの`fallbacks.json`を開き直さなくても、警告コードから該当する論文とトークン位置を引けるようにする。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from ..parsing.stream import ExceptionReport
+from .sqlite_index import SqliteIndex
+
+WARNING_INDEX_NAME = "warnings.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS warnings (
+    paper TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    token_type TEXT,
+    explanation TEXT NOT NULL,
+    fatal INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS warnings_code ON warnings (code, paper);
+CREATE INDEX IF NOT EXISTS warnings_paper ON warnings (paper);
+"""
+
+
+@dataclass(frozen=True)
+class WarningHit:
+    paper: str
+    pdf_path: str
+    code: str
+    position: int
+    token_type: str | None
+    explanation: str
+    fatal: bool
+
+
+def _token_type_at(report: ExceptionReport) -> str | None:
+    """警告が出た時点で読んでいたトークンの種別。"""
+    (tokens, index) = report.surroundings
+    if 0 <= index < len(tokens):
+        return tokens[index].type.value
+    return None
+
+
+class WarningIndex(SqliteIndex):
+    """警告索引への読み書き。"""
+
+    SCHEMA = _SCHEMA
+    PAPER_TABLES = ("warnings",)
+
+    def replace_paper(self, path_pdf: Path, reports: Iterable[ExceptionReport], fatal: bool = False) -> None:
+        """`path_pdf`の論文の警告をすべて`reports`で置き換える。`fatal`は解析自体が失敗したことを表す。"""
+        paper = path_pdf.name
+        with self.connection:
+            self._delete_paper(paper)
+            self.connection.executemany(
+                "INSERT INTO warnings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        paper,
+                        str(path_pdf),
+                        str(report.code),
+                        report.current_position,
+                        _token_type_at(report),
+                        report.exception,
+                        int(fatal),
+                    )
+                    for report in reports
+                ],
+            )
+
+    def code_counts(self) -> list[tuple[str, int, int]]:
+        """警告コードごとの`(コード, 件数, 論文数)`を件数の多い順に返す。"""
+        return self.connection.execute(
+            "SELECT code, COUNT(*), COUNT(DISTINCT paper) FROM warnings GROUP BY code ORDER BY COUNT(*) DESC, code"
+        ).fetchall()
+
+    def find(self, code: str | None = None, paper: str | None = None) -> list[WarningHit]:
+        query = "SELECT paper, pdf_path, code, position, token_type, explanation, fatal FROM warnings"
+        conditions: list[str] = []
+        parameters: list[str] = []
+        if code is not None:
+            conditions.append("code = ?")
+            parameters.append(code)
+        if paper is not None:
+            conditions.append("paper = ?")
+            parameters.append(paper)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY paper, position"
+        return [
+            WarningHit(paper, pdf_path, code, position, token_type, explanation, bool(fatal))
+            for (paper, pdf_path, code, position, token_type, explanation, fatal) in self.connection.execute(query, parameters)
+        ]
@@ -0,0 +1,179 @@
+"""
+`data/recid_*`を定期的に走査し、新しく追加された・変更された論文フォルダだけを解析する監視モード。
+解析済みのフォルダの状態は出力先の`watch_state.json`に残すので、再起動しても処理し直さない。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from ..json_io import DEFAULT_JSON_OUTPUT, JsonOutputOptions
+from ..parsing.pdf2text import Backend
+from .batch import ParseFailure, parse_many
+from .overview import update_overview_csv
+from .writer import OutputWriter, OverviewRow
+
+WATCH_STATE_NAME = "watch_state.json"
+# パーサー由来でない失敗（同期途中のPDFなど）を、中身が変わらないまま解析し直す回数の上限
+MAX_RETRIES = 3
+
+# フォルダの中身を、監視の対象になるファイルごとの(名前, サイズ, 更新時刻)で表したもの
+type FolderSignature = list[tuple[str, int, int]]
+
+
+def folder_signature(folder: Path) -> FolderSignature:
+    """
+    PDFとメタデータJSONだけを見る。レイアウトキャッシュ（`<pdf>.json`など）は解析のたびに
+    このフォルダへ書き込まれるため、対象に含めると自分の書き込みで変更を検知してしまう。
+    """
+    signature: FolderSignature = []
+    for path in sorted(folder.iterdir()):
+        if not (path.suffix == ".pdf" or path.name.endswith("_metadata.json")) or not path.is_file():
+            continue
+        stat = path.stat()
+        signature.append((path.name, stat.st_size, stat.st_mtime_ns))
+    return signature
+
+
+def scan_folders(root_path: Path) -> dict[str, FolderSignature]:
+    return {folder.name: folder_signature(folder) for folder in sorted(root_path.glob("./data/recid_*")) if folder.is_dir()}
+
+
+@dataclass
+class WatchState:
+    """解析済みのフォルダの署名と、変化を見つけてから落ち着くのを待っているフォルダ。"""
+
+    processed: dict[str, FolderSignature] = field(default_factory=dict)
+    # フォルダ名 -> (最後に見た署名, その署名を最初に見た時刻)
+    settling: dict[str, tuple[FolderSignature, float]] = field(default_factory=dict)
+    # 署名が変わらないまま再試行を待っているフォルダと、これまでに解析し直した回数（保存しない）
+    retries: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> WatchState:
+        if not path.exists():
+            return cls()
+        obj = json.loads(path.read_bytes())
+        return cls({name: [tuple(entry) for entry in signature] for name, signature in obj["processed"].items()})
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.tmp")
+        temporary.write_text(json.dumps({"processed": self.processed}, ensure_ascii=False), encoding="utf-8")
+        temporary.replace(path)
+
+    def ready_folders(self, snapshot: dict[str, FolderSignature], now: float, settle_seconds: float) -> list[str]:
+        """
+        解析済みのものから変わり、`settle_seconds`以上同じ署名のままのフォルダを返す。
+        コピー途中のファイルはサイズや更新時刻が変わり続けるので、落ち着くまで待たされる。
+        """
+        ready: list[str] = []
+        for name, signature in snapshot.items():
+            if not any(entry[0].endswith(".pdf") for entry in signature) or self.processed.get(name) == signature:
+                self.settling.pop(name, None)
+                self.retries.pop(name, None)
+                continue
+            previous = self.settling.get(name)
+            if previous is None or previous[0] != signature:
+                self.settling[name] = (signature, now)
+                self.retries.pop(name, None)
+                continue
+            if now - previous[1] >= settle_seconds:
+                ready.append(name)
+        for name in list(self.settling):
+            if name not in snapshot:
+                del self.settling[name]
+                self.retries.pop(name, None)
+        return ready
+
+    def finish(self, ready: list[str], retry: set[str], now: float) -> None:
+        """
+        処理したフォルダを解析済みにする。パーサーの報告の無い失敗を含むフォルダ（同期途中やロック中のPDFなど）は
+        解析済みにせず、署名が変わらなくても`settle_seconds`後にもう一度解析する（`MAX_RETRIES`回まで）。
+        パーサーが報告した失敗は解析し直しても同じなので、中身が変わるまで待つ。
+        """
+        for name in ready:
+            signature = self.settling.pop(name)[0]
+            attempts = self.retries.pop(name, 0)
+            if name in retry and attempts < MAX_RETRIES:
+                self.settling[name] = (signature, now)
+                self.retries[name] = attempts + 1
+                continue
+            if name in retry:
+                logging.error(f"{name} は {MAX_RETRIES} 回解析し直しても失敗したため、中身が変わるまで解析しません。")
+            self.processed[name] = signature
+
+    def waiting(self) -> bool:
+        """失敗して再試行を待つだけのものを除いて、落ち着くのを待っているフォルダがあるか。"""
+        return any(name not in self.retries for name in self.settling)
+
+
+def process_folders(
+    root_path: Path,
+    folders: list[str],
+    writer: OutputWriter,
+    jobs: int,
+    backend: Backend,
+    executor: Executor | None,
+) -> tuple[list[OverviewRow], list[Path], set[str]]:
+    """
+    フォルダ内のPDFを解析して書き出し、`overview.csv`の行と、書き出せなかった論文と、
+    パーサーの報告の無い失敗（解析し直せば通るかもしれないもの）を含むフォルダ名を返す。
+    """
+    paths = [path for name in folders for path in sorted((root_path / "data" / name).glob("*.pdf"))]
+    rows: list[OverviewRow] = []
+    failed: list[Path] = []
+    retry: set[str] = set()
+    for outcome in parse_many(paths, jobs=jobs, backend=backend, executor=executor):
+        row = writer.handle(outcome)
+        if row is not None:
+            rows.append(row)
+            continue
+        failed.append(outcome[0])
+        if not isinstance(outcome[2], ParseFailure) or outcome[2].report is None:
+            retry.add(outcome[0].parent.name)
+    return (rows, failed, retry)
+
+
+def watch(
+    root_path: Path,
+    out_path: Path,
+    interval: float = 5.0,
+    settle_seconds: float = 10.0,
+    jobs: int = 1,
+    options: JsonOutputOptions = DEFAULT_JSON_OUTPUT,
+    backend: Backend = "layout",
+    executor: Executor | None = None,
+    once: bool = False,
+    on_processed: Callable[[list[str], list[OverviewRow]], None] | None = None,
+) -> None:
+    """
+    `interval`秒ごとに`root_path/data/recid_*`を走査し、変化が`settle_seconds`秒落ち着いたフォルダを解析する。
+    論文フォルダと各索引は論文ごとに、`overview.csv`は処理したフォルダの行だけを置き換えて更新する。
+    `executor`には監視中ずっと使い回すワーカープールを渡す。`once=True`なら待ちのフォルダが無くなった時点で終わる。
+    """
+    state_path = out_path / WATCH_STATE_NAME
+    state = WatchState.load(state_path)
+    with OutputWriter(out_path, options) as writer:
+        while True:
+            ready = state.ready_folders(scan_folders(root_path), time.time(), settle_seconds)
+            if ready:
+                (rows, failed, retry) = process_folders(root_path, ready, writer, jobs, backend, executor)
+                # 前回は解析できていた論文でも、失敗した今回の実行に合わせて行を消す
+                update_overview_csv(out_path, rows, failed)
+                # 解析中に更に書き換えられていれば、次の走査でもう一度拾われる
+                state.finish(ready, retry, time.time())
+                state.save(state_path)
+                logging.info(f"{len(ready)} 件のフォルダを処理しました: {', '.join(ready)}")
+                if on_processed is not None:
+                    on_processed(ready, rows)
+            # `once`では、失敗したフォルダの再試行は待たない（次に呼ばれたときにもう一度解析する）
+            if once and not state.waiting():
+                return
+            time.sleep(interval)
@@ -0,0 +1,87 @@
+"""解析結果を論文フォルダ・各索引・`overview.csv`の行に振り分けて書き出す。"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Self
+
+from ..json_io import DEFAULT_JSON_OUTPUT, JsonOutputOptions
+from ..metadata.metadata_types import SimplifiedMetadata
+from ..parsing.pdf_types import Paper
+from ..parsing.stream import WarningCode, exception_report_prior
+from .batch import ParseFailure, ParseOutcome
+from .chunks import CHUNKS_NAME, ChunkWriter
+from .overview import overview_row
+from .pipeline import write_paper_folder
+from .reference_index import REFERENCE_INDEX_NAME, ReferenceIndex
+from .topic_index import TOPIC_INDEX_NAME, TopicIndex
+from .warning_index import WARNING_INDEX_NAME, WarningIndex
+
+type OverviewRow = dict[str, str | int | float]
+
+
+class OutputWriter:
+    """
+    出力先`out_path`の索引を開いたまま、解析が終わった論文を1本ずつ書き出す。
+    バッチ実行でも`watch`でも、論文ごとの書き出しはここを通す。
+    """
+
+    out_path: Path
+    options: JsonOutputOptions
+    warning_index: WarningIndex
+    reference_index: ReferenceIndex
+    topic_index: TopicIndex
+    chunk_writer: ChunkWriter | None
+
+    def __init__(self, out_path: Path, options: JsonOutputOptions = DEFAULT_JSON_OUTPUT, chunk_chars: int | None = None):
+        """`chunk_chars`を渡すと、検索用のチャンクをその文字数以下で`chunks.jsonl`にも書き出す。"""
+        self.out_path = out_path
+        self.options = options
+        self._stack = ExitStack()
+        self.warning_index = self._stack.enter_context(WarningIndex(out_path / WARNING_INDEX_NAME))
+        self.reference_index = self._stack.enter_context(ReferenceIndex(out_path / REFERENCE_INDEX_NAME))
+        self.topic_index = self._stack.enter_context(TopicIndex(out_path / TOPIC_INDEX_NAME))
+        self.chunk_writer = None
+        if chunk_chars is not None:
+            self.chunk_writer = self._stack.enter_context(ChunkWriter(out_path / CHUNKS_NAME, chunk_chars))
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stack.close()
+
+    def write(self, path_pdf: Path, metadata: SimplifiedMetadata, paper: Paper, duplicate_of: Path | None = None) -> OverviewRow:
+        """論文フォルダと各索引を書き出し、`overview.csv`の行を返す。"""
+        write_paper_folder(path_pdf, self.out_path, metadata, paper, self.options)
+        self.warning_index.replace_paper(path_pdf, paper.warnings)
+        self.reference_index.replace_paper(path_pdf, paper.title, paper.references)
+        self.topic_index.replace_paper(path_pdf, metadata, paper)
+        if self.chunk_writer is not None:
+            self.chunk_writer.write(path_pdf, metadata, paper)
+        return overview_row(path_pdf, metadata, paper, duplicate_of)
+
+    def record_failure(self, path_pdf: Path, failure: ParseFailure) -> None:
+        logging.error(f"{path_pdf} の解析に失敗しました: {failure}")
+        # 前回の実行の警告が残らないよう、パーサー由来でない失敗（メタデータなど）も理由だけの行で置き換える
+        report = failure.report if failure.report is not None else exception_report_prior(path_pdf.name, failure.reason, WarningCode.UNCLASSIFIED)
+        self.warning_index.replace_paper(path_pdf, [report], fatal=True)
+        # 前回は解析できていた論文でも、失敗した今回の実行に合わせて参考文献とトピックの行は消す
+        self.reference_index.remove_paper(path_pdf)
+        self.topic_index.remove_paper(path_pdf)
+
+    def handle(self, outcome: ParseOutcome, duplicate_of: Path | None = None) -> OverviewRow | None:
+        """`parse_many`の結果を1つ書き出す。失敗していれば記録だけして`None`を返す。"""
+        (path_pdf, metadata, paper) = outcome
+        if isinstance(paper, ParseFailure):
+            self.record_failure(path_pdf, paper)
+            return None
+        if metadata is None:
+            self.record_failure(path_pdf, ParseFailure("メタデータがありません"))
+            return None
+        return self.write(path_pdf, metadata, paper, duplicate_of)
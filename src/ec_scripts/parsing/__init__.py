@@ -1,7 +1,7 @@
 """論文パーサー関連モジュールのパッケージ。"""
 
 from .paper_parser import parse_paper
-from .stream import ExceptionReport, TokenStream, exception_report
+from .stream import ExceptionReport, TokenStream, WarningCode, exception_report
 from .tokens import Token, TokenType, doc_to_tokens, dump_tokens, str_to_token_type
 
 __all__ = [
@@ -9,6 +9,7 @@ __all__ = [
     "Token",
     "TokenStream",
     "TokenType",
+    "WarningCode",
     "doc_to_tokens",
     "dump_tokens",
     "exception_report",
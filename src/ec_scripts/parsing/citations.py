@@ -0,0 +1,111 @@
+"""
+解析後の本文から引用記号（`[1]`、`[2, 3]`、`[4-6]`）や脚注記号（`*[1]`、`[*1]`）を拾い、
+`Paper.references`と脚注セグメントに結びつける。結果は論文フォルダの`citations.json`に書き出す。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import asdict, dataclass, field
+
+from .pdf_types import Paper, Segment
+
+# 1つの括弧で範囲指定されたときに展開する番号の上限（誤検出した数式などで膨らませないため）
+MAX_RANGE_SPAN = 50
+
+_REFERENCE_MARKER = re.compile(r"\[\s*(?P<body>[0-9]{1,3}(?:\s*[-–−~〜,，、]\s*[0-9]{1,3})*)\s*\]")
+_FOOTNOTE_MARKER = re.compile(r"\*\[(?P<a>[A-Za-z0-9]{1,2})\]|\[\*(?P<b>[A-Za-z0-9]{1,2})\]|\*(?P<c>[0-9]{1,2})")
+_RANGE_SEPARATORS = "-–−~〜"
+
+
+@dataclass(frozen=True)
+class CitationOccurrence:
+    """`segments[segment]`の`field`の`start:end`に書かれた引用記号。"""
+
+    segment: int
+    field: str
+    start: int
+    end: int
+    marker: str
+
+
+@dataclass
+class CitationLinks:
+    """
+    記号ごとの出現位置。キーは`Paper.references`や脚注セグメントの`sign`そのもの。
+    どの参考文献にも対応しなかった引用記号は`unresolved`に入る。
+    """
+
+    references: dict[str, list[CitationOccurrence]] = field(default_factory=dict)
+    footnotes: dict[str, list[CitationOccurrence]] = field(default_factory=dict)
+    unresolved: list[CitationOccurrence] = field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            "references": {sign: [asdict(o) for o in occurrences] for sign, occurrences in self.references.items()},
+            "footnotes": {sign: [asdict(o) for o in occurrences] for sign, occurrences in self.footnotes.items()},
+            "unresolved": [asdict(o) for o in self.unresolved],
+        }
+
+
+def sign_key(sign: str) -> str:
+    """`"[12]"`や`"12)"`、`"*[a]"`のような記号から番号部分だけを取り出す。"""
+    return "".join(char for char in sign if char.isalnum())
+
+
+def expand_marker(body: str) -> list[str]:
+    """`"1, 3-5"`を`["1", "3", "4", "5"]`に展開する。"""
+    numbers: list[str] = []
+    for part in re.split(r"\s*[,，、]\s*", body):
+        bounds = re.split(rf"\s*[{_RANGE_SEPARATORS}]\s*", part)
+        if len(bounds) == 2 and 0 <= int(bounds[1]) - int(bounds[0]) <= MAX_RANGE_SPAN:
+            numbers += [str(number) for number in range(int(bounds[0]), int(bounds[1]) + 1)]
+        else:
+            numbers += [str(int(bound)) for bound in bounds]
+    return numbers
+
+
+def _linked_texts(segment: Segment) -> list[tuple[str, str]]:
+    """引用記号を探すフィールド。図はキャプションが`title`、表は`content`に入っている。"""
+    match segment.type:
+        case "Paragraph" | "ListItems" | "FootNote":
+            return [("content", segment.content)]
+        case "Figure":
+            return [("title", segment.title or "")]
+        case "Table":
+            return [("content", segment.content)]
+        case _:
+            return []
+
+
+def link_citations(paper: Paper) -> CitationLinks:
+    references = {sign_key(reference.sign): reference.sign for reference in paper.references}
+    footnotes = {
+        sign_key(segment.sign): segment.sign
+        for segment in paper.segments
+        if segment.type == "FootNote" and segment.sign and sign_key(segment.sign)
+    }
+    links = CitationLinks()
+    for index, segment in enumerate(paper.segments):
+        for field_name, text in _linked_texts(segment):
+            footnote_spans: list[tuple[int, int]] = []
+            for matched in _FOOTNOTE_MARKER.finditer(text):
+                key = matched["a"] or matched["b"] or matched["c"]
+                # 脚注記号の`*[1]`を参考文献`[1]`として数えないよう、対応する脚注が無くても範囲は必ず除く
+                footnote_spans.append(matched.span())
+                # `*1`のような記号は数式とも紛れるため、対応する脚注があるときだけ記録する
+                if key not in footnotes or segment.type == "FootNote":
+                    continue
+                occurrence = CitationOccurrence(index, field_name, matched.start(), matched.end(), matched[0])
+                links.footnotes.setdefault(footnotes[key], []).append(occurrence)
+            for matched in _REFERENCE_MARKER.finditer(text):
+                if any(start <= matched.start() < end for start, end in footnote_spans):
+                    continue
+                occurrence = CitationOccurrence(index, field_name, matched.start(), matched.end(), matched[0])
+                keys = expand_marker(matched["body"])
+                resolved = [references[key] for key in keys if key in references]
+                if len(resolved) < len(keys):
+                    links.unresolved.append(occurrence)
+                for sign in resolved:
+                    links.references.setdefault(sign, []).append(occurrence)
+    return links
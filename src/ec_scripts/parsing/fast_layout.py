@@ -0,0 +1,247 @@
+"""
+レイアウト解析モデルを使わない高速なレイアウト抽出（`fast`バックエンド）。
+PyMuPDFの`get_text("dict")`のブロックを、IPSJテンプレートを前提にした文字サイズ・太字・位置の
+ヒューリスティックで`boxclass`に振り分け、`pymupdf4llm.to_json`と同じ形のレイアウトJSONを作る。
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import pymupdf
+
+# ページの上下端からこの割合以内にあるブロックはヘッダ・フッタとみなす
+HEADER_MARGIN = 0.09
+FOOTER_MARGIN = 0.09
+# 本文の文字サイズに対して、この倍率以上を見出し、以下を脚注とみなす
+HEADING_SIZE_RATIO = 1.15
+TITLE_SIZE_RATIO = 1.5
+FOOTNOTE_SIZE_RATIO = 0.9
+# 脚注はページの下からこの割合以内にあるものに限る
+FOOTNOTE_REGION = 0.3
+# 左端がそろい、行間が本文の文字サイズのこの倍率以下で続くブロックは1つの段落にまとめる
+PARAGRAPH_GAP_RATIO = 0.6
+
+_SECTION_NUMBER = re.compile(r"^([0-9]{1,2}\.)*[0-9]{1,2}\.?\s*\S")
+_CAPTION = re.compile(r"^(図|表|Fig\.?|Figure|Table)\s*[0-9０-９]")
+_TABLE_CAPTION = re.compile(r"^(表|Table)\s*[0-9０-９]")
+_LIST_ITEM = re.compile(r"^(•|・|●|○|■|□|-|–|\([0-9a-z]{1,2}\)|[0-9]{1,2}\))\s*")
+_FOOTNOTE = re.compile(r"^(\*\[[a-zA-Z0-9]{1,2}\]|\*{1,2}[0-9]?|†)")
+
+_SPAN_FIELDS = ("size", "flags", "bidi", "char_flags", "font", "color", "alpha", "ascender", "descender", "text")
+
+
+def _span(span: dict[str, Any]) -> dict[str, Any]:
+    converted = {name: span.get(name, 0) for name in _SPAN_FIELDS}
+    converted["origin"] = list(span["origin"])
+    converted["bbox"] = list(span["bbox"])
+    return converted
+
+
+def _textlines(block: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        {"bbox": list(line["bbox"]), "spans": [_span(span) for span in line["spans"]]}
+        for line in block["lines"]
+        if line["spans"]
+    ]
+
+
+def _block_text(block: dict[str, Any]) -> str:
+    return "".join(span["text"] for line in block["lines"] for span in line["spans"]).strip()
+
+
+def _block_size(block: dict[str, Any]) -> float:
+    sizes = [span["size"] for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+    return max(sizes) if sizes else 0.0
+
+
+def _is_bold(block: dict[str, Any]) -> bool:
+    spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+    return bool(spans) and all(((span["flags"] >> 4) & 1) == 1 or span["font"].endswith(("Medium", "Bold")) for span in spans)
+
+
+def body_font_size(page_dicts: list[dict[str, Any]]) -> float:
+    """文字数で重み付けした最頻の文字サイズ。"""
+    sizes: Counter[float] = Counter()
+    for page_dict in page_dicts:
+        for block in page_dict["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    sizes[round(span["size"], 1)] += len(span["text"].strip())
+    return sizes.most_common(1)[0][0] if sizes else 10.0
+
+
+def classify_block(
+    block: dict[str, Any],
+    page_number: int,
+    page_height: float,
+    body_size: float,
+    title_seen: bool,
+) -> str:
+    text = _block_text(block)
+    (_, y0, _, y1) = block["bbox"]
+    size = _block_size(block)
+    if y1 <= page_height * HEADER_MARGIN:
+        return "page-header"
+    if y0 >= page_height * (1 - FOOTER_MARGIN):
+        return "page-footer"
+    if page_number == 0 and not title_seen and size >= body_size * TITLE_SIZE_RATIO:
+        return "title"
+    if _CAPTION.match(text):
+        return "caption"
+    if len(block["lines"]) <= 2 and (size >= body_size * HEADING_SIZE_RATIO or (_is_bold(block) and _SECTION_NUMBER.match(text))):
+        return "section-header"
+    if size <= body_size * FOOTNOTE_SIZE_RATIO and y0 >= page_height * (1 - FOOTNOTE_REGION) and _FOOTNOTE.match(text):
+        return "footnote"
+    if _LIST_ITEM.match(text):
+        return "list-item"
+    return "text"
+
+
+def merge_adjacent_blocks(blocks: list[dict[str, Any]], body_size: float) -> list[dict[str, Any]]:
+    """
+    PDFによっては1行ごとに別のブロックになっているため、左端と文字サイズがそろい、
+    行間が詰まって続くテキストブロックを1つにまとめる（レイアウト解析モデルの段落単位に近づける）。
+    """
+    merged: list[dict[str, Any]] = []
+    for block in blocks:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and block["type"] == 0
+            and previous["type"] == 0
+            and abs(block["bbox"][0] - previous["bbox"][0]) <= 2
+            and 0 <= block["bbox"][1] - previous["bbox"][3] <= body_size * PARAGRAPH_GAP_RATIO
+            and _block_size(block) == _block_size(previous)
+        ):
+            (x0, y0, x1, _) = previous["bbox"]
+            previous["bbox"] = (x0, y0, max(x1, block["bbox"][2]), block["bbox"][3])
+            previous["lines"] = previous["lines"] + block["lines"]
+            continue
+        merged.append(dict(block))
+    return merged
+
+
+def has_table_caption(blocks: list[dict[str, Any]]) -> bool:
+    """
+    `find_tables`は1ページに数百ミリ秒かかるため、表のキャプション（`表1`、`Table 1`）がある
+    ページでだけ呼ぶ。IPSJテンプレートの表には必ずキャプションが付く。
+    """
+    return any(
+        block["type"] == 0 and _TABLE_CAPTION.match(_block_text(block))
+        for block in blocks
+    )
+
+
+def _inside(bbox: tuple[float, float, float, float], region: tuple[float, float, float, float]) -> bool:
+    (x0, y0, x1, y1) = bbox
+    (rx0, ry0, rx1, ry1) = region
+    return x0 >= rx0 - 1 and y0 >= ry0 - 1 and x1 <= rx1 + 1 and y1 <= ry1 + 1
+
+
+def _box(bbox: tuple[float, float, float, float], boxclass: str, textlines: list[dict[str, Any]] | None, table: dict[str, Any] | None = None) -> dict[str, Any]:
+    (x0, y0, x1, y1) = bbox
+    return {"x0": x0, "y0": y0, "x1": x1, "y1": y1, "boxclass": boxclass, "image": None, "table": table, "textlines": textlines}
+
+
+def page_layout(page: pymupdf.Page, page_dict: dict[str, Any], body_size: float, title_seen: bool) -> tuple[dict[str, Any], bool]:
+    """1ページ分のレイアウトと、このページまでにタイトルが見つかったかを返す。"""
+    blocks = merge_adjacent_blocks([block for block in page_dict["blocks"] if block["type"] != 0 or _block_text(block)], body_size)
+    tables = [
+        (tuple(table.bbox), {"extract": table.extract(), "markdown": table.to_markdown()})
+        for table in page.find_tables().tables
+    ] if has_table_caption(blocks) else []
+    pictures = [tuple(block["bbox"]) for block in blocks if block["type"] == 1]
+    picture_lines: dict[tuple[float, ...], list[dict[str, Any]]] = {bbox: [] for bbox in pictures}
+    floats = [_box(bbox, "table", None, table) for bbox, table in tables]
+    texts: list[dict[str, Any]] = []
+    for block in blocks:
+        if block["type"] != 0 or not _block_text(block):
+            continue
+        bbox = tuple(block["bbox"])
+        if any(_inside(bbox, region) for region, _ in tables):
+            continue
+        picture = next((region for region in pictures if _inside(bbox, region)), None)
+        if picture is not None:
+            picture_lines[picture] += _textlines(block)
+            continue
+        boxclass = classify_block(block, page.number, page.rect.height, body_size, title_seen)
+        title_seen = title_seen or boxclass == "title"
+        texts.append(_box(bbox, boxclass, _textlines(block)))
+    floats += [_box(bbox, "picture", textlines) for bbox, textlines in picture_lines.items()]
+    return (
+        {
+            "page_number": page.number + 1,
+            "width": page.rect.width,
+            "height": page.rect.height,
+            "boxes": insert_floats(texts, floats),
+            "full_ocred": False,
+            "text_ocred": False,
+            "fulltext": [],
+            "words": [],
+            "links": [],
+        },
+        title_seen,
+    )
+
+
+def insert_floats(texts: list[dict[str, Any]], floats: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    テキストブロックはPyMuPDFの読み順（2段組みでは段ごと）のまま保ち、図表はそれぞれ、
+    同じ段でその下から始まる最初のテキストブロックの直前に差し込む。
+    """
+    ordered = list(texts)
+    for box in sorted(floats, key=lambda box: (box["x0"], box["y0"])):
+        width = box["x1"] - box["x0"]
+        position = next(
+            (
+                index
+                for index, other in enumerate(ordered)
+                if other["boxclass"] not in {"table", "picture"}
+                and abs(other["x0"] - box["x0"]) < width
+                and other["y0"] >= box["y1"] - 1
+            ),
+            len(ordered),
+        )
+        ordered.insert(position, box)
+    return ordered
+
+
+def extract_fast_layout(source: Path | bytes, filename: str = "") -> dict[str, Any]:
+    """
+    `pymupdf4llm.to_json`と同じ形（`PdfDocument`として読める）のレイアウトJSONを返す。
+    `source`にはPDFのパスか、メモリ上のPDFのバイト列（このときの名前は`filename`）を渡す。
+    """
+    from_bytes = not isinstance(source, Path)
+    with (pymupdf.open(stream=source, filetype="pdf") if from_bytes else pymupdf.open(source)) as doc:
+        page_dicts = [page.get_text("dict") for page in doc]
+        body_size = body_font_size(page_dicts)
+        pages: list[dict[str, Any]] = []
+        title_seen = False
+        for page, page_dict in zip(doc, page_dicts):
+            (layout, title_seen) = page_layout(page, page_dict, body_size, title_seen)
+            pages.append(layout)
+        metadata = {key: (doc.metadata or {}).get(key) or "" for key in (
+            "format", "title", "author", "subject", "keywords", "creator",
+            "producer", "creationDate", "modDate", "trapped",
+        )}
+        metadata["encryption"] = (doc.metadata or {}).get("encryption")
+        return {
+            "filename": filename if from_bytes else str(source),
+            "page_count": doc.page_count,
+            "toc": doc.get_toc(),
+            "pages": pages,
+            "metadata": metadata,
+            "from_bytes": from_bytes,
+            "image_dpi": 150,
+            "image_format": "png",
+            "image_path": "",
+            "use_ocr": False,
+            "form_fields": {},
+            "force_text": True,
+            "embed_images": False,
+            "write_images": False,
+        }
@@ -0,0 +1,121 @@
+"""レイアウト抽出キャッシュ（`<pdf>.json` / `<pdf>.txt`）の集計・容量制限・事前生成。"""
+
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Literal
+
+from returns.result import Failure
+
+from .pdf2text import json_cache_path, pdf2json
+
+CacheKind = Literal["json", "txt"]
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    path: Path
+    kind: CacheKind
+    size: int
+    atime: float
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    count: int
+    total_bytes: int
+    bytes_by_kind: dict[str, int]
+    count_by_kind: dict[str, int]
+    oldest_access: float | None
+    newest_access: float | None
+
+
+def parse_size(text: str) -> int:
+    """`"500M"`や`"2G"`、`"1.5GiB"`のような容量指定をバイト数に変換する。"""
+    matched = re.fullmatch(r"\s*([0-9]+(?:\.[0-9]+)?)\s*([KMGT]?)(?:i?B)?\s*", text, re.IGNORECASE)
+    if matched is None:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(float(matched[1]) * _SIZE_UNITS[matched[2].upper()])
+
+
+def format_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TiB"
+
+
+def scan_cache(root_path: Path) -> list[CacheEntry]:
+    """`root_path/data/recid_*/`以下のレイアウトキャッシュを列挙する。"""
+    entries: list[CacheEntry] = []
+    for kind, pattern in (("json", "*.pdf.json"), ("txt", "*.pdf.txt")):
+        for path in root_path.glob(f"./data/recid_*/{pattern}"):
+            stat = path.stat()
+            entries.append(CacheEntry(path, kind, stat.st_size, stat.st_atime))
+    return entries
+
+
+def cache_stats(entries: Iterable[CacheEntry]) -> CacheStats:
+    count = 0
+    total = 0
+    bytes_by_kind: dict[str, int] = {}
+    count_by_kind: dict[str, int] = {}
+    oldest: float | None = None
+    newest: float | None = None
+    for entry in entries:
+        count += 1
+        total += entry.size
+        bytes_by_kind[entry.kind] = bytes_by_kind.get(entry.kind, 0) + entry.size
+        count_by_kind[entry.kind] = count_by_kind.get(entry.kind, 0) + 1
+        oldest = entry.atime if oldest is None else min(oldest, entry.atime)
+        newest = entry.atime if newest is None else max(newest, entry.atime)
+    return CacheStats(count, total, bytes_by_kind, count_by_kind, oldest, newest)
+
+
+def select_evictions(entries: Iterable[CacheEntry], budget_bytes: int) -> list[CacheEntry]:
+    """合計が`budget_bytes`以下になるまで、最後に読まれた時刻が古いものから選ぶ。"""
+    ordered = sorted(entries, key=lambda entry: entry.atime)
+    total = sum(entry.size for entry in ordered)
+    evicted: list[CacheEntry] = []
+    for entry in ordered:
+        if total <= budget_bytes:
+            break
+        evicted.append(entry)
+        total -= entry.size
+    return evicted
+
+
+def prune_cache(root_path: Path, budget_bytes: int, dry_run: bool = False) -> list[CacheEntry]:
+    """キャッシュの合計を`budget_bytes`に収まるようLRUで削除し、削除したエントリを返す。"""
+    evicted = select_evictions(scan_cache(root_path), budget_bytes)
+    if not dry_run:
+        for entry in evicted:
+            entry.path.unlink(missing_ok=True)
+    return evicted
+
+
+def _warm_one(path_pdf: Path) -> tuple[Path, str | None]:
+    result = pdf2json(path_pdf)
+    if isinstance(result, Failure):
+        return (path_pdf, str(result.failure()))
+    return (path_pdf, None)
+
+
+def warm_cache(paths_pdf: Iterable[Path], jobs: int | None = None) -> Iterator[tuple[Path, str | None]]:
+    """
+    レイアウトキャッシュが無いPDFについて、解析の前に並列で`pdf2json`を済ませておく。
+    抽出したPDFごとに`(path, エラーメッセージまたはNone)`を返す。
+    """
+    missing = [path for path in paths_pdf if not json_cache_path(path).exists()]
+    if not missing:
+        return
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        yield from executor.map(_warm_one, missing)
@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 import re
+from contextlib import AbstractContextManager, nullcontext
 from returns.primitives.exceptions import UnwrapFailedError
 from returns.result import safe, Success, Failure
 
 from .pdf_types import Figure, Paper, Reference
 
-from .stream import ExceptionReport, TokenStream, exception_report
+from .stream import ExceptionReport, TokenStream, WarningCode, exception_report
 from .tokens import Token, TokenType
 
 
@@ -17,7 +18,8 @@ def split_list_items(lines: list[str]) -> list[str]:
     list_itemのcontentに複数の箇条書きが含まれてしまっている場合に、
     箇条書きごとにcontentを分割する
     """
-    list_items: list[str] = []
+    # 行を文字列の`+=`でつなぐと継続行の数の2乗に比例するので、行のまま集めてから最後に連結する
+    list_items: list[list[str]] = []
     for line in lines:
         if len(line) == 0:
             continue
@@ -25,9 +27,9 @@ def split_list_items(lines: list[str]) -> list[str]:
             re.match(r"(\(|（|\[|\*)[0-9a-zA-Z]{0,3}(\)|）|\])(.{3,})", line) is not None
             or len(list_items) == 0
         ):
-            list_items.append("")
-        list_items[-1] += line
-    return list_items
+            list_items.append([])
+        list_items[-1].append(line)
+    return ["".join(item) for item in list_items]
 
 
 def split_footnotes(lines: list[str]) -> list[str]:
@@ -35,14 +37,14 @@ def split_footnotes(lines: list[str]) -> list[str]:
     footnotesのcontentに複数の箇条書きが含まれてしまっている場合に、
     箇条書きごとにcontentを分割する
     """
-    list_items: list[str] = []
+    list_items: list[list[str]] = []
     for line in lines:
         if len(line) == 0:
             continue
         if re.match(r"(\[[0-9a-zA-Z]{0,3}\]|\*|[a-zA-Z]\))", line) is not None or len(list_items) == 0:
-            list_items.append("")
-        list_items[-1] += line
-    return list_items
+            list_items.append([])
+        list_items[-1].append(line)
+    return ["".join(item) for item in list_items]
 
 
 @safe(exceptions=(ExceptionReport, UnwrapFailedError))
@@ -61,7 +63,7 @@ def parse_list_item(paper: Paper, tokens: TokenStream) -> None:
 def extract_fig_caption_from_stringize_content(figure: Figure, tokens: TokenStream):
     match = re.search(r"図\s*[0-9０-９]{1,2}\s*([^\n]*)", figure.stringize_content)
     if match == None:
-        raise exception_report(tokens, "画像のトークンの中に図のキャプションが入っていません")
+        raise exception_report(tokens, "画像のトークンの中に図のキャプションが入っていません", WarningCode.FIGURE_CAPTION_NOT_IN_PICTURE)
     (start, end) = match.span()
     return figure.stringize_content[start:end]
 
@@ -69,7 +71,7 @@ def extract_fig_caption_from_stringize_content(figure: Figure, tokens: TokenStre
 def extract_tab_caption_from_stringize_content(table: str, tokens: TokenStream):
     match = re.search(r"\|表\s*(\*\*)?[0-9０-９]{1,2}(\*\*)\s*?(\||<br>)?([^|].*)\|", table)
     if match == None:
-        raise exception_report(tokens, f"表のトークンの中に表のキャプションが入っていません: {table}")
+        raise exception_report(tokens, f"表のトークンの中に表のキャプションが入っていません: {table}", WarningCode.TABLE_CAPTION_NOT_IN_TABLE)
     (start, end) = match.span()
     return re.sub(r"\*\*|<br>|\|", "", table[start:end])
 
@@ -77,7 +79,7 @@ def extract_tab_caption_from_stringize_content(table: str, tokens: TokenStream):
 def split_caption_number_title(caption: str, tokens: TokenStream):
     matched = re.search(r"(図|表)\s*(?P<number>[0-9０-９]+)\s*(?P<title>.+)$", caption.strip())
     if matched == None:
-        raise exception_report(tokens, f"図・表のキャプションが指定された形式に則っていません。: {caption}")
+        raise exception_report(tokens, f"図・表のキャプションが指定された形式に則っていません。: {caption}", WarningCode.CAPTION_FORMAT)
     number = matched["number"]
     title = matched["title"]
     assert isinstance(number, str) and isinstance(title, str)
@@ -107,7 +109,7 @@ def parse_figure(paper: Paper, tokens: TokenStream) -> None:
                     caption = text
                 case Failure(_):
                     paper.add_figure(figure.stringize_content, "", "")
-                    paper.warnings.append(exception_report(tokens, f"キャプションの読み取りができなかったため、空文字として設定されます。"))
+                    paper.warnings.append(exception_report(tokens, f"キャプションの読み取りができなかったため、空文字として設定されます。", WarningCode.FIGURE_CAPTION_EMPTY))
                     return
     (figure.number, figure.title) = split_caption_number_title(caption, tokens).unwrap()
     paper.add_figure(figure.stringize_content, str(figure.number), figure.title)
@@ -133,7 +135,7 @@ def parse_table(paper: Paper, tokens: TokenStream, with_caption:bool) -> None:
             case Success(text):
                 caption = text
             case Failure(_):
-                paper.warnings.append(exception_report(tokens, f"キャプションの読み取りができなかったため、空文字として設定されます。"))
+                paper.warnings.append(exception_report(tokens, f"キャプションの読み取りができなかったため、空文字として設定されます。", WarningCode.TABLE_CAPTION_EMPTY))
                 paper.add_table(table.content, "", "")            
                 return
         (number, title) = split_caption_number_title(caption, tokens).unwrap()
@@ -197,7 +199,7 @@ def parse_main_text(paper: Paper, tokens: TokenStream) -> None:
             paper.add_section_title(title, number)
         else:
             if not paper.exists_paragraph():
-                paper.warnings.append(exception_report(tokens, "パラグラフが一つもない状態で段落が新たに追加されました。何か読み取りで変なことが起こっている可能性が高いです。"))
+                paper.warnings.append(exception_report(tokens, "パラグラフが一つもない状態で段落が新たに追加されました。何か読み取りで変なことが起こっている可能性が高いです。", WarningCode.PARAGRAPH_WITHOUT_START))
                 paper.add_paragraph("")
             paper.extend_last_paragraph(line)
 
@@ -213,7 +215,7 @@ def parse_abstract(paper: Paper, tokens: TokenStream):
         case Failure(_):
             maybe_abstract = tokens.pop("概要(フォールバック)").unwrap().content
             paper.abstract = maybe_abstract
-            paper.warnings.append(exception_report(tokens, "概要が正しい形式に収まっていませんでした。全文をそのまま概要として掲載します。"))
+            paper.warnings.append(exception_report(tokens, "概要が正しい形式に収まっていませんでした。全文をそのまま概要として掲載します。", WarningCode.ABSTRACT_FALLBACK))
 
 @safe(exceptions=(ExceptionReport, UnwrapFailedError))
 def parse_keywords(paper: Paper, tokens: TokenStream):
@@ -227,14 +229,14 @@ def parse_keywords(paper: Paper, tokens: TokenStream):
             assert isinstance(keyword, str)
         paper.keywords = keywords
     else:
-        paper.warnings.append(exception_report(tokens, f"キーワードが見つからなかったので空文字列で設定されます。"))
+        paper.warnings.append(exception_report(tokens, f"キーワードが見つからなかったので空文字列で設定されます。", WarningCode.KEYWORDS_MISSING))
         paper.keywords = []
 
 @safe(exceptions=(ExceptionReport, UnwrapFailedError))
 def parse_paper_head(paper: Paper, tokens: TokenStream) -> None:
     while not tokens.empty() and tokens.next().unwrap().type in {TokenType.TITLE, TokenType.SECTION_HEADER}:
         if "[" in tokens.next().unwrap().content:
-            paper.warnings.append(exception_report(tokens, f"著者名群のところがタイトル・セクションヘッダと誤認されていたため、タイトルの読み取りを中断します。"))
+            paper.warnings.append(exception_report(tokens, f"著者名群のところがタイトル・セクションヘッダと誤認されていたため、タイトルの読み取りを中断します。", WarningCode.TITLE_INTERRUPTED))
             break
         title = tokens.pop("タイトル").unwrap()
         paper.title += title.content
@@ -248,13 +250,20 @@ def parse_references(paper: Paper, tokens: TokenStream) -> None:
     tokens.expect("参考文献", {TokenType.SECTION_HEADER}).unwrap()
     def process_tokens():
         popped = tokens.pop("参考文献リスト").unwrap()
+        # 直前の参考文献に続く行は、次の参考文献が始まるまでまとめてから1回で連結する
+        continued: list[str] = []
         for line in popped.lines:
             matched = re.match(r"(?P<number>\[?[0-9]{1,3}(\]|\)))(?P<content>.+)", line)
             if matched is None:
-                paper.references[-1].content += line
+                continued.append(line)
             else:
                 assert isinstance(matched["number"], str) and isinstance(matched["content"], str)
+                if continued:
+                    paper.references[-1].content += "".join(continued)
+                    continued = []
                 paper.references.append(Reference(matched["number"], matched["content"]))
+        if continued:
+            paper.references[-1].content += "".join(continued)
     while not tokens.empty():
         next_token = tokens.next().unwrap()
         if next_token.type in {TokenType.LIST_ITEM, TokenType.TEXT}:
@@ -287,7 +296,7 @@ def is_actually_table(token: Token) -> bool:
 
 @safe(exceptions=(ExceptionReport, UnwrapFailedError))
 def parse_table_from_picture_fallback(paper:Paper, tokens:TokenStream) -> None:
-    paper.warnings.append(exception_report(tokens, f"表が図として認識されていたようなので、表として解釈します。"))
+    paper.warnings.append(exception_report(tokens, f"表が図として認識されていたようなので、表として解釈します。", WarningCode.TABLE_FROM_PICTURE))
     token = tokens.pop("表（図に対するフォールバック）").unwrap()
 
     cells:list[list[str | None]] = [[line] for line in token.lines]
@@ -295,7 +304,7 @@ def parse_table_from_picture_fallback(paper:Paper, tokens:TokenStream) -> None:
     
     matches= re.match(r"表(?P<number>[0-9０-９]{1,2})(?P<title>.*)", token.lines[0])
     if matches == None: 
-        paper.warnings.append(exception_report(tokens, f"表のキャプションがトークン中に存在しませんでした。タイトルなしで登録します。"))
+        paper.warnings.append(exception_report(tokens, f"表のキャプションがトークン中に存在しませんでした。タイトルなしで登録します。", WarningCode.TABLE_FROM_PICTURE_NO_CAPTION))
         paper.add_table(content, "", "")
         return
     number = matches["number"]
@@ -305,67 +314,99 @@ def parse_table_from_picture_fallback(paper:Paper, tokens:TokenStream) -> None:
 
 
 
+def _branch(paper: Paper, token: TokenType | str, handler: str, fallback: bool = False) -> AbstractContextManager[None]:
+    """`paper.profile`が設定されているときだけ、分岐の所要時間と警告数を記録する。"""
+    if paper.profile is None:
+        return nullcontext()
+    name = token.value if isinstance(token, TokenType) else token
+    return paper.profile.branch(paper, name, handler, fallback)
+
+
 @safe(exceptions=(ExceptionReport, UnwrapFailedError))
 def parse_paper(paper: Paper, tokens: TokenStream) -> None:
-    tokens.expect("ページヘッダ", tokentypes={TokenType.PAGE_HEADER}).unwrap()
-    parse_paper_head(paper, tokens).unwrap()
+    if paper.profile is not None:
+        paper.profile.papers += 1
+    with _branch(paper, "head", "parse_paper_head"):
+        tokens.expect("ページヘッダ", tokentypes={TokenType.PAGE_HEADER}).unwrap()
+        parse_paper_head(paper, tokens).unwrap()
     
     while not tokens.empty():
         next_token = tokens.next().unwrap()
         match next_token.type:
             case TokenType.PAGE_HEADER:
-                tokens.expect("ページヘッダ", {TokenType.PAGE_HEADER}).unwrap()
+                with _branch(paper, next_token.type, "skip"):
+                    tokens.expect("ページヘッダ", {TokenType.PAGE_HEADER}).unwrap()
                 continue
             case TokenType.PAGE_FOOTER:
-                tokens.expect("ページフッタ", {TokenType.PAGE_FOOTER}).unwrap()
+                with _branch(paper, next_token.type, "skip"):
+                    tokens.expect("ページフッタ", {TokenType.PAGE_FOOTER}).unwrap()
                 continue
             case TokenType.SECTION_HEADER:
                 if is_actually_table_caption(tokens):
-                    parse_table(paper, tokens, True).unwrap()
+                    with _branch(paper, next_token.type, "parse_table", fallback=True):
+                        parse_table(paper, tokens, True).unwrap()
                 elif next_token.content != "参考文献":
-                    parse_section_header(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_section_header"):
+                        parse_section_header(paper, tokens).unwrap()
                 else:
-                    parse_references(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_references"):
+                        parse_references(paper, tokens).unwrap()
                 continue
             case TokenType.TEXT:
                 # SECTION_HEADER, FOOTNOTEが誤ってこれと判別されているケースがあるのでその対処
                 if is_actually_footnote(next_token):
-                    parse_footnote(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_footnote", fallback=True):
+                        parse_footnote(paper, tokens).unwrap()
                 elif is_actually_table_caption(tokens):
-                    parse_table(paper, tokens, True).unwrap()
+                    with _branch(paper, next_token.type, "parse_table", fallback=True):
+                        parse_table(paper, tokens, True).unwrap()
                 elif is_actually_section_header(next_token):
-                    parse_section_header(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_section_header", fallback=True):
+                        parse_section_header(paper, tokens).unwrap()
                 else:
-                    parse_main_text(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_main_text"):
+                        parse_main_text(paper, tokens).unwrap()
                 continue
             case TokenType.FOOTNOTE:
-                parse_footnote(paper, tokens).unwrap()
+                with _branch(paper, next_token.type, "parse_footnote"):
+                    parse_footnote(paper, tokens).unwrap()
                 continue
             case TokenType.PICTURE:
                 if is_actually_table(next_token):
-                    parse_table_from_picture_fallback(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_table_from_picture_fallback", fallback=True):
+                        parse_table_from_picture_fallback(paper, tokens).unwrap()
                 else:
-                    parse_figure(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_figure"):
+                        parse_figure(paper, tokens).unwrap()
             case TokenType.TABLE:
-                parse_table(paper, tokens, False).unwrap()
+                with _branch(paper, next_token.type, "parse_table"):
+                    parse_table(paper, tokens, False).unwrap()
             case TokenType.LIST_ITEM:
                 if is_actually_footnote(next_token):
-                    parse_footnote(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_footnote", fallback=True):
+                        parse_footnote(paper, tokens).unwrap()
                 elif is_actually_table_caption(tokens):
-                    parse_table(paper, tokens, True).unwrap()
+                    with _branch(paper, next_token.type, "parse_table", fallback=True):
+                        parse_table(paper, tokens, True).unwrap()
                 else:
-                    parse_list_item(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_list_item"):
+                        parse_list_item(paper, tokens).unwrap()
             case TokenType.CAPTION:
                 if next_token.content.startswith("図"):
-                    parse_figure(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_figure"):
+                        parse_figure(paper, tokens).unwrap()
                 elif next_token.content.startswith("表"):
-                    parse_table(paper, tokens, True).unwrap()
+                    with _branch(paper, next_token.type, "parse_table"):
+                        parse_table(paper, tokens, True).unwrap()
                 else:
-                    parse_main_text(paper, tokens).unwrap()
+                    with _branch(paper, next_token.type, "parse_main_text", fallback=True):
+                        parse_main_text(paper, tokens).unwrap()
             case TokenType.FORMULA:
-                parse_main_text(paper, tokens).unwrap()
+                with _branch(paper, next_token.type, "parse_main_text"):
+                    parse_main_text(paper, tokens).unwrap()
             case TokenType.TITLE:
-                parse_main_text(paper, tokens).unwrap()
+                with _branch(paper, next_token.type, "parse_main_text", fallback=True):
+                    parse_main_text(paper, tokens).unwrap()
             case _:
                 assert 0, next_token.type
         
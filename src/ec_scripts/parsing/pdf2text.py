@@ -1,13 +1,59 @@
 """PDFレイアウト情報を行単位テキストに変換する。"""
 
+import hashlib
 import json
+import os
+import time
 from pathlib import Path
+from typing import Any, Literal
 from returns.result import safe
+import pymupdf
 import pymupdf.layout as _
 import pymupdf4llm
 import argparse
 
-from .pymupdf_layout_types import PdfDocument, list_span_texts
+from .pymupdf_layout_types import PdfDocument, TokenDocument, list_span_texts
+from .fast_layout import extract_fast_layout
+from .tokens import Token, doc_to_tokens, layout_json_to_tokens
+
+# `layout`はpymupdf4llmのレイアウト解析、`fast`はレイアウト解析モデルを使わないヒューリスティック
+Backend = Literal["layout", "fast"]
+BACKENDS: tuple[Backend, ...] = ("layout", "fast")
+
+def json_cache_path(path_pdf:Path) -> Path:
+    return path_pdf.with_name(f"{path_pdf.name}.json")
+
+def txt_cache_path(path_pdf:Path) -> Path:
+    return path_pdf.with_name(f"{path_pdf.name}.txt")
+
+def mark_cache_access(path_cache:Path) -> None:
+    """
+    キャッシュを読んだ時刻をatimeとして記録する。`relatime`/`noatime`でマウントされていても
+    LRUの追い出し（`layout_cache.prune_cache`）が正しく働くよう、明示的に更新する。
+    """
+    try:
+        os.utime(path_cache, (time.time(), path_cache.stat().st_mtime))
+    except OSError:
+        pass
+
+def read_cache_bytes(path_cache:Path) -> bytearray:
+    """
+    キャッシュJSONをバイト列のまま読み込む。
+    `read_text`のようなUTF-8からstrへのデコード（日本語ではさらにサイズが膨らむ）を挟まず、
+    ファイルサイズ分だけ確保したバッファへ直接読み込んで、そのままpydanticに渡す。
+    """
+    with path_cache.open("rb", buffering=0) as f:
+        buffer = bytearray(os.fstat(f.fileno()).st_size)
+        view = memoryview(buffer)
+        read = 0
+        while read < len(buffer):
+            n = f.readinto(view[read:])
+            if not n:
+                break
+            read += n
+        view.release()
+    del buffer[read:]
+    return buffer
 
 @safe
 def pdf2txt(
@@ -15,8 +61,9 @@ def pdf2txt(
     cached:bool = True
 ) -> str:
     """`path_pdf`に与えられたPDFをpymupdf4llmによってテキスト化する。"""
-    path_txt = path_pdf.with_name(f"{path_pdf.name}.txt")
+    path_txt = txt_cache_path(path_pdf)
     if path_txt.exists() and cached:
+        mark_cache_access(path_txt)
         return path_txt.read_text(encoding="utf-8")
     txt = pymupdf4llm.to_markdown(path_pdf)
     if not isinstance(txt, str):
@@ -25,20 +72,125 @@ def pdf2txt(
         path_txt.write_text(txt, encoding="utf-8")
     return txt
 
+def strip_image_payloads(ob:dict[str, Any]) -> int:
+    """
+    レイアウトJSONのボックスから画像データ（`Box.image`）を取り除き、取り除いた数を返す。
+    トークン化では`picture`ボックスもテキスト行しか読まないため、図の多い論文でキャッシュが膨らむのを防ぐ。
+    """
+    stripped = 0
+    for page in ob.get("pages", []):
+        for box in page.get("boxes", []):
+            if box.get("image") is not None:
+                box["image"] = None
+                stripped += 1
+    return stripped
+
+def extract_layout(path_pdf:Path, write_cache:bool = True) -> dict[str, Any]:
+    """pymupdf4llmでレイアウトを抽出し、画像を取り除いてキャッシュに書き出したうえで、デコード済みの辞書を返す。"""
+    # 図の中身は使わないので、画像の埋め込み・書き出しは明示的に無効にする
+    txt = pymupdf4llm.to_json(path_pdf, embed_images=False, write_images=False)
+    ob = json.loads(txt)
+    strip_image_payloads(ob)
+    if write_cache:
+        json_cache_path(path_pdf).write_text(json.dumps(ob, ensure_ascii=False), encoding="utf-8")
+    return ob
+
+def content_cache_path(cache_dir:Path, data:bytes) -> Path:
+    """PDFの中身のSHA-256をキーにしたキャッシュのパス。ファイルを持たないPDF（バイト列）のキャッシュに使う。"""
+    return cache_dir / f"{hashlib.sha256(data).hexdigest()}.json"
+
+def extract_layout_bytes(data:bytes, filename:str = "") -> dict[str, Any]:
+    """`extract_layout`のバイト列版。ファイルシステムには何も書かない。"""
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        txt = pymupdf4llm.to_json(doc, embed_images=False, write_images=False)
+    ob = json.loads(txt)
+    strip_image_payloads(ob)
+    ob["filename"] = filename
+    ob["from_bytes"] = True
+    return ob
+
 @safe
 def pdf2json(
     path_pdf:Path,
     cached:bool = True
 ) -> PdfDocument:
     """`path_pdf`に与えられたPDFをpymupdf4llmによってJSON化する。"""
-    path_json = path_pdf.with_name(f"{path_pdf.name}.json")
+    path_json = json_cache_path(path_pdf)
     if path_json.exists() and cached:
-        return PdfDocument.model_validate_json(path_json.read_text(encoding="utf-8"))
-    txt = pymupdf4llm.to_json(path_pdf, )
-    ob = json.loads(txt)
-    txt = json.dumps(ob, ensure_ascii=False)
-    path_json.write_text(txt, encoding="utf-8")
-    return PdfDocument.model_validate_json(txt)
+        mark_cache_access(path_json)
+        return PdfDocument.model_validate_json(read_cache_bytes(path_json))
+    return PdfDocument.model_validate(extract_layout(path_pdf))
+
+@safe
+def load_token_document(
+    path_pdf:Path,
+    cached:bool = True
+) -> PdfDocument | TokenDocument:
+    """
+    トークン化に必要な分だけのレイアウトを読む。
+    キャッシュがあれば軽量な`TokenDocument`として検証し、無ければ`pdf2json`で抽出する。
+    """
+    path_json = json_cache_path(path_pdf)
+    if path_json.exists() and cached:
+        mark_cache_access(path_json)
+        return TokenDocument.model_validate_json(read_cache_bytes(path_json))
+    return pdf2json(path_pdf, cached).unwrap()
+
+def tokens_from_cache_bytes(data:bytes | bytearray) -> tuple[list[Token], int]:
+    doc = TokenDocument.model_validate_json(data)
+    return (doc_to_tokens(doc), len(doc.pages))
+
+@safe
+def load_layout_tokens(
+    path_pdf:Path,
+    cached:bool = True,
+    backend:Backend = "layout",
+    prefetched:bytes | bytearray | None = None,
+) -> tuple[list[Token], int]:
+    """
+    トークン列とページ数を返す。
+    キャッシュがあれば`TokenDocument`を経由する（不要なフィールドをpydantic側で読み飛ばせるため、
+    `json.loads`で全体を辞書にするより速い）。キャッシュが無ければ、抽出したばかりの辞書から
+    `layout_json_to_tokens`で直接トークン化し、`PdfDocument`の組み立てを省く。
+    `backend="fast"`のときは毎回`extract_fast_layout`で抽出し、レイアウトキャッシュは読み書きしない。
+    `prefetched`には、呼び出し元が先に読んでおいたキャッシュの中身を渡せる。
+    """
+    if backend == "fast":
+        ob = extract_fast_layout(path_pdf)
+        return (layout_json_to_tokens(ob), len(ob["pages"]))
+    if prefetched is not None:
+        return tokens_from_cache_bytes(prefetched)
+    path_json = json_cache_path(path_pdf)
+    if path_json.exists() and cached:
+        mark_cache_access(path_json)
+        return tokens_from_cache_bytes(read_cache_bytes(path_json))
+    ob = extract_layout(path_pdf)
+    return (layout_json_to_tokens(ob), len(ob["pages"]))
+
+@safe
+def load_layout_tokens_from_bytes(
+    data:bytes,
+    filename:str = "",
+    cache_dir:Path | None = None,
+    backend:Backend = "layout",
+) -> tuple[list[Token], int]:
+    """
+    メモリ上のPDFから`load_layout_tokens`と同じものを返す。
+    `cache_dir`を渡すと、レイアウトを`content_cache_path`（中身のハッシュ）にキャッシュする。
+    渡さなければファイルシステムには一切触れない。
+    """
+    if backend == "fast":
+        ob = extract_fast_layout(data, filename)
+        return (layout_json_to_tokens(ob), len(ob["pages"]))
+    path_json = content_cache_path(cache_dir, data) if cache_dir is not None else None
+    if path_json is not None and path_json.exists():
+        mark_cache_access(path_json)
+        return tokens_from_cache_bytes(read_cache_bytes(path_json))
+    ob = extract_layout_bytes(data, filename)
+    if path_json is not None:
+        path_json.parent.mkdir(parents=True, exist_ok=True)
+        path_json.write_text(json.dumps(ob, ensure_ascii=False), encoding="utf-8")
+    return (layout_json_to_tokens(ob), len(ob["pages"]))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
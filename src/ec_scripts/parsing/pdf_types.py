@@ -1,12 +1,14 @@
 """論文構造データの型定義（Paper/Segment等）。"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import dataclasses
 import json
 import logging
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Iterable, Literal, Optional
+from .profile import ParseProfile
 from .stream import ExceptionReport, exception_report
+from ..json_io import DEFAULT_JSON_OUTPUT, JsonOutputOptions, dump_json
 from ..util import clean_multiline_literal
 
 SegmentTypeName = Literal["SectionTitle"] | Literal["Paragraph"] | Literal["ListItems"] | Literal["Figure"] | Literal["Table"] | Literal["FootNote"]
@@ -23,6 +25,27 @@ class Reference:
     sign:str
     content:str
 
+@dataclass
+class PaperMetrics:
+    """
+    1本の論文の抽出・解析コスト。
+    セグメント数と本文の文字数は`Paper`にセグメントを追加するたびに数えるので、集計のために`segments`を走査し直す必要はない。
+    """
+    page_count:int = 0
+    token_counts:dict[str, int] = field(default_factory=dict)
+    segment_counts:dict[str, int] = field(default_factory=dict)
+    text_chars:int = 0
+    layout_cached:bool = False
+    extract_seconds:float = 0.0
+    parse_seconds:float = 0.0
+
+    def count_segment(self, segment:Segment):
+        self.segment_counts[segment.type] = self.segment_counts.get(segment.type, 0) + 1
+    def count_tokens(self, page_count:int, token_types:Iterable[str]):
+        self.page_count = page_count
+        for token_type in token_types:
+            self.token_counts[token_type] = self.token_counts.get(token_type, 0) + 1
+
 class Paper:
     title:str
     abstract:str
@@ -30,6 +53,8 @@ class Paper:
     segments:list[Segment]
     references:list[Reference]
     warnings:list[ExceptionReport]
+    profile:Optional[ParseProfile]
+    metrics:PaperMetrics
 
     _queued_segment:list[Segment]
     _last_paragraph:int = -1
@@ -42,6 +67,8 @@ class Paper:
         self.references = []
         self._queued_segment = []
         self.warnings = []
+        self.profile = None
+        self.metrics = PaperMetrics()
     
     def end_of_the_paper(self):
         self._flush_queue()
@@ -51,30 +78,36 @@ class Paper:
         for warning in self.warnings:
             logging.warning(str(warning))
         
-    def decode_json(self, out:Path, warning_path:Path):
-        obj = {
+    def content_dict(self):
+        return {
             "title": self.title,
             "abstract": self.abstract,
             "keywords": self.keywords,
             "segments": [dataclasses.asdict(segment) for segment in self.segments],
             "references": [dataclasses.asdict(reference) for reference in self.references]
         }
-        out.write_text(json.dumps(obj, ensure_ascii=False, indent=4))
-    
-        warnings = {
+    def warnings_dict(self):
+        return {
             "warnings": [warning.decode_dict() for warning in self.warnings]
         }
-        warning_path.write_text(json.dumps(warnings, ensure_ascii=False, indent=4))
+    def decode_json(self, out:Path, warning_path:Path, options:JsonOutputOptions = DEFAULT_JSON_OUTPUT):
+        dump_json(self.content_dict(), out, options)
+        dump_json(self.warnings_dict(), warning_path, options)
+    def _append_segment(self, segment:Segment):
+        self.segments.append(segment)
+        self.metrics.count_segment(segment)
     def add_section_title(self, title:str, sign:str):
-        self.segments.append(Segment("SectionTitle", sign, None, title,))
+        self._append_segment(Segment("SectionTitle", sign, None, title,))
+        self.metrics.text_chars += len(title)
 
     def add_listitems(self):
         self._flush_queue()
-        self.segments.append(Segment("ListItems", None, None, ""))
+        self._append_segment(Segment("ListItems", None, None, ""))
         self._last_list_items = len(self.segments) - 1
     def extend_last_listitems(self, appended:str):
         assert self._last_list_items >= 0, f"箇条書き要素を一つ以上追加してください: {appended}"
         self.segments[self._last_list_items].content += appended + "\n"
+        self.metrics.text_chars += len(appended)
     def is_last_text_listitem(self):
         return self._last_list_items > self._last_paragraph
     def exists_listitems(self):
@@ -83,13 +116,15 @@ class Paper:
 
     def add_paragraph(self, appended:str):
         self._flush_queue()
-        self.segments.append(Segment("Paragraph", None, None, appended))
+        self._append_segment(Segment("Paragraph", None, None, appended))
         self._last_paragraph = len(self.segments) - 1
+        self.metrics.text_chars += len(appended)
     def exists_paragraph(self):
         return self._last_paragraph >= 0
     def extend_last_paragraph(self, appended:str):
         assert self._last_paragraph >= 0, f"パラグラフを一つ以上追加してください。: {appended}"
         self.segments[self._last_paragraph].content += appended
+        self.metrics.text_chars += len(appended)
     def exists_interrupted_paragraph(self):
         if self._last_paragraph == -1: return False
         return not self.segments[self._last_paragraph].content.strip().endswith(("．", "。", "."))
@@ -104,7 +139,11 @@ class Paper:
         self._queued_segment.append(Segment("Table", content, sign, caption))
 
     def _flush_queue(self):
-        self.segments.extend(self._queued_segment)
+        for segment in self._queued_segment:
+            self._append_segment(segment)
+            # 脚注の文字数は、`segments`に入った（`content.json`に書き出される）ときに数える
+            if segment.type == "FootNote":
+                self.metrics.text_chars += len(segment.content)
         self._queued_segment = []
     
 
@@ -0,0 +1,109 @@
+"""`parse_paper`の分岐ごとの呼び出し回数・累積時間・警告数を記録する任意のプロファイラ。"""
+
+from __future__ import annotations
+
+import csv
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from .pdf_types import Paper
+
+
+@dataclass
+class BranchStats:
+    calls: int = 0
+    seconds: float = 0.0
+    warnings: int = 0
+    failures: int = 0
+    fallback: bool = False
+
+    def merge(self, other: BranchStats) -> None:
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.warnings += other.warnings
+        self.failures += other.failures
+        self.fallback = self.fallback or other.fallback
+
+
+@dataclass
+class ParseProfile:
+    """
+    分岐名（`"text→parse_main_text"`のように、トークン種別→処理関数）ごとの集計。
+    `Paper.profile`に設定したときだけ`parse_paper`が記録する。
+    """
+
+    branches: dict[str, BranchStats] = field(default_factory=dict)
+    papers: int = 0
+
+    @contextmanager
+    def branch(self, paper: Paper, token: str, handler: str, fallback: bool = False) -> Iterator[None]:
+        stats = self.branches.setdefault(f"{token}→{handler}", BranchStats(fallback=fallback))
+        warnings_before = len(paper.warnings)
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stats.failures += 1
+            raise
+        finally:
+            stats.calls += 1
+            stats.seconds += time.perf_counter() - start
+            stats.warnings += len(paper.warnings) - warnings_before
+
+    def merge(self, other: ParseProfile) -> None:
+        self.papers += other.papers
+        for name, stats in other.branches.items():
+            self.branches.setdefault(name, BranchStats(fallback=stats.fallback)).merge(stats)
+
+    def rows(self) -> list[dict[str, str | int | float]]:
+        """累積時間の大きい順に並べた集計表。"""
+        total_calls = sum(stats.calls for stats in self.branches.values()) or 1
+        total_seconds = sum(stats.seconds for stats in self.branches.values()) or 1.0
+        rows: list[dict[str, str | int | float]] = []
+        for name, stats in sorted(self.branches.items(), key=lambda item: -item[1].seconds):
+            rows.append(
+                {
+                    "branch": name,
+                    "fallback": int(stats.fallback),
+                    "calls": stats.calls,
+                    "call_share": round(stats.calls / total_calls, 4),
+                    "seconds": round(stats.seconds, 6),
+                    "time_share": round(stats.seconds / total_seconds, 4),
+                    "mean_us": round(stats.seconds * 1e6 / stats.calls, 2) if stats.calls else 0.0,
+                    "warnings": stats.warnings,
+                    "warning_rate": round(stats.warnings / stats.calls, 4) if stats.calls else 0.0,
+                    "failures": stats.failures,
+                }
+            )
+        return rows
+
+    def fallback_rate(self) -> float:
+        total = sum(stats.calls for stats in self.branches.values())
+        fallbacks = sum(stats.calls for stats in self.branches.values() if stats.fallback)
+        return fallbacks / total if total else 0.0
+
+
+PROFILE_FIELDS = [
+    "branch",
+    "fallback",
+    "calls",
+    "call_share",
+    "seconds",
+    "time_share",
+    "mean_us",
+    "warnings",
+    "warning_rate",
+    "failures",
+]
+
+
+def write_profile_report(path: Path, profile: ParseProfile) -> None:
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+        writer.writeheader()
+        for row in profile.rows():
+            writer.writerow(row)
@@ -95,6 +95,31 @@ class PdfDocument(BaseModel):
     write_images: bool
 
 
+class TokenSpan(BaseModel):
+    text: str
+    flags: int
+    font: str
+
+class TokenTextLine(BaseModel):
+    bbox: Bbox
+    spans: list[TokenSpan]
+
+class TokenBox(BaseModel):
+    boxclass: str
+    table: Optional[Table]
+    textlines: Optional[list[TokenTextLine]]
+
+class TokenPage(BaseModel):
+    boxes: list[TokenBox]
+
+class TokenDocument(BaseModel):
+    """
+    `doc_to_tokens`が読むフィールドだけを持つ`PdfDocument`の軽量版。
+    キャッシュ済みJSONの`fulltext`や`words`、スパンの座標などはPythonオブジェクトにしない。
+    """
+    pages: list[TokenPage]
+
+
 def list_span_texts(doc: PdfDocument) -> list[str]:
     texts: list[str] = []
     classes= set()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from enum import StrEnum
 from logging import info
 from pathlib import Path
 from typing import Self
@@ -11,7 +12,7 @@ import re
 from returns.maybe import Maybe, Nothing, Some
 from returns.result import Failure, ResultE, Success
 
-from .pymupdf_layout_types import PdfDocument
+from .pymupdf_layout_types import PdfDocument, TokenDocument
 from .pdf2text import pdf2json
 from ..util import clean_multiline_literal
 
@@ -26,12 +27,23 @@ class TokenStream:
 
     filename: Path
     tokens: list[Token]
+    page_count: int
     at: int = 0
 
-    def __init__(self, filename: Path, doc:PdfDocument):
+    def __init__(self, filename: Path, doc:PdfDocument | TokenDocument):
         tokens = doc_to_tokens(doc)
         self.filename = filename
         self.tokens = list(tokens)
+        self.page_count = len(doc.pages)
+
+    @classmethod
+    def from_tokens(cls, filename: Path, tokens: list[Token], page_count: int) -> TokenStream:
+        """トークン化済みの列からストリームを作る（`load_layout_tokens`の結果を渡すとき）。"""
+        stream = cls.__new__(cls)
+        stream.filename = filename
+        stream.tokens = tokens
+        stream.page_count = page_count
+        return stream
 
     def __str__(self) -> str:  # pragma: no cover - debugging aid
         return dump_tokens(self.tokens)
@@ -65,6 +77,7 @@ class TokenStream:
                 exception_report(
                     self,
                     f"`{what_expect}として{types}`にマッチする行が来るはずなのに、切れてしまったね。",
+                    WarningCode.UNEXPECTED_END,
                 )
             )
         popped = popped.unwrap()
@@ -73,6 +86,7 @@ class TokenStream:
                 exception_report(
                     self,
                     f"`{what_expect}として{types}`にマッチする行が来るはずなのに、トークン`{popped}`が来てしもうたね。",
+                    WarningCode.UNEXPECTED_TOKEN,
                 )
             )
         return Success(popped)
@@ -91,6 +105,7 @@ class TokenStream:
                 exception_report(
                     self,
                     f"`{what_expect}として{patterns}`にマッチする行が来るはずなのに、実際には`{content}`が来たね",
+                    WarningCode.PATTERN_MISMATCH,
                 )
             )
         return Success(matching)
@@ -102,24 +117,48 @@ class TokenStream:
                 return Success(None)
             case Nothing:
                 return Failure(
-                    exception_report(self, f"`{what_expect}が来るはずなのに、もう行切れしてもうたね。")
+                    exception_report(self, f"`{what_expect}が来るはずなのに、もう行切れしてもうたね。", WarningCode.UNEXPECTED_END)
                 )
 
     def empty(self: Self) -> bool:
         return self.at >= len(self.tokens) - 1
 
 
+class WarningCode(StrEnum):
+    """
+    警告・失敗の種類を表す安定したコード。
+    メッセージ文面を変えても集計や検索のキーが変わらないよう、値は変更しないこと。
+    """
+    UNCLASSIFIED = "unclassified"
+    METADATA = "metadata"
+    UNEXPECTED_END = "unexpected-end"
+    UNEXPECTED_TOKEN = "unexpected-token"
+    PATTERN_MISMATCH = "pattern-mismatch"
+    FIGURE_CAPTION_NOT_IN_PICTURE = "figure-caption-not-in-picture"
+    FIGURE_CAPTION_EMPTY = "figure-caption-empty"
+    TABLE_CAPTION_NOT_IN_TABLE = "table-caption-not-in-table"
+    TABLE_CAPTION_EMPTY = "table-caption-empty"
+    CAPTION_FORMAT = "caption-format"
+    PARAGRAPH_WITHOUT_START = "paragraph-without-start"
+    ABSTRACT_FALLBACK = "abstract-fallback"
+    KEYWORDS_MISSING = "keywords-missing"
+    TITLE_INTERRUPTED = "title-interrupted"
+    TABLE_FROM_PICTURE = "table-from-picture"
+    TABLE_FROM_PICTURE_NO_CAPTION = "table-from-picture-no-caption"
+
+
 @dataclass
 class ExceptionReport(Exception):
     filename: str
     current_position: int
     surroundings: tuple[list[Token], int]
     exception: str
+    code: WarningCode = WarningCode.UNCLASSIFIED
 
     def __str__(self) -> str:  # pragma: no cover - formatting only
         return clean_multiline_literal(
             f"""
-        ❗️Exception: {self.exception}
+        ❗️Exception[{self.code}]: {self.exception}
         at {self.filename}:{self.current_position + 1}
 
         ========================
@@ -127,9 +166,13 @@ class ExceptionReport(Exception):
         ========================
         """
         )
+    def __reduce__(self):
+        # dataclassの__init__はException.argsを設定しないため、プロセス間で受け渡せるよう明示する
+        return (ExceptionReport, (self.filename, self.current_position, self.surroundings, self.exception, self.code))
     def decode_dict(self):
         return {
             "filename": self.filename,
+            "code": str(self.code),
             "explanation": self.exception,
             "current_position": self.current_position,
             "surroundings": [token.to_dict() for token in self.surroundings[0]]
@@ -137,18 +180,24 @@ class ExceptionReport(Exception):
         
 
 
-def exception_report(tokens: TokenStream, err: str) -> ExceptionReport:
+# 警告に添える、警告が出た位置の前後のトークン数
+SURROUNDING_RADIUS = 2
+
+
+def exception_report(tokens: TokenStream, err: str, code: WarningCode = WarningCode.UNCLASSIFIED) -> ExceptionReport:
     return ExceptionReport(
         str(tokens.filename),
         tokens.location(),
-        tokens.surroundings(2),
+        tokens.surroundings(SURROUNDING_RADIUS),
         err,
+        code,
     )
-def exception_report_prior(title:str, err: str) -> ExceptionReport:
+def exception_report_prior(title:str, err: str, code: WarningCode = WarningCode.METADATA) -> ExceptionReport:
     li:tuple[list[Token], int] = ([], -1)
     return ExceptionReport(
         title,
         -1,
         li,
         err,
+        code,
     )
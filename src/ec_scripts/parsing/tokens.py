@@ -4,9 +4,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Iterable
+from typing import Any, Iterable
 
-from .pymupdf_layout_types import PdfDocument, Span
+from .pymupdf_layout_types import PdfDocument, Span, TokenDocument, TokenSpan
 
 
 class TokenType(Enum):
@@ -23,32 +23,14 @@ class TokenType(Enum):
     PAGE_HEADER = "page-header"
 
 
+_TOKEN_TYPES: dict[str, TokenType] = {tokentype.value: tokentype for tokentype in TokenType}
+
+
 def str_to_token_type(value: str) -> TokenType:
-    match value:
-        case "picture":
-            return TokenType.PICTURE
-        case "text":
-            return TokenType.TEXT
-        case "list-item":
-            return TokenType.LIST_ITEM
-        case "footnote":
-            return TokenType.FOOTNOTE
-        case "table":
-            return TokenType.TABLE
-        case "page-footer":
-            return TokenType.PAGE_FOOTER
-        case "caption":
-            return TokenType.CAPTION
-        case "title":
-            return TokenType.TITLE
-        case "section-header":
-            return TokenType.SECTION_HEADER
-        case "page-header":
-            return TokenType.PAGE_HEADER
-        case "formula":
-            return TokenType.FORMULA
-        case _:
-            raise ValueError(f"Unknown token type: {value}")
+    tokentype = _TOKEN_TYPES.get(value)
+    if tokentype is None:
+        raise ValueError(f"Unknown token type: {value}")
+    return tokentype
 
 
 @dataclass
@@ -69,11 +51,11 @@ class Token:
         }
 
 
-def is_span_bold(span: Span) -> bool:
+def is_span_bold(span: Span | TokenSpan) -> bool:
     return (((span.flags >> 4) & 1) == 1) or span.font.endswith("Medium")
 
 
-def doc_to_tokens(doc: PdfDocument) -> list[Token]:
+def doc_to_tokens(doc: PdfDocument | TokenDocument) -> list[Token]:
     tokens: list[Token] = []
     for page in doc.pages:
         for box in page.boxes:
@@ -113,6 +95,43 @@ def doc_to_tokens(doc: PdfDocument) -> list[Token]:
     return tokens
 
 
+def _is_raw_span_bold(span: dict[str, Any]) -> bool:
+    return (((span["flags"] >> 4) & 1) == 1) or span["font"].endswith("Medium")
+
+
+def layout_json_to_tokens(ob: dict[str, Any]) -> list[Token]:
+    """
+    `doc_to_tokens`と同じトークン列を、レイアウトJSONを`json.loads`した辞書から直接作る。
+    抽出したばかりのレイアウト（`extract_layout`や`fast`バックエンドの結果）をトークン化するときに使い、
+    `PdfDocument`の組み立てを省く。キャッシュからの読み込みは`TokenDocument`経由の`doc_to_tokens`で行う。
+    出力が`doc_to_tokens`と一致することは`benchmarks/bench_tokenize.py`で確かめられる。
+    """
+    tokens: list[Token] = []
+    for page in ob["pages"]:
+        for box in page["boxes"]:
+            tokentype = str_to_token_type(box["boxclass"])
+            if tokentype is TokenType.TABLE:
+                table = box.get("table")
+                assert table is not None, "Table is not found in box data."
+                content = table["markdown"]
+                lines = content.splitlines()
+                tokens.append(Token(tokentype, content, lines, [0] * len(lines), [False] * len(lines), table["extract"]))
+                continue
+            textlines = box.get("textlines")
+            if textlines is None:
+                continue
+            lines = []
+            lines_x0: list[int] = []
+            list_line_starts_with_bold: list[bool] = []
+            for textline in textlines:
+                spans = textline["spans"]
+                lines.append("".join([span["text"] for span in spans]))
+                lines_x0.append(int(textline["bbox"][0]))
+                list_line_starts_with_bold.append(len(spans) > 0 and _is_raw_span_bold(spans[0]))
+            tokens.append(Token(tokentype, "".join(lines), lines, lines_x0, list_line_starts_with_bold, []))
+    return tokens
+
+
 def dump_tokens(tokens: Iterable[Token], at:int = -1) -> str:
     dumped = ""
     head_of_box = True
@@ -0,0 +1 @@
+"""解析結果の品質・性能を検査するツールのパッケージ。"""
@@ -0,0 +1,182 @@
+"""
+ゴールデンコーパスによる回帰・性能検査。
+キャッシュ済みレイアウトごとに `content.json` のダイジェストと解析時間を記録しておき、
+パーサーを変更した後に全件を再解析して、出力の構造的な差分と解析時間の変化を報告する。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Literal
+
+from pydantic import ValidationError
+from returns.result import Failure
+
+from ..output.overview import group_warnings
+from ..parsing.paper_parser import parse_paper
+from ..parsing.pdf2text import read_cache_bytes
+from ..parsing.pdf_types import Paper
+from ..parsing.pymupdf_layout_types import TokenDocument
+from ..parsing.stream import TokenStream
+
+GOLDEN_VERSION = 2
+
+GoldenStatus = Literal["ok", "changed", "slower", "failed", "missing", "new"]
+
+
+@dataclass
+class GoldenEntry:
+    """1本の論文の解析結果の要約。"""
+
+    digest: str
+    parse_seconds: float
+    segment_counts: dict[str, int]
+    warning_groups: dict[str, int]
+    reference_count: int
+    error: str | None = None
+
+
+@dataclass
+class GoldenDiff:
+    key: str
+    status: GoldenStatus
+    details: list[str] = field(default_factory=list)
+    old_seconds: float | None = None
+    new_seconds: float | None = None
+
+
+def content_digest(paper: Paper) -> str:
+    """`content.json`の中身を書式に依存しない形で正規化したSHA-256。"""
+    canonical = json.dumps(paper.content_dict(), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def find_golden_caches(root_path: Path) -> list[Path]:
+    return sorted(root_path.glob("./data/recid_*/*.pdf.json"))
+
+
+def golden_key(root_path: Path, path_cache: Path) -> str:
+    """キャッシュに対応するPDFの、ルートからの相対パス。"""
+    return path_cache.relative_to(root_path).as_posix().removesuffix(".json")
+
+
+def measure_cache(path_cache: Path, repeat: int = 3) -> GoldenEntry:
+    """
+    キャッシュ済みレイアウトを`repeat`回解析し、最速の解析時間と出力の要約を返す。
+    キャッシュが読めないときや解析中に例外が出たときは、全体を止めずにその論文だけを`error`付きの要約にする（比較では`failed`になる）。
+    """
+    try:
+        doc = TokenDocument.model_validate_json(read_cache_bytes(path_cache))
+    except (OSError, ValidationError) as error:
+        return GoldenEntry("", 0.0, {}, {}, 0, f"キャッシュを読めません: {type(error).__name__}: {error}")
+    pdf_path = path_cache.with_name(path_cache.name.removesuffix(".json"))
+    best = float("inf")
+    paper = Paper()
+    for _ in range(max(repeat, 1)):
+        paper = Paper()
+        tokens = TokenStream(pdf_path, doc)
+        start = time.perf_counter()
+        try:
+            result = parse_paper(paper, tokens)
+        except Exception as error:
+            return GoldenEntry("", time.perf_counter() - start, {}, {}, 0, f"{type(error).__name__}: {error}")
+        best = min(best, time.perf_counter() - start)
+        if isinstance(result, Failure):
+            return GoldenEntry("", best, {}, {}, 0, str(result.failure()))
+    return GoldenEntry(
+        content_digest(paper),
+        best,
+        dict(paper.metrics.segment_counts),
+        {key: len(messages) for key, messages in group_warnings(paper).items()},
+        len(paper.references),
+    )
+
+
+def _measure(args: tuple[Path, int]) -> GoldenEntry:
+    return measure_cache(*args)
+
+
+def measure_corpus(root_path: Path, jobs: int | None = None, repeat: int = 3) -> dict[str, GoldenEntry]:
+    caches = find_golden_caches(root_path)
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        entries = executor.map(_measure, [(cache, repeat) for cache in caches], chunksize=4)
+        return {golden_key(root_path, cache): entry for cache, entry in zip(caches, entries)}
+
+
+def write_golden(path: Path, entries: dict[str, GoldenEntry]) -> None:
+    obj = {
+        "version": GOLDEN_VERSION,
+        "entries": {key: asdict(entry) for key, entry in sorted(entries.items())},
+    }
+    path.write_text(json.dumps(obj, ensure_ascii=False, indent=4), encoding="utf-8")
+
+
+def read_golden(path: Path) -> dict[str, GoldenEntry]:
+    obj = json.loads(path.read_bytes())
+    if obj.get("version") != GOLDEN_VERSION:
+        raise ValueError(f"unsupported golden version in {path}: {obj.get('version')}")
+    return {key: GoldenEntry(**entry) for key, entry in obj["entries"].items()}
+
+
+def _count_diffs(label: str, old: dict[str, int], new: dict[str, int]) -> list[str]:
+    return [
+        f"{label} {name}: {old.get(name, 0)} -> {new.get(name, 0)}"
+        for name in sorted(set(old) | set(new))
+        if old.get(name, 0) != new.get(name, 0)
+    ]
+
+
+def compare_entry(
+    key: str,
+    old: GoldenEntry,
+    new: GoldenEntry,
+    time_ratio: float,
+    time_slack: float,
+) -> GoldenDiff:
+    diff = GoldenDiff(key, "ok", old_seconds=old.parse_seconds, new_seconds=new.parse_seconds)
+    if new.error is not None and old.error is None:
+        diff.status = "failed"
+        diff.details.append(new.error)
+        return diff
+    if new.digest != old.digest or new.error != old.error or new.warning_groups != old.warning_groups:
+        diff.status = "changed"
+        diff.details += _count_diffs("segments", old.segment_counts, new.segment_counts)
+        diff.details += _count_diffs("warnings", old.warning_groups, new.warning_groups)
+        if old.reference_count != new.reference_count:
+            diff.details.append(f"references: {old.reference_count} -> {new.reference_count}")
+        if not diff.details:
+            diff.details.append("segment contents changed")
+    elif new.parse_seconds > old.parse_seconds * time_ratio and new.parse_seconds - old.parse_seconds > time_slack:
+        diff.status = "slower"
+    return diff
+
+
+def compare_corpus(
+    golden: dict[str, GoldenEntry],
+    current: dict[str, GoldenEntry],
+    time_ratio: float = 1.5,
+    time_slack: float = 0.005,
+) -> list[GoldenDiff]:
+    """
+    ゴールデンと現在の結果を比較する。
+    解析時間は、`time_ratio`倍を超え、かつ`time_slack`秒以上遅くなったものだけを回帰とみなす。
+    """
+    diffs: list[GoldenDiff] = []
+    for key in sorted(set(golden) | set(current)):
+        if key not in current:
+            diffs.append(GoldenDiff(key, "missing", ["キャッシュが見つかりません"], golden[key].parse_seconds, None))
+        elif key not in golden:
+            diffs.append(GoldenDiff(key, "new", [], None, current[key].parse_seconds))
+        else:
+            diffs.append(compare_entry(key, golden[key], current[key], time_ratio, time_slack))
+    return diffs
+
+
+def is_regression(diffs: Iterable[GoldenDiff]) -> bool:
+    return any(diff.status in {"changed", "slower", "failed", "missing"} for diff in diffs)